@@ -0,0 +1,196 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class _DirtyNote:
+    """A note with unsaved changes waiting in the autosave queue"""
+
+    __slots__ = ("session", "key", "content", "write", "first_dirty", "last_change", "size")
+
+    def __init__(self, session, key, content: str, write, now: float, size: int):
+        self.session = session
+        self.key = key
+        self.content = content
+        self.write = write
+        self.first_dirty = now
+        self.last_change = now
+        self.size = size
+
+
+class AutosaveScheduler:
+    """Process-wide autosave queue served by a single worker thread
+
+    Sessions mark notes dirty on every change; repeated changes to the same
+    note replace the queued content instead of scheduling another write.
+    A note is written once it has been idle for ``idle_delay`` seconds, or
+    ``max_latency`` seconds after it first became dirty if typing never
+    pauses. When the queued content exceeds ``max_dirty_bytes`` (UTF-8
+    encoded) everything is flushed at once. Due notes are written in a
+    single batch by the worker.
+
+    Writes of the same note never overlap: a write waits for one already
+    in flight, and ``cancel`` waits for it too, so a manual save made right
+    after cancelling is never overwritten by an older autosave.
+
+    The same worker also runs short delayed callbacks (``call_later``), such
+    as clearing a "Saved" status label, so no thread is started per event.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, idle_delay: float = 1.0, max_latency: float = 5.0,
+                 max_dirty_bytes: int = 4 * 1024 * 1024):
+        self.idle_delay = idle_delay
+        self.max_latency = max_latency
+        self.max_dirty_bytes = max_dirty_bytes
+        self._dirty = {}
+        self._dirty_bytes = 0
+        self._writing = {}  # (session, key) -> ident of the thread writing it
+        self._calls = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._worker = None
+
+    @classmethod
+    def shared(cls, **kwargs) -> "AutosaveScheduler":
+        """Return the process-wide scheduler, creating it on first use"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(**kwargs)
+            return cls._shared
+
+    def __len__(self) -> int:
+        return len(self._dirty)
+
+    @property
+    def dirty_bytes(self) -> int:
+        return self._dirty_bytes
+
+    @property
+    def scheduled_calls(self) -> int:
+        """Number of ``call_later`` callbacks waiting to run"""
+        return len(self._calls)
+
+    def mark_dirty(self, session, key, content: str, write):
+        """Queue ``write(key, content)`` for a note, coalescing with pending changes"""
+        now = time.monotonic()
+        # Encoded outside the lock; other sessions mark notes dirty meanwhile
+        size = len(content.encode("utf-8"))
+        with self._cond:
+            entry = self._dirty.get((session, key))
+            if entry is None:
+                entry = _DirtyNote(session, key, content, write, now, size)
+                self._dirty[(session, key)] = entry
+            else:
+                self._dirty_bytes -= entry.size
+                entry.content = content
+                entry.write = write
+                entry.last_change = now
+                entry.size = size
+            self._dirty_bytes += entry.size
+            self._wake()
+
+    def is_dirty(self, session, key) -> bool:
+        """Check whether a note has queued changes"""
+        return (session, key) in self._dirty
+
+    def cancel(self, session, key=None):
+        """Drop queued changes for one note, or for all notes of a session
+
+        Waits for a write of those notes already in flight on another thread.
+        """
+        me = threading.get_ident()
+        with self._cond:
+            self._take(session, key)
+            while any(
+                dirty_key[0] is session and (key is None or dirty_key[1] == key) and ident != me
+                for dirty_key, ident in self._writing.items()
+            ):
+                self._cond.wait()
+
+    def flush(self, session=None, key=None):
+        """Write queued changes now, in the calling thread"""
+        with self._cond:
+            entries = self._take(session, key)
+        self._write_all(entries)
+
+    def call_later(self, delay: float, callback):
+        """Run ``callback()`` on the worker thread after ``delay`` seconds"""
+        with self._cond:
+            heapq.heappush(self._calls, (time.monotonic() + delay, next(self._seq), callback))
+            self._wake()
+
+    def _take(self, session, key):
+        entries = []
+        for dirty_key in list(self._dirty):
+            if session is not None and dirty_key[0] is not session:
+                continue
+            if key is not None and dirty_key[1] != key:
+                continue
+            entry = self._dirty.pop(dirty_key)
+            self._dirty_bytes -= entry.size
+            entries.append(entry)
+        return entries
+
+    def _wake(self):
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, daemon=True)
+            self._worker.start()
+        # Wakes the worker; threads waiting in cancel just check again
+        self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                force = self._dirty_bytes >= self.max_dirty_bytes
+                due = []
+                next_due = None
+                for dirty_key, entry in list(self._dirty.items()):
+                    when = min(entry.last_change + self.idle_delay,
+                               entry.first_dirty + self.max_latency)
+                    if force or when <= now:
+                        del self._dirty[dirty_key]
+                        self._dirty_bytes -= entry.size
+                        due.append(entry)
+                    elif next_due is None or when < next_due:
+                        next_due = when
+
+                calls = []
+                while self._calls and self._calls[0][0] <= now:
+                    calls.append(heapq.heappop(self._calls)[2])
+                if self._calls and (next_due is None or self._calls[0][0] < next_due):
+                    next_due = self._calls[0][0]
+
+                if not due and not calls:
+                    self._cond.wait(None if next_due is None else next_due - now)
+                    continue
+
+            self._write_all(due)
+            for callback in calls:
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"Error in scheduled callback: {e}")
+
+    def _write_all(self, entries):
+        me = threading.get_ident()
+        for entry in entries:
+            dirty_key = (entry.session, entry.key)
+            with self._cond:
+                while self._writing.get(dirty_key, me) != me:
+                    self._cond.wait()
+                nested = dirty_key in self._writing
+                self._writing[dirty_key] = me
+            try:
+                entry.write(entry.key, entry.content)
+            except Exception as e:
+                print(f"Error autosaving {entry.key}: {e}")
+            finally:
+                if not nested:
+                    with self._cond:
+                        del self._writing[dirty_key]
+                        self._cond.notify_all()
@@ -0,0 +1,316 @@
+"""Benchmarks for both front-ends on a synthetic notebook
+
+Drives ``NotebookApp`` from main.py and notebook-app.py through FakePage
+and prints (or writes) JSON results; ``--compare`` checks one result file
+against a baseline. Each front-end runs in a fresh process and working
+directory, so the first session really starts cold.
+
+    python benchmark.py --notes 2000 --output after.json
+    python benchmark.py --compare before.json after.json
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import FEATURES, CorpusSpec, corpus_client_storage, write_corpus
+from fake_page import FakePage
+
+FORMAT_VERSION = 1
+APPS = ("main", "notebook-app")
+ROOT = Path(__file__).resolve().parent
+
+
+class Samples:
+    """Named timing samples, summarized in milliseconds"""
+
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, name: str, seconds: float):
+        self.samples.setdefault(name, []).append(seconds)
+
+    def time(self, name: str, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.add(name, time.perf_counter() - start)
+        return result
+
+    def summary(self) -> dict:
+        return {name: summarize(values) for name, values in self.samples.items()}
+
+
+def summarize(values) -> dict:
+    values = sorted(values)
+    ms = [v * 1000 for v in values]
+    return {
+        "count": len(ms),
+        "mean_ms": statistics.fmean(ms),
+        "median_ms": statistics.median(ms),
+        "p95_ms": ms[min(len(ms) - 1, int(len(ms) * 0.95))],
+        "min_ms": ms[0],
+        "max_ms": ms[-1],
+    }
+
+
+def wait(page: FakePage, predicate, what: str, timeout: float):
+    if not page.wait_for(predicate, timeout):
+        raise TimeoutError(f"Timed out waiting for {what}")
+
+
+def type_keys(samples: Samples, page: FakePage, editor, preview, on_change, keys: int,
+              timeout: float):
+    """Append characters one at a time and time each until the preview shows it"""
+    for i in range(keys):
+        text = (editor.value or "") + ("\n" if i % 60 == 59 else "x")
+        editor.value = text
+        start = time.perf_counter()
+        on_change(None)
+        wait(page, lambda: preview.value == text, "preview", timeout)
+        samples.add("keystroke_to_preview", time.perf_counter() - start)
+
+
+def bench_main(workdir: Path, spec: CorpusSpec, args) -> dict:
+    """Benchmark main.py against the corpus written to workdir/notes"""
+    write_corpus(workdir / "notes", spec)
+    os.chdir(workdir)
+    import main
+
+    samples = Samples()
+    rng = random.Random(spec.seed)
+    pages = []
+
+    def start_session(name: str):
+        page = FakePage()
+        start = time.perf_counter()
+        app = main.NotebookApp(page)
+        samples.add(f"{name}_shell", time.perf_counter() - start)
+        wait(page, lambda: app.current_file is not None, "first note", args.timeout)
+        samples.add(f"{name}_first_note", time.perf_counter() - start)
+        wait(page, app.store_ready, "file list", args.timeout)
+        samples.add(f"{name}_file_list", time.perf_counter() - start)
+        pages.append(page)
+        return page, app
+
+    # The first session scans the notebook; later ones share its index
+    page, app = start_session("startup_cold")
+    for _ in range(args.sessions - 1):
+        start_session("startup")
+    page.wait_idle(args.timeout)
+
+    for _ in range(args.repeat):
+        samples.time("load_files", app.load_files)
+
+    notes = app.store.list_meta()
+    for meta in rng.sample(notes, min(args.opens, len(notes))):
+        samples.time("open_file", lambda: page.run_task(app.open_file_async, meta.path).result(args.timeout))
+
+    type_keys(samples, page, app.editor, app.preview, app.on_editor_change, args.keys, args.timeout)
+
+    for i in range(args.repeat):
+        app.editor.value = (app.editor.value or "") + f"\nautosave {i}"
+        app.on_editor_change(None)
+        samples.time("autosave", app.autosave.flush, app)
+
+    for _ in range(args.repeat):
+        samples.time("refresh", lambda: page.run_task(app.refresh_files_async, None).result(args.timeout))
+
+    for page in pages:
+        page.disconnect()
+    return samples.summary()
+
+
+def load_notebook_app():
+    """Import notebook-app.py (its file name is not a valid module name)"""
+    spec = importlib.util.spec_from_file_location("notebook_app", ROOT / "notebook-app.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def bench_notebook_app(workdir: Path, spec: CorpusSpec, args) -> dict:
+    """Benchmark notebook-app.py with the corpus in client storage"""
+    os.chdir(workdir)
+    notebook_app = load_notebook_app()
+    storage = corpus_client_storage(spec)
+
+    samples = Samples()
+    rng = random.Random(spec.seed)
+
+    for _ in range(args.sessions):
+        page = FakePage(client_storage=storage)
+        start = time.perf_counter()
+        app = notebook_app.NotebookApp(page)
+        samples.add("startup_shell", time.perf_counter() - start)
+        wait(page, lambda: app.current_file is not None, "first note", args.timeout)
+        samples.add("startup_first_note", time.perf_counter() - start)
+        wait(page, lambda: len(app.file_rows) >= spec.count, "file list", args.timeout)
+        samples.add("startup_file_list", time.perf_counter() - start)
+
+    for _ in range(args.repeat):
+        samples.time("load_files", app._refresh_file_list)
+
+    names = app.file_manager.get_files()
+    for name in rng.sample(names, min(args.opens, len(names))):
+        samples.time("open_file", app._select_file, name)
+
+    type_keys(samples, page, app.markdown_editor, app.markdown_preview, app._on_editor_change,
+              args.keys, args.timeout)
+
+    # Changes are written by the autosave scheduler; time one change and its write
+    name = app.current_file.name
+
+    def save(content):
+        app.file_manager.update_file(name, content)
+        app.file_manager.flush(name)
+
+    for i in range(args.repeat):
+        content = (app.markdown_editor.value or "") + f"\nautosave {i}"
+        samples.time("autosave", save, content)
+
+    def refresh():
+        app.file_manager.store.refresh()
+        app._refresh_file_list()
+
+    for _ in range(args.repeat):
+        samples.time("refresh", refresh)
+    return samples.summary()
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def corpus_spec(args) -> CorpusSpec:
+    return CorpusSpec(
+        count=args.notes,
+        seed=args.seed,
+        median_size=args.median_size,
+        size_sigma=args.size_sigma,
+        max_size=args.max_size,
+        features=[f for f in args.features.split(",") if f],
+    )
+
+
+def run_worker(args):
+    """Benchmark one front-end in this process and write its results to the workdir"""
+    bench = bench_main if args.worker == "main" else bench_notebook_app
+    results = bench(args.workdir, corpus_spec(args), args)
+    (args.workdir / "results.json").write_text(json.dumps(results))
+
+
+def run(args) -> dict:
+    spec = corpus_spec(args)
+    options = [
+        "--notes", str(args.notes), "--seed", str(args.seed),
+        "--median-size", str(args.median_size), "--size-sigma", str(args.size_sigma),
+        "--max-size", str(args.max_size), "--features", args.features,
+        "--sessions", str(args.sessions), "--repeat", str(args.repeat),
+        "--opens", str(args.opens), "--keys", str(args.keys), "--timeout", str(args.timeout),
+    ]
+    results = {}
+    for name in args.app:
+        workdir = Path(tempfile.mkdtemp(prefix="notebook-bench-"))
+        try:
+            # App output goes to stderr so stdout stays machine-readable
+            subprocess.run(
+                [sys.executable, str(Path(__file__).resolve()), "--worker", name,
+                 "--workdir", str(workdir), *options],
+                stdout=sys.stderr, check=True,
+            )
+            results[name] = json.loads((workdir / "results.json").read_text())
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "format": FORMAT_VERSION,
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": spec.to_dict(),
+        "settings": {
+            "sessions": args.sessions,
+            "repeat": args.repeat,
+            "opens": args.opens,
+            "keys": args.keys,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> int:
+    """Print median changes per metric; returns the number of regressions"""
+    regressions = 0
+    for app, metrics in current["results"].items():
+        for metric, stats in sorted(metrics.items()):
+            old = baseline.get("results", {}).get(app, {}).get(metric)
+            if old is None:
+                print(f"{app:14} {metric:28} {stats['median_ms']:10.3f} ms  (new)")
+                continue
+            ratio = stats["median_ms"] / old["median_ms"] if old["median_ms"] else 1.0
+            regressed = ratio > 1 + threshold
+            regressions += regressed
+            print(f"{app:14} {metric:28} {old['median_ms']:10.3f} -> {stats['median_ms']:10.3f} ms"
+                  f"  {ratio:6.2f}x{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the notebook front-ends")
+    parser.add_argument("--app", action="append", choices=APPS,
+                        help="front-end to benchmark (repeatable; default: both)")
+    parser.add_argument("--notes", type=int, default=1000, help="number of notes in the corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--median-size", type=int, default=2000, help="median note size in characters")
+    parser.add_argument("--size-sigma", type=float, default=1.0, help="log-normal sigma of note sizes")
+    parser.add_argument("--max-size", type=int, default=1_000_000)
+    parser.add_argument("--features", default=",".join(FEATURES),
+                        help="comma-separated Markdown features: " + ", ".join(FEATURES))
+    parser.add_argument("--sessions", type=int, default=3, help="sessions started (first one is cold)")
+    parser.add_argument("--repeat", type=int, default=20, help="samples for load/autosave/refresh")
+    parser.add_argument("--opens", type=int, default=50, help="notes opened")
+    parser.add_argument("--keys", type=int, default=200, help="keystrokes typed")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", type=Path, help="write JSON results here instead of stdout")
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("BASELINE", "CURRENT"),
+                        help="compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="median slowdown counted as a regression by --compare")
+    parser.add_argument("--worker", choices=APPS, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+    if args.compare:
+        baseline, current = (json.loads(path.read_text()) for path in args.compare)
+        sys.exit(1 if compare(baseline, current, args.threshold) else 0)
+
+    if importlib.util.find_spec("flet") is None:
+        parser.error("flet is not installed; the benchmark drives the real apps (pip install flet)")
+    args.app = args.app or list(APPS)
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        args.output.write_text(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import multiprocessing.context
+import multiprocessing.spawn
+import os
+import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from replace_worker import content_digest, scan_chunk
+
+# A scan task holds at most this many notes or bytes of notes
+CHUNK_NOTES = 256
+CHUNK_BYTES = 1024 * 1024
+
+_spawn_lock = threading.Lock()
+
+
+class _WorkerProcess(multiprocessing.context.SpawnProcess):
+    """Spawned scan worker that does not re-import the parent's ``__main__``
+
+    Spawned processes normally run the parent's main script again (as
+    ``__mp_main__``), which here would load main.py with Flet and every
+    shared service into each worker. Scan tasks only need replace_worker,
+    so the main module is left out of what the worker is told to prepare.
+    """
+
+    def start(self):
+        prepare = multiprocessing.spawn.get_preparation_data
+
+        def preparation_data(name):
+            data = prepare(name)
+            data.pop("init_main_from_path", None)
+            data.pop("init_main_from_name", None)
+            return data
+
+        with _spawn_lock:
+            multiprocessing.spawn.get_preparation_data = preparation_data
+            try:
+                super().start()
+            finally:
+                multiprocessing.spawn.get_preparation_data = prepare
+
+
+class _WorkerContext(multiprocessing.context.SpawnContext):
+    Process = _WorkerProcess
+
+
+class StaleMatches(Exception):
+    """A note changed between the search and applying its replacements"""
+
+    def __init__(self, name: str):
+        super().__init__(f"{name} changed since it was searched; search again")
+        self.name = name
+
+
+def compile_pattern(pattern: str, ignore_case: bool = False, replacement: str = None):
+    """Compile a search pattern, checking the replacement's group references
+
+    Raises re.error for an invalid pattern or replacement.
+    """
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    regex = re.compile(pattern, flags)
+    if replacement is not None:
+        # Substituting into "" parses the template: bad escapes and group
+        # references fail here instead of in a pool process
+        try:
+            regex.sub(replacement, "")
+        except IndexError as e:
+            raise re.error(str(e)) from None
+    return regex
+
+
+class ReplaceJob:
+    """Notebook-wide regex search, and optionally replace, on a process pool
+
+    ``start`` lists the store and feeds chunks of notes to a shared process
+    pool from a daemon thread, keeping only a few chunks in flight, and
+    hands the matches of each chunk to ``on_results(job, results)`` as soon
+    as it is done. ``cancel`` stops feeding chunks and drops those not yet started.
+    ``on_done(job)`` is called once the scan ends, however it ends.
+
+    ``apply`` then writes the replacements of the selected notes as one
+    batch through the store's ``write_many`` (one journal record or
+    transaction), after checking that none of them changed since the scan.
+    """
+
+    _pool = None
+    _pool_lock = threading.Lock()
+
+    def __init__(self, store, versions, pattern: str, replacement: str = None,
+                 ignore_case: bool = False, workers: int = None, on_results=None, on_done=None):
+        self.store = store
+        self.versions = versions
+        self.pattern = pattern
+        self.replacement = replacement
+        self.regex = compile_pattern(pattern, ignore_case, replacement)
+        self.workers = workers or os.cpu_count() or 1
+        self.on_results = on_results
+        self.on_done = on_done
+        self.results = {}
+        self.expected = {}
+        self.scanned = 0
+        self.total = 0
+        self.error = None
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def pool(cls, workers: int) -> ProcessPoolExecutor:
+        """Return the process-wide scan pool, started on first use
+
+        Workers are spawned, not forked, so they do not inherit the
+        server's threads and locks, and they import only replace_worker,
+        not the app's main module.
+        """
+        with cls._pool_lock:
+            if cls._pool is None:
+                cls._pool = ProcessPoolExecutor(max_workers=workers, mp_context=_WorkerContext())
+            return cls._pool
+
+    @classmethod
+    def _discard_pool(cls, pool: ProcessPoolExecutor):
+        """Drop a pool whose worker died so the next search starts a new one"""
+        with cls._pool_lock:
+            if cls._pool is pool:
+                cls._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def match_count(self) -> int:
+        with self._lock:
+            return sum(result.count for result in self.results.values())
+
+    def start(self) -> threading.Thread:
+        """Run the scan on a daemon thread"""
+        thread = threading.Thread(target=self._run, daemon=True)
+        thread.start()
+        return thread
+
+    def cancel(self):
+        """Stop the scan; matches found so far are kept"""
+        self.cancelled.set()
+
+    def _chunks(self):
+        """Yield lists of scan tasks; records each note's version first"""
+        file_path = getattr(self.store, "file_path", None)
+        metas = list(self.store.list_meta())
+        self.total = len(metas)
+        chunk = []
+        size = 0
+        for meta in metas:
+            if self.cancelled.is_set():
+                return
+            name = meta.name
+            self.expected[name] = self.versions.current(name)
+            path = file_path(name) if file_path is not None else None
+            if path is not None:
+                chunk.append((name, str(path), None))
+            else:
+                # Notes not (or not yet) in a file are read here and shipped
+                try:
+                    chunk.append((name, None, self.store.read(name)))
+                except Exception as e:
+                    print(f"Error reading {name} for search: {e}")
+                    continue
+            size += meta.size
+            if len(chunk) >= CHUNK_NOTES or size >= CHUNK_BYTES:
+                yield chunk
+                chunk, size = [], 0
+        if chunk:
+            yield chunk
+
+    def _run(self):
+        pool = self.pool(self.workers)
+        chunks = self._chunks()
+        pending = {}
+        args = (self.regex.pattern, self.regex.flags, self.replacement)
+        try:
+            while not self.cancelled.is_set():
+                while len(pending) < self.workers * 2:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    pending[pool.submit(scan_chunk, chunk, *args)] = len(chunk)
+                if not pending:
+                    break
+                done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    scanned = pending.pop(future)
+                    results = future.result()
+                    with self._lock:
+                        self.scanned += scanned
+                        for result in results:
+                            self.results[result.name] = result
+                    if results and self.on_results is not None and not self.cancelled.is_set():
+                        self.on_results(self, results)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._discard_pool(pool)
+            self.error = e
+            self.cancelled.set()
+        finally:
+            for future in pending:
+                future.cancel()
+            chunks.close()
+            self.done.set()
+            if self.on_done is not None:
+                self.on_done(self)
+
+    def plan(self, names=None) -> dict:
+        """Return name -> new content for the selected notes
+
+        ``names`` None selects every note with matches; an empty list
+        selects none.
+
+        Raises StaleMatches if a note's content is not what was searched.
+        """
+        if self.replacement is None:
+            raise ValueError("No replacement given")
+        with self._lock:
+            if names is None:
+                names = list(self.results)
+            selected = [self.results[name] for name in names
+                        if name in self.results and self.results[name].digest is not None]
+        changes = {}
+        for result in selected:
+            content = self.store.read(result.name)
+            if content_digest(content) != result.digest:
+                raise StaleMatches(result.name)
+            replaced = self.regex.sub(self.replacement, content)
+            if replaced != content:
+                changes[result.name] = replaced
+        return changes
+
+    def apply(self, names=None):
+        """Write the replacements as one batch; returns ``(versions, changes)``
+
+        Raises StaleMatches or VersionConflict (nothing is written) if a
+        note changed since the scan.
+        """
+        changes = self.plan(names)
+        if not changes:
+            return {}, changes
+        expected = {name: self.expected.get(name, 0) for name in changes}
+
+        def write():
+            write_many = getattr(self.store, "write_many", None)
+            if write_many is not None:
+                write_many(changes)
+            else:
+                for name, content in changes.items():
+                    self.store.write(name, content)
+
+        versions, _ = self.versions.commit_many(expected, write)
+        return versions, changes
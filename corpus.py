@@ -0,0 +1,164 @@
+import argparse
+import json
+import os
+import random
+from pathlib import Path
+
+from note_store import ClientStorageNoteStore
+
+# Markdown features a generated note can contain
+FEATURES = ("headings", "lists", "code", "tables", "links", "quotes", "emphasis")
+
+WORDS = (
+    "note idea draft plan meeting project review design cache index query "
+    "latency budget editor preview session storage journal history search "
+    "list table render update change version merge conflict replica server "
+    "client browser markdown heading paragraph summary todo follow up owner"
+).split()
+
+
+class CorpusSpec:
+    """Parameters of a reproducible synthetic notebook
+
+    Note sizes (in characters) are drawn from a log-normal distribution with
+    the given median and sigma, clamped to ``[min_size, max_size]``. The same
+    spec and seed always produce the same notes, names and mtimes.
+    """
+
+    def __init__(self, count: int = 1000, seed: int = 0, median_size: int = 2000,
+                 size_sigma: float = 1.0, min_size: int = 40, max_size: int = 1_000_000,
+                 features=FEATURES):
+        unknown = set(features) - set(FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown Markdown features: {', '.join(sorted(unknown))}")
+        self.count = count
+        self.seed = seed
+        self.median_size = median_size
+        self.size_sigma = size_sigma
+        self.min_size = min_size
+        self.max_size = max_size
+        self.features = tuple(features)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "seed": self.seed,
+            "median_size": self.median_size,
+            "size_sigma": self.size_sigma,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "features": list(self.features),
+        }
+
+
+def note_name(i: int) -> str:
+    return f"note-{i:06d}.md"
+
+
+def _sentence(rng: random.Random, emphasis: bool) -> str:
+    words = rng.choices(WORDS, k=rng.randint(6, 16))
+    if emphasis and rng.random() < 0.3:
+        i = rng.randrange(len(words))
+        words[i] = rng.choice(("**{}**", "*{}*", "`{}`")).format(words[i])
+    return " ".join(words).capitalize() + "."
+
+
+def _block(rng: random.Random, spec: CorpusSpec, features) -> str:
+    kind = rng.choice(features) if features and rng.random() < 0.4 else "paragraph"
+    emphasis = "emphasis" in spec.features
+    if kind == "headings":
+        return "#" * rng.randint(2, 4) + " " + " ".join(rng.choices(WORDS, k=3)).title()
+    if kind == "lists":
+        marker = rng.choice(("-", "*", "1.", "- [ ]"))
+        return "\n".join(f"{marker} {_sentence(rng, emphasis)}" for _ in range(rng.randint(2, 6)))
+    if kind == "code":
+        lines = [f"{rng.choice(WORDS)} = {rng.randint(0, 999)}" for _ in range(rng.randint(2, 8))]
+        return "```python\n" + "\n".join(lines) + "\n```"
+    if kind == "tables":
+        cols = rng.randint(2, 4)
+        header = "| " + " | ".join(rng.choices(WORDS, k=cols)) + " |"
+        rule = "|" + "---|" * cols
+        rows = ["| " + " | ".join(str(rng.randint(0, 99)) for _ in range(cols)) + " |"
+                for _ in range(rng.randint(2, 6))]
+        return "\n".join([header, rule] + rows)
+    if kind == "links":
+        target = note_name(rng.randrange(spec.count))
+        return f"{_sentence(rng, emphasis)} See [{rng.choice(WORDS)}]({target})."
+    if kind == "quotes":
+        return "> " + _sentence(rng, emphasis)
+    return " ".join(_sentence(rng, emphasis) for _ in range(rng.randint(2, 5)))
+
+
+def generate_note(rng: random.Random, spec: CorpusSpec, size: int) -> str:
+    """Generate one note of roughly ``size`` characters"""
+    features = [f for f in spec.features if f != "emphasis"]
+    parts = ["# " + " ".join(rng.choices(WORDS, k=rng.randint(2, 5))).title()]
+    length = len(parts[0])
+    while length < size:
+        block = _block(rng, spec, features)
+        parts.append(block)
+        length += len(block) + 2
+    return "\n\n".join(parts) + "\n"
+
+
+def generate_corpus(spec: CorpusSpec):
+    """Yield ``(name, content, mtime)`` for every note of the corpus"""
+    rng = random.Random(spec.seed)
+    base_mtime = 1_700_000_000.0
+    for i in range(spec.count):
+        size = int(rng.lognormvariate(0.0, spec.size_sigma) * spec.median_size)
+        size = max(spec.min_size, min(spec.max_size, size))
+        note_rng = random.Random(rng.getrandbits(64))
+        yield note_name(i), generate_note(note_rng, spec, size), base_mtime + rng.uniform(0, 365 * 86400)
+
+
+def write_corpus(directory: Path, spec: CorpusSpec) -> int:
+    """Write the corpus as ``.md`` files with their mtimes; returns bytes written"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    total = 0
+    for name, content, mtime in generate_corpus(spec):
+        path = directory / name
+        data = content.encode("utf-8")
+        path.write_bytes(data)
+        os.utime(path, (mtime, mtime))
+        total += len(data)
+    return total
+
+
+def corpus_client_storage(spec: CorpusSpec) -> dict:
+    """Return client storage contents holding the corpus (ClientStorageNoteStore layout)"""
+    data = {}
+    names = []
+    for name, content, _ in generate_corpus(spec):
+        data[ClientStorageNoteStore.FILE_KEY_PREFIX + name] = content
+        names.append(name)
+    data[ClientStorageNoteStore.MANIFEST_KEY] = names
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic notebook corpus")
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--median-size", type=int, default=2000)
+    parser.add_argument("--size-sigma", type=float, default=1.0)
+    parser.add_argument("--max-size", type=int, default=1_000_000)
+    parser.add_argument("--features", default=",".join(FEATURES),
+                        help="comma-separated subset of: " + ", ".join(FEATURES))
+    args = parser.parse_args()
+    spec = CorpusSpec(
+        count=args.count,
+        seed=args.seed,
+        median_size=args.median_size,
+        size_sigma=args.size_sigma,
+        max_size=args.max_size,
+        features=[f for f in args.features.split(",") if f],
+    )
+    total = write_corpus(args.directory, spec)
+    print(json.dumps({"corpus": spec.to_dict(), "bytes": total}))
+
+
+if __name__ == "__main__":
+    main()
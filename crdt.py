@@ -0,0 +1,486 @@
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_right, insort
+from pathlib import Path
+
+from document import diff_span, merge_spans
+
+# Operations, as broadcast between replicas:
+#   ("i", site, seq, origin, text)  insert text; its characters get the ids
+#                                   (site, seq), (site, seq + 1), ...; origin
+#                                   is the id of the character to its left
+#                                   when inserted, or None at the start
+#   ("d", site, seq, length)        delete the characters with ids
+#                                   (site, seq) .. (site, seq + length - 1)
+INSERT = "i"
+DELETE = "d"
+
+# Snapshot file format (JSON); the operation log holds one JSON batch per line
+FORMAT_VERSION = 1
+
+
+def new_site() -> str:
+    """Return a fresh replica id"""
+    return uuid.uuid4().hex[:12]
+
+
+def _origin(value):
+    return tuple(value) if value is not None else None
+
+
+def decode_op(op):
+    """Turn an operation read back from JSON (lists) into its tuple form"""
+    if op[0] == INSERT:
+        _, site, seq, origin, text = op
+        return (INSERT, site, seq, _origin(origin), text)
+    _, site, seq, length = op
+    return (DELETE, site, seq, length)
+
+
+class Item:
+    """A run of consecutively inserted characters
+
+    The run's characters have ids ``(site, seq + i)``; each one's origin is
+    the character before it, so only the first character's origin is kept.
+    """
+
+    __slots__ = ("site", "seq", "origin", "text", "deleted")
+
+    def __init__(self, site: str, seq: int, origin, text: str, deleted: bool = False):
+        self.site = site
+        self.seq = seq
+        self.origin = origin
+        self.text = text
+        self.deleted = deleted
+
+
+class SequenceCRDT:
+    """Replicated text using RGA (replicated growable array) over runs
+
+    Every replica applies the same operations in any order and ends with
+    the same text. A character is placed right after its origin, skipping
+    characters inserted concurrently with a larger ``(seq, site)`` Lamport
+    timestamp; deleted characters stay as tombstones so later operations
+    can still refer to them. Operations whose origin or target has not been
+    seen yet wait until it arrives.
+    """
+
+    def __init__(self, site: str = None):
+        self.site = site or new_site()
+        self.clock = 0
+        self.items = []
+        self._starts = {}  # site -> sorted run start seqs
+        self._runs = {}  # (site, start seq) -> Item
+        self._pending = []
+        self._text = ""
+        self.lock = threading.RLock()
+
+    @classmethod
+    def from_text(cls, text: str, site: str = "base") -> "SequenceCRDT":
+        """Create a replica whose initial content is text"""
+        doc = cls(site)
+        if text:
+            doc._integrate(Item(site, 1, None, text))
+        doc.site = new_site()
+        return doc
+
+    @property
+    def text(self) -> str:
+        """Current visible text"""
+        with self.lock:
+            if self._text is None:
+                self._text = "".join(item.text for item in self.items if not item.deleted)
+            return self._text
+
+    # -- Lookup --------------------------------------------------------------
+
+    def _register(self, item: Item):
+        insort(self._starts.setdefault(item.site, []), item.seq)
+        self._runs[(item.site, item.seq)] = item
+
+    def _find(self, site: str, seq: int):
+        """Return ``(item, offset)`` for a character id, or None if unseen"""
+        starts = self._starts.get(site)
+        if not starts:
+            return None
+        i = bisect_right(starts, seq) - 1
+        if i < 0:
+            return None
+        item = self._runs[(site, starts[i])]
+        offset = seq - item.seq
+        if offset >= len(item.text):
+            return None
+        return item, offset
+
+    def _split(self, item: Item, offset: int) -> Item:
+        """Split a run before offset; returns the right half"""
+        right = Item(item.site, item.seq + offset, (item.site, item.seq + offset - 1),
+                     item.text[offset:], item.deleted)
+        item.text = item.text[:offset]
+        self.items.insert(self.items.index(item) + 1, right)
+        self._register(right)
+        return right
+
+    # -- Remote operations -----------------------------------------------------
+
+    def _integrate(self, new: Item) -> bool:
+        if self._find(new.site, new.seq) is not None:
+            return True  # Already applied
+        if new.origin is None:
+            index = 0
+        else:
+            found = self._find(*new.origin)
+            if found is None:
+                return False
+            item, offset = found
+            if offset < len(item.text) - 1:
+                self._split(item, offset + 1)
+            index = self.items.index(item) + 1
+        # Skip concurrent insertions that win the tie (and their descendants)
+        while index < len(self.items):
+            other = self.items[index]
+            if (other.seq, other.site) < (new.seq, new.site):
+                break
+            index += 1
+        prev = self.items[index - 1] if index else None
+        if (prev is not None and not prev.deleted and not new.deleted and prev.site == new.site
+                and prev.seq + len(prev.text) == new.seq and new.origin == (prev.site, new.seq - 1)):
+            prev.text += new.text  # Typing continues the run
+        else:
+            self.items.insert(index, new)
+            self._register(new)
+        self.clock = max(self.clock, new.seq + len(new.text) - 1)
+        if not new.deleted:
+            self._text = None
+        return True
+
+    def _delete(self, site: str, seq: int, length: int) -> bool:
+        end = seq + length
+        # Check the whole range first so a partial delete is never applied
+        pos = seq
+        while pos < end:
+            found = self._find(site, pos)
+            if found is None:
+                return False
+            item, offset = found
+            pos += len(item.text) - offset
+        while seq < end:
+            item, offset = self._find(site, seq)
+            if offset:
+                item = self._split(item, offset)
+            if len(item.text) > end - seq:
+                self._split(item, end - seq)
+            if not item.deleted:
+                item.deleted = True
+                self._text = None
+            seq += len(item.text)
+        return True
+
+    def _apply_one(self, op) -> bool:
+        if op[0] == INSERT:
+            _, site, seq, origin, text = op
+            return self._integrate(Item(site, seq, origin, text))
+        _, site, seq, length = op
+        return self._delete(site, seq, length)
+
+    def apply(self, ops) -> bool:
+        """Apply remote operations; returns whether the text changed"""
+        with self.lock:
+            queue = list(self._pending) + list(ops)
+            self._pending = []
+            progress = True
+            while queue and progress:
+                progress = False
+                waiting = []
+                for op in queue:
+                    if self._apply_one(op):
+                        progress = True
+                    else:
+                        waiting.append(op)
+                queue = waiting
+            self._pending = queue
+            return self._text is None
+
+    # -- Local edits -----------------------------------------------------------
+
+    def _locate(self, pos: int):
+        """Return ``(index, offset)`` of the visible character at pos"""
+        for index, item in enumerate(self.items):
+            if item.deleted:
+                continue
+            if pos < len(item.text):
+                return index, pos
+            pos -= len(item.text)
+        return len(self.items), 0
+
+    def insert(self, pos: int, text: str):
+        """Insert text at a visible position; returns the operation"""
+        with self.lock:
+            origin = None
+            if pos > 0:
+                index, offset = self._locate(pos - 1)
+                item = self.items[index]
+                origin = (item.site, item.seq + offset)
+            op = (INSERT, self.site, self.clock + 1, origin, text)
+            self._apply_one(op)
+            return op
+
+    def delete(self, pos: int, length: int):
+        """Delete visible characters; returns the operations"""
+        ops = []
+        with self.lock:
+            index, offset = self._locate(pos)
+            while length > 0 and index < len(self.items):
+                item = self.items[index]
+                index += 1
+                if item.deleted:
+                    continue
+                take = min(length, len(item.text) - offset)
+                ops.append((DELETE, item.site, item.seq + offset, take))
+                length -= take
+                offset = 0
+            for op in ops:
+                self._apply_one(op)
+        return ops
+
+    def edit(self, pos: int, removed_len: int, inserted: str):
+        """Apply a local ``(pos, removed_len, inserted)`` span; returns the operations"""
+        with self.lock:
+            ops = self.delete(pos, removed_len) if removed_len else []
+            if inserted:
+                ops.append(self.insert(pos, inserted))
+            return ops
+
+    # -- State -----------------------------------------------------------------
+
+    def state(self):
+        """Return a JSON-serializable snapshot of the replica"""
+        with self.lock:
+            return (self.clock, [
+                (item.site, item.seq, item.origin, item.text, item.deleted) for item in self.items
+            ], list(self._pending))
+
+    @classmethod
+    def from_state(cls, state, site: str = None) -> "SequenceCRDT":
+        """Rebuild a replica from ``state()`` (with a new site id by default)"""
+        clock, items, pending = state
+        doc = cls(site)
+        doc.clock = clock
+        for item_site, seq, origin, text, deleted in items:
+            item = Item(item_site, seq, _origin(origin), text, deleted)
+            doc.items.append(item)
+            doc._register(item)
+        doc._pending = [decode_op(op) for op in pending]
+        doc._text = None
+        return doc
+
+
+class _CollabNote:
+    __slots__ = ("doc", "ops_since_snapshot", "dirty", "snapshot_time")
+
+    def __init__(self, doc: SequenceCRDT):
+        self.doc = doc
+        self.ops_since_snapshot = 0
+        self.dirty = False
+        self.snapshot_time = time.monotonic()
+
+
+class CollabHub:
+    """Process-wide authority for collaboratively edited notes
+
+    Keeps one replica per note that every session's operations are applied
+    to, and persists them as an append-only operation log per note. ``sync``
+    makes the log durable; once ``snapshot_every`` operations or
+    ``snapshot_interval`` seconds have accumulated (and on ``flush``) the
+    text is saved to the note store, then the replica is written as a
+    snapshot, and only then is the log truncated, so a failure at any step
+    leaves the snapshot plus the log able to rebuild every edit. Sessions
+    ``join`` a note with their own replica, cloned from the hub's, and
+    exchange operations with each other directly.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, directory: Path, store, snapshot_every: int = 500,
+                 snapshot_interval: float = 300.0):
+        self.directory = Path(directory)
+        self.directory.mkdir(exist_ok=True)
+        self.store = store
+        self.snapshot_every = snapshot_every
+        self.snapshot_interval = snapshot_interval
+        self._notes = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def shared(cls, directory: Path, store, **kwargs) -> "CollabHub":
+        """Return the process-wide hub for a directory"""
+        key = Path(directory).resolve()
+        with cls._shared_lock:
+            hub = cls._shared.get(key)
+            if hub is None:
+                hub = cls(directory, store, **kwargs)
+                cls._shared[key] = hub
+            return hub
+
+    def _snapshot_path(self, name: str) -> Path:
+        return self.directory / f"{name}.snap"
+
+    def _log_path(self, name: str) -> Path:
+        return self.directory / f"{name}.ops"
+
+    def _set_aside(self, path: Path, reason: str):
+        if path.exists():
+            print(f"{reason}; keeping it as {path.name}.old")
+            os.replace(path, path.with_name(path.name + ".old"))
+
+    def _load(self, name: str) -> _CollabNote:
+        """Rebuild a note from its snapshot and log, reconciled with the store
+
+        The snapshot's text is what the store held when it was taken, so a
+        stored text that differs from both it and the replayed log was
+        saved outside collaboration; that change is merged in as an edit,
+        and only if it overlaps the logged edits does the stored text win
+        (the log is then kept aside, not deleted).
+        """
+        note = self._notes.get(name)
+        if note is not None:
+            return note
+        stored = self.store.read(name)
+        doc = None
+        try:
+            with open(self._snapshot_path(name), encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") == FORMAT_VERSION:
+                doc = SequenceCRDT.from_state((data["clock"], data["items"], data["pending"]))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error reading snapshot for {name}: {e}")
+        if doc is None:
+            # Logged operations refer to the snapshot they were made on
+            self._set_aside(self._log_path(name), f"Operation log for {name} has no snapshot")
+            note = _CollabNote(SequenceCRDT.from_text(stored))
+            self._write_snapshot(name, note.doc)
+            self._notes[name] = note
+            return note
+
+        base = doc.text
+        note = _CollabNote(doc)
+        try:
+            with open(self._log_path(name), "rb") as f:
+                valid_end = 0
+                for line in f:
+                    try:
+                        doc.apply([decode_op(op) for op in json.loads(line)])
+                        note.ops_since_snapshot += 1
+                        valid_end += len(line)
+                    except Exception:
+                        print(f"Error reading operation log for {name}; dropping its tail")
+                        f.close()
+                        with open(self._log_path(name), "ab") as out:
+                            out.truncate(valid_end)
+                        break
+        except FileNotFoundError:
+            pass
+        # Logged edits not saved to the store yet
+        note.dirty = doc.text != stored
+
+        if stored != base and doc.text != stored:
+            merged = merge_spans(base, doc.text, stored)
+            if merged is None:
+                self._set_aside(self._log_path(name),
+                                f"{name} was saved outside collaboration over logged edits")
+                note = _CollabNote(SequenceCRDT.from_text(stored))
+                self._write_snapshot(name, note.doc)
+            else:
+                doc.edit(*diff_span(doc.text, merged))
+                self._snapshot(name, note)
+        self._notes[name] = note
+        return note
+
+    def text(self, name: str) -> str:
+        """Return a note's current collaborative text"""
+        with self._lock:
+            return self._load(name).doc.text
+
+    def join(self, name: str) -> SequenceCRDT:
+        """Return a new replica of a note for one session"""
+        with self._lock:
+            note = self._load(name)
+            return SequenceCRDT.from_state(note.doc.state())
+
+    def submit(self, name: str, ops):
+        """Record a batch of operations made by a session"""
+        if not ops:
+            return
+        with self._lock:
+            note = self._load(name)
+            note.doc.apply(ops)
+            note.dirty = True
+            try:
+                with open(self._log_path(name), "a", encoding="utf-8") as f:
+                    f.write(json.dumps(list(ops), ensure_ascii=False, separators=(",", ":")) + "\n")
+            except Exception as e:
+                print(f"Error writing operation log for {name}: {e}")
+            note.ops_since_snapshot += 1
+            if note.ops_since_snapshot >= self.snapshot_every:
+                try:
+                    self._snapshot(name, note)
+                except Exception as e:
+                    print(f"Error writing snapshot for {name}: {e}")
+
+    def sync(self, name: str) -> bool:
+        """Make a note's logged operations durable, snapshotting it if due
+
+        Returns whether the note was written to the store.
+        """
+        with self._lock:
+            note = self._notes.get(name)
+            if note is None or not note.dirty:
+                return False
+            path = self._log_path(name)
+            if path.exists():
+                with open(path, "ab") as f:
+                    os.fsync(f.fileno())
+            if (note.ops_since_snapshot >= self.snapshot_every
+                    or time.monotonic() - note.snapshot_time >= self.snapshot_interval):
+                self._snapshot(name, note)
+                return True
+            return False
+
+    def flush(self, name: str = None):
+        """Save one note (or all) to the store and snapshot it"""
+        with self._lock:
+            names = [name] if name is not None else list(self._notes)
+            for key in names:
+                note = self._notes.get(key)
+                if note is not None and note.dirty:
+                    self._snapshot(key, note)
+
+    def _write_snapshot(self, name: str, doc: SequenceCRDT):
+        path = self._snapshot_path(name)
+        tmp = path.with_name(path.name + ".tmp")
+        clock, items, pending = doc.state()
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"format": FORMAT_VERSION, "clock": clock, "items": items,
+                       "pending": pending}, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _snapshot(self, name: str, note: _CollabNote):
+        """Save the text, then the snapshot, then truncate the log
+
+        Raises if a step fails; the log is kept until both writes succeeded.
+        """
+        self.store.write(name, note.doc.text)
+        note.dirty = False
+        self._write_snapshot(name, note.doc)
+        # The snapshot covers everything logged so far
+        open(self._log_path(name), "wb").close()
+        note.ops_since_snapshot = 0
+        note.snapshot_time = time.monotonic()
@@ -0,0 +1,310 @@
+import threading
+import time
+
+# Block size used to find the common prefix/suffix of two texts
+COMPARE_BLOCK = 4096
+
+
+def diff_span(old: str, new: str):
+    """Return ``(pos, removed_len, inserted)`` turning old into new, or None
+
+    The span covers everything between the common prefix and the common
+    suffix, so a single typed or deleted run of characters yields a span of
+    exactly that run. Texts are compared block by block, without copying
+    either text as a whole.
+    """
+    if old is new or old == new:
+        return None
+    limit = min(len(old), len(new))
+
+    prefix = 0
+    while prefix < limit:
+        end = min(prefix + COMPARE_BLOCK, limit)
+        if old[prefix:end] != new[prefix:end]:
+            while old[prefix] == new[prefix]:
+                prefix += 1
+            break
+        prefix = end
+
+    suffix = 0
+    limit -= prefix
+    while suffix < limit:
+        end = min(suffix + COMPARE_BLOCK, limit)
+        if old[len(old) - end:len(old) - suffix] != new[len(new) - end:len(new) - suffix]:
+            while old[len(old) - suffix - 1] == new[len(new) - suffix - 1]:
+                suffix += 1
+            break
+        suffix = end
+
+    return prefix, len(old) - prefix - suffix, new[prefix:len(new) - suffix]
+
+
+def merge_spans(base: str, ours: str, theirs: str):
+    """Three-way merge of two edits of base; None if their spans overlap
+
+    Each side is reduced to the single span it changed, so edits in
+    separate parts of a note merge cleanly and anything else is reported
+    as a conflict.
+    """
+    if ours == theirs:
+        return ours
+    mine = diff_span(base, ours)
+    other = diff_span(base, theirs)
+    if mine is None:
+        return theirs
+    if other is None:
+        return ours
+    if mine[0] > other[0]:
+        mine, other = other, mine
+    (p1, r1, i1), (p2, r2, i2) = mine, other
+    if p1 + r1 >= p2:
+        return None
+    return base[:p1] + i1 + base[p1 + r1:p2] + i2 + base[p2 + r2:]
+
+
+def rebase_span(span, other):
+    """Move a ``(pos, removed_len, inserted)`` span past another edit of the same text
+
+    ``other`` is the span of a concurrent edit; the result applies to the
+    text after ``other``. Where the spans overlap, characters ``other``
+    already replaced are left alone and the insertion goes next to
+    ``other``'s, so neither edit undoes the other.
+    """
+    if other is None:
+        return span
+    pos, removed, inserted = span
+    opos, oremoved, oinserted = other
+    shift = len(oinserted) - oremoved
+    if pos + removed <= opos:
+        return span
+    if pos >= opos + oremoved:
+        return pos + shift, removed, inserted
+    # Overlap: keep only the deletion in front of the other edit
+    if pos < opos:
+        return pos, opos - pos, inserted
+    return opos + len(oinserted), 0, inserted
+
+
+class Piece:
+    """A run of text taken from one of the document's buffers"""
+
+    __slots__ = ("buffer", "start", "length")
+
+    def __init__(self, buffer: int, start: int, length: int):
+        self.buffer = buffer
+        self.start = start
+        self.length = length
+
+
+class Document:
+    """Piece-table model of the open note's text
+
+    The text is a sequence of pieces pointing into the original text and
+    into append-only chunks of inserted text, so edits, undo and redo split
+    pieces instead of copying the text; the joined text is built only when
+    it is asked for. The editor hands over whole values, so ``sync``
+    reduces each value to the single span that changed (``diff_span``,
+    which compares blocks rather than characters).
+
+    Every edit is recorded as a span for ``undo``/``redo``, with a run of
+    typing or deleting kept as one step, and widens the span changed since
+    the last save, so a save writes just that region (``take_change``).
+    Changes from elsewhere (merges, other sessions) are synced with
+    ``record=False``: they cannot be undone, and recorded edits are moved
+    past them.
+    """
+
+    # Rebuild the piece list from the text when it grows past this
+    MAX_PIECES = 512
+    MAX_UNDO = 1000
+    # Typing continued within this many seconds is undone in one step
+    UNDO_GROUP_SECONDS = 1.0
+
+    def __init__(self, text: str = ""):
+        self.lock = threading.RLock()
+        self._reset(text)
+        self._undo = []  # [pos, removed, inserted] of applied edits, oldest first
+        self._redo = []  # The same for undone edits, next to redo last
+        self._group = None  # Undo entry typing may still extend, and when it last did
+        self._base = text
+        self._dirty = None  # (start, characters kept at the end) since the last save
+
+    def _reset(self, text: str):
+        self._buffers = [text]
+        self._pieces = [Piece(0, 0, len(text))] if text else []
+        self._length = len(text)
+        self._text = text
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def text(self) -> str:
+        """Current text (joined from the pieces once per change)"""
+        with self.lock:
+            if self._text is None:
+                self._text = "".join(
+                    self._buffers[p.buffer][p.start:p.start + p.length] for p in self._pieces
+                )
+            return self._text
+
+    def _split(self, pos: int) -> int:
+        """Split the piece containing pos; return the index of the piece starting at pos"""
+        offset = 0
+        for i, piece in enumerate(self._pieces):
+            if offset == pos:
+                return i
+            if pos < offset + piece.length:
+                cut = pos - offset
+                self._pieces[i:i + 1] = [
+                    Piece(piece.buffer, piece.start, cut),
+                    Piece(piece.buffer, piece.start + cut, piece.length - cut),
+                ]
+                return i + 1
+            offset += piece.length
+        return len(self._pieces)
+
+    def _apply(self, pos: int, removed_len: int, inserted: str, text: str = None):
+        """Replace removed_len characters at pos; text is the result if known"""
+        start = self._split(pos)
+        end = self._split(pos + removed_len)
+        new_pieces = []
+        if inserted:
+            self._buffers.append(inserted)
+            new_pieces.append(Piece(len(self._buffers) - 1, 0, len(inserted)))
+        self._pieces[start:end] = new_pieces
+        tail = self._length - pos - removed_len
+        self._length += len(inserted) - removed_len
+        self._text = text
+
+        if len(self._pieces) > self.MAX_PIECES:
+            self._reset(self.text)
+
+        # Widen the span changed since the last save
+        if self._dirty is None:
+            self._dirty = (pos, tail)
+        else:
+            self._dirty = (min(self._dirty[0], pos), min(self._dirty[1], tail))
+
+    def _record(self, pos: int, removed: str, inserted: str):
+        self._redo.clear()
+        now = time.monotonic()
+        if self._group is not None and now - self._group[1] <= self.UNDO_GROUP_SECONDS:
+            last = self._group[0]
+            if not removed and "\n" not in inserted and pos == last[0] + len(last[2]):
+                # Typing on
+                last[2] += inserted
+                self._group = last, now
+                return
+            if not inserted and not last[2] and pos + len(removed) == last[0]:
+                # Deleting backwards
+                last[0] = pos
+                last[1] = removed + last[1]
+                self._group = last, now
+                return
+        entry = [pos, removed, inserted]
+        self._undo.append(entry)
+        if len(self._undo) > self.MAX_UNDO:
+            del self._undo[0]
+        self._group = entry, now
+
+    def _move_history(self, pos: int, removed_len: int, inserted: str):
+        """Move recorded edits past a change that is not recorded itself
+
+        Undo entries are visited newest first, each against the change as
+        it would apply to the text right after that entry; redo entries
+        likewise against the text each one applies to. An entry the change
+        overlaps can no longer be reverted without touching someone else's
+        text, so then the history is dropped.
+        """
+        delta = len(inserted) - removed_len
+        self._group = None
+        for stack, applied in ((self._undo, True), (self._redo, False)):
+            start, end = pos, pos + removed_len
+            for entry in reversed(stack):
+                # Length of the entry's region in the text the change applies
+                # to, and in the text of the next entry
+                covered, other = (entry[2], entry[1]) if applied else (entry[1], entry[2])
+                if end <= entry[0]:
+                    entry[0] += delta
+                elif start >= entry[0] + len(covered):
+                    start += len(other) - len(covered)
+                    end += len(other) - len(covered)
+                else:
+                    self._undo.clear()
+                    self._redo.clear()
+                    return
+
+    def sync(self, text: str, record: bool = True):
+        """Adopt a new text; returns the changed span or None
+
+        ``record=False`` is for text that did not come from this editor
+        (merged or remote edits), which is not offered for undo.
+        """
+        with self.lock:
+            span = diff_span(self.text, text)
+            if span is None:
+                return None
+            pos, removed_len, inserted = span
+            removed = self._text[pos:pos + removed_len]
+            self._apply(pos, removed_len, inserted, text)
+            if record:
+                self._record(pos, removed, inserted)
+            else:
+                self._move_history(pos, removed_len, inserted)
+            return span
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def undo(self):
+        """Revert the last edit; returns the new text or None"""
+        with self.lock:
+            if not self._undo:
+                return None
+            entry = self._undo.pop()
+            pos, removed, inserted = entry
+            self._apply(pos, len(inserted), removed)
+            self._redo.append(entry)
+            self._group = None
+            return self.text
+
+    def redo(self):
+        """Re-apply the last undone edit; returns the new text or None"""
+        with self.lock:
+            if not self._redo:
+                return None
+            entry = self._redo.pop()
+            pos, removed, inserted = entry
+            self._apply(pos, len(removed), inserted)
+            self._undo.append(entry)
+            self._group = None
+            return self.text
+
+    @property
+    def modified(self) -> bool:
+        """Whether the text changed since the last ``take_change``"""
+        return self._dirty is not None
+
+    def take_change(self):
+        """Return and clear the change since the last call
+
+        Returns ``(base, pos, removed_len, inserted, text)``: replacing
+        removed_len characters of base at pos with inserted gives text, the
+        current content. Returns None if nothing changed.
+        """
+        with self.lock:
+            if self._dirty is None:
+                return None
+            base, text = self._base, self.text
+            pos, tail = self._dirty
+            removed_len = len(base) - pos - tail
+            inserted = text[pos:len(text) - tail]
+            self._base = text
+            self._dirty = None
+            return base, pos, removed_len, inserted, text
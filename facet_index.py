@@ -0,0 +1,255 @@
+import re
+from pathlib import Path
+
+from persisted_index import PersistedIndex, strip_code
+
+# Inline #tags: not headings ("# Title"), not URL fragments or colors in words
+TAG_RE = re.compile(r"(?<![\w#&/])#([^\W\d][\w/-]*)")
+FIELD_RE = re.compile(r"^([A-Za-z_][\w-]*)\s*:\s*(.*)$")
+# Facet terms in a search query: #tag and field:value
+QUERY_TAG_RE = re.compile(r"^#([^\W\d][\w/-]*)$")
+QUERY_FIELD_RE = re.compile(r"^([A-Za-z_][\w-]*):(.+)$")
+
+# Frontmatter fields whose values are tags
+TAG_FIELDS = ("tags", "tag")
+
+FORMAT_VERSION = 3
+
+
+def _scalar(value: str) -> str:
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        value = value[1:-1]
+    return value.strip()
+
+
+def _values(value: str):
+    """Split a frontmatter value: [a, b] or "a, b" lists, else one scalar"""
+    value = value.split(" #", 1)[0].strip()  # trailing YAML comment
+    if value.startswith("[") and value.endswith("]"):
+        return [v for v in (_scalar(v) for v in value[1:-1].split(",")) if v]
+    value = _scalar(value)
+    return [value] if value else []
+
+
+def split_frontmatter(content: str):
+    """Return (frontmatter lines, body); no frontmatter gives ([], content)"""
+    if not content.startswith("---"):
+        return [], content
+    lines = content.split("\n")
+    if lines[0].strip() != "---":
+        return [], content
+    for i in range(1, len(lines)):
+        if lines[i].strip() in ("---", "..."):
+            return lines[1:i], "\n".join(lines[i + 1:])
+    return [], content
+
+
+def parse_frontmatter(lines):
+    """Parse the flat YAML subset used in note frontmatter
+
+    Supports ``key: value``, ``key: [a, b]`` and block lists of ``- item``
+    lines under ``key:``. Nested mappings are ignored. Returns
+    field -> list of values.
+    """
+    fields = {}
+    key = None
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if key is not None and stripped.startswith("- ") and line[:1] in (" ", "-"):
+            value = _scalar(stripped[2:])
+            if value:
+                fields.setdefault(key, []).append(value)
+            continue
+        if line[:1].isspace():
+            continue  # Nested mapping
+        match = FIELD_RE.match(stripped)
+        if match is None:
+            key = None
+            continue
+        key = match.group(1).lower()
+        fields.setdefault(key, []).extend(_values(match.group(2)))
+    return fields
+
+
+def extract_metadata(content: str):
+    """Return (tags, fields) of a note
+
+    Tags come from inline ``#tags`` outside code and from the ``tags``
+    frontmatter field; fields map each other frontmatter key to its set of
+    values. Tags and values are case-folded so facets match regardless of
+    case.
+    """
+    lines, body = split_frontmatter(content)
+    fields = {}
+    tags = set()
+    for key, values in parse_frontmatter(lines).items():
+        values = {v.casefold() for v in values}
+        if key in TAG_FIELDS:
+            tags.update(v.lstrip("#") for v in values)
+        elif values:
+            fields[key] = values
+    text = strip_code(body)
+    tags.update(m.group(1).casefold() for m in TAG_RE.finditer(text))
+    tags.discard("")
+    return tags, fields
+
+
+def parse_facet_query(query: str, known_fields=()):
+    """Split a search query into (text, tags, fields)
+
+    ``#tag`` terms become tag filters and ``field:value`` terms field
+    filters when the field is one of ``known_fields``; everything else is
+    left as the full-text query.
+    """
+    text = []
+    tags = set()
+    fields = {}
+    for term in query.split():
+        match = QUERY_TAG_RE.match(term)
+        if match:
+            tags.add(match.group(1).casefold())
+            continue
+        match = QUERY_FIELD_RE.match(term)
+        if match and match.group(1).lower() in known_fields:
+            fields.setdefault(match.group(1).lower(), set()).add(_scalar(match.group(2)).casefold())
+            continue
+        text.append(term)
+    return " ".join(text), tags, fields
+
+
+class FacetIndex(PersistedIndex):
+    """Tag and frontmatter facets of every note
+
+    Keeps tag -> notes and field -> value -> notes, so the file list can be
+    filtered by any combination of tags and fields by intersecting sets,
+    without reading note bodies. A save re-extracts that note's metadata and
+    updates only the postings that changed.
+
+    When ``path`` is set each note's facets are persisted there (see
+    PersistedIndex); postings are rebuilt from them on load.
+    """
+
+    format_version = FORMAT_VERSION
+    description = "facet index"
+
+    def __init__(self, path: Path = None):
+        super().__init__(path)
+        self._notes = {}  # name -> (tags, fields)
+        self._tags = {}
+        self._fields = {}
+
+    def __len__(self) -> int:
+        return len(self._notes)
+
+    def tags(self):
+        """Return (tag, note count) pairs, most used first"""
+        with self._lock:
+            return sorted(((tag, len(names)) for tag, names in self._tags.items()),
+                          key=lambda item: (-item[1], item[0]))
+
+    def fields(self):
+        """Return the frontmatter field names in use, sorted"""
+        with self._lock:
+            return sorted(self._fields)
+
+    def values(self, field: str):
+        """Return (value, note count) pairs of one field, most used first"""
+        with self._lock:
+            values = self._fields.get(field.lower(), {})
+            return sorted(((value, len(names)) for value, names in values.items()),
+                          key=lambda item: (-item[1], item[0]))
+
+    def metadata(self, name: str):
+        """Return a note's (tags, fields) as indexed"""
+        with self._lock:
+            tags, fields = self._notes.get(name, ((), ()))
+            return set(tags), {key: set(values) for key, values in fields}
+
+    def filter(self, tags=(), fields=None):
+        """Return the names of notes having all tags and, per field, one of its values"""
+        with self._lock:
+            sets = [self._tags.get(tag.casefold(), set()) for tag in tags]
+            for field, values in (fields or {}).items():
+                postings = self._fields.get(field.lower(), {})
+                if isinstance(values, str):
+                    values = (values,)
+                matching = [postings.get(v.casefold(), set()) for v in values]
+                sets.append(set().union(*matching) if len(matching) != 1 else matching[0])
+            if not sets:
+                return set()
+            sets.sort(key=len)
+            return set(sets[0]).intersection(*sets[1:])
+
+    def _parse(self, content: str):
+        tags, fields = extract_metadata(content)
+        return frozenset(tags), tuple(sorted((k, frozenset(v)) for k, v in fields.items()))
+
+    def _index(self, name: str, entry, version):
+        """Update only the postings that changed"""
+        self._set_entry(name, entry)
+        self._dirty = self._dirty or version != self._versions.get(name, ())
+        self._versions[name] = version
+
+    def _unindex(self, name: str):
+        old = self._notes.get(name)
+        if old is not None:
+            self._drop_postings(name, *old)
+
+    def _set_entry(self, name: str, entry):
+        old = self._notes.get(name)
+        if old == entry:
+            return
+        if old is not None:
+            self._drop_postings(name, *old)
+        self._add_postings(name, *entry)
+        self._dirty = True
+
+    def _add_postings(self, name: str, tags, fields):
+        self._notes[name] = (tags, fields)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(name)
+        for field, values in fields:
+            postings = self._fields.setdefault(field, {})
+            for value in values:
+                postings.setdefault(value, set()).add(name)
+
+    def _drop_postings(self, name: str, tags, fields):
+        del self._notes[name]
+        for tag in tags:
+            names = self._tags.get(tag)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self._tags[tag]
+        for field, values in fields:
+            postings = self._fields.get(field, {})
+            for value in values:
+                names = postings.get(value)
+                if names is not None:
+                    names.discard(name)
+                    if not names:
+                        del postings[value]
+            if not postings:
+                self._fields.pop(field, None)
+
+    def _entries(self) -> dict:
+        return dict(self._notes)
+
+    def _encode(self, entry):
+        tags, fields = entry
+        return [sorted(tags), {field: sorted(values) for field, values in fields}]
+
+    def _clear(self):
+        self._notes = {}
+        self._tags = {}
+        self._fields = {}
+
+    def _load_entry(self, name: str, data):
+        if data is not None:
+            tags, fields = data
+            self._add_postings(name, frozenset(tags), tuple(
+                (field, frozenset(values)) for field, values in sorted(fields.items())
+            ))
@@ -0,0 +1,468 @@
+import asyncio
+import heapq
+import itertools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class FakeClientStorage:
+    """In-memory stand-in for ``page.client_storage`` that logs every call
+
+    ``calls`` holds ``(operation, key, size)`` tuples, where size is the
+    JSON-encoded size of the value read or written, like on the wire. With
+    ``record`` False only the totals are kept.
+    """
+
+    def __init__(self, data: dict = None, record: bool = True):
+        self.data = dict(data or {})
+        self.record = record
+        self.calls = []
+        self.call_count = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def _log(self, operation: str, key: str, value=None) -> int:
+        size = len(json.dumps(value, default=str)) if value is not None else 0
+        self.call_count += 1
+        if self.record:
+            self.calls.append((operation, key, size))
+        return size
+
+    def count(self, operation: str = None) -> int:
+        """Number of recorded calls, optionally of one operation"""
+        return sum(1 for call in self.calls if operation is None or call[0] == operation)
+
+    def get(self, key: str):
+        value = self.data.get(key)
+        self.bytes_read += self._log("get", key, value)
+        return value
+
+    def set(self, key: str, value) -> bool:
+        self.bytes_written += self._log("set", key, value)
+        self.data[key] = value
+        return True
+
+    def contains_key(self, key: str) -> bool:
+        self._log("contains_key", key)
+        return key in self.data
+
+    def remove(self, key: str) -> bool:
+        self._log("remove", key)
+        return self.data.pop(key, None) is not None
+
+    def get_keys(self, key_prefix: str):
+        self._log("get_keys", key_prefix)
+        return [key for key in self.data if key.startswith(key_prefix)]
+
+    def clear(self) -> bool:
+        self._log("clear", "")
+        self.data.clear()
+        return True
+
+    async def get_async(self, key: str):
+        return self.get(key)
+
+    async def set_async(self, key: str, value) -> bool:
+        return self.set(key, value)
+
+    async def contains_key_async(self, key: str) -> bool:
+        return self.contains_key(key)
+
+    async def remove_async(self, key: str) -> bool:
+        return self.remove(key)
+
+
+class FakePubSubHub:
+    """Topic subscriptions shared by the FakePages of one process"""
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self):
+        self._subscribers = {}  # session id -> handler
+        self._topics = {}  # topic -> {session id: handler}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> "FakePubSubHub":
+        """Return the process-wide hub, creating it on first use"""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def _handlers(self, topic, exclude):
+        with self._lock:
+            handlers = self._topics.get(topic, {}) if topic is not None else self._subscribers
+            return [h for session, h in handlers.items() if session != exclude]
+
+
+class FakePubSub:
+    """``page.pubsub`` for one FakePage; messages are delivered synchronously"""
+
+    def __init__(self, hub: FakePubSubHub, session_id: str):
+        self.hub = hub
+        self.session_id = session_id
+
+    def subscribe(self, handler):
+        with self.hub._lock:
+            self.hub._subscribers[self.session_id] = handler
+
+    def subscribe_topic(self, topic: str, handler):
+        with self.hub._lock:
+            self.hub._topics.setdefault(topic, {})[self.session_id] = handler
+
+    def unsubscribe(self):
+        with self.hub._lock:
+            self.hub._subscribers.pop(self.session_id, None)
+
+    def unsubscribe_topic(self, topic: str):
+        with self.hub._lock:
+            self.hub._topics.get(topic, {}).pop(self.session_id, None)
+
+    def unsubscribe_all(self):
+        with self.hub._lock:
+            self.hub._subscribers.pop(self.session_id, None)
+            for handlers in self.hub._topics.values():
+                handlers.pop(self.session_id, None)
+
+    def send_all(self, message):
+        self._deliver(self.hub._handlers(None, None), message)
+
+    def send_others(self, message):
+        self._deliver(self.hub._handlers(None, self.session_id), message)
+
+    def send_all_on_topic(self, topic: str, message):
+        self._deliver(self.hub._handlers(topic, None), message, topic)
+
+    def send_others_on_topic(self, topic: str, message):
+        self._deliver(self.hub._handlers(topic, self.session_id), message, topic)
+
+    def _deliver(self, handlers, message, topic=None):
+        for handler in handlers:
+            try:
+                handler(message) if topic is None else handler(topic, message)
+            except Exception as e:
+                print(f"Error in pubsub handler: {e}")
+
+
+def control_state(control) -> dict:
+    """Return a control's own properties as they would be sent to the client"""
+    attrs = getattr(control, "_Control__attrs", None)
+    if isinstance(attrs, dict):
+        # Flet keeps properties as (value, dirty) pairs
+        return {name: value[0] for name, value in attrs.items()}
+    return {
+        name: value for name, value in vars(control).items()
+        if not name.startswith("_") and name != "page"
+        and isinstance(value, (str, int, float, bool, type(None)))
+    }
+
+
+def control_children(control):
+    children = getattr(control, "_get_children", None)
+    if callable(children):
+        return list(children() or ())
+    # Plain objects standing in for controls
+    found = list(getattr(control, "controls", None) or ())
+    content = getattr(control, "content", None)
+    if content is not None and hasattr(content, "__dict__"):
+        found.append(content)
+    return found
+
+
+class UpdateRecord:
+    """What one ``page.update()`` would have sent
+
+    ``changed`` maps each control whose properties changed to
+    ``{name: (old, new)}``; ``added`` and ``removed`` list controls that
+    appeared in or left the updated subtrees. ``bytes`` is the JSON size
+    of the changed and added properties.
+    """
+
+    __slots__ = ("timestamp", "roots", "added", "removed", "changed", "bytes")
+
+    def __init__(self, timestamp: float, roots):
+        self.timestamp = timestamp
+        self.roots = roots
+        self.added = []
+        self.removed = []
+        self.changed = {}
+        self.bytes = 0
+
+    def __repr__(self):
+        return (f"UpdateRecord(added={len(self.added)}, removed={len(self.removed)}, "
+                f"changed={len(self.changed)}, bytes={self.bytes})")
+
+
+class FakePage:
+    """Headless stand-in for ``ft.Page`` to drive an app without a client
+
+    Controls passed to ``add``/``update`` are attached to the page (so
+    ``control.update()`` works) and each update is diffed against the
+    state last seen for those controls, so ``update_records`` shows what
+    Flet would have sent: changed properties, added and removed controls
+    and an estimate of the payload bytes. Set ``record_updates`` to False
+    to keep only the totals (``updates``, ``update_bytes``).
+
+    Client storage calls are logged by FakeClientStorage; dialogs, snack
+    bars and ``open``/``close`` calls are appended to ``events``.
+    ``run_task`` runs coroutines on one event loop thread shared by all
+    fake pages, like Flet's own loop. ``wait_for`` blocks until a
+    condition holds, and ``wait_idle`` until no task started with
+    ``run_task`` is running.
+    """
+
+    _session_ids = itertools.count(1)
+    _loop = None
+    _loop_lock = threading.Lock()
+
+    def __init__(self, client_storage: dict = None, hub: FakePubSubHub = None,
+                 record_updates: bool = True):
+        self.session_id = f"fake-{next(self._session_ids)}"
+        self.title = ""
+        self.padding = None
+        self.theme_mode = None
+        self.appbar = None
+        self._dialog = None
+        self.on_close = None
+        self.on_keyboard_event = None
+        self.controls = []
+        self.overlay = []
+        self.client_storage = FakeClientStorage(client_storage, record=record_updates)
+        self.pubsub = FakePubSub(hub or FakePubSubHub.default(), self.session_id)
+        self.record_updates = record_updates
+        self.update_records = []
+        self.updates = 0
+        self.updated_controls = 0
+        self.update_bytes = 0
+        self.events = []
+        self.snack_bars = []
+        self.launched_urls = []
+        self._states = {}  # id(control) -> (control, properties, child ids)
+        self._tasks = set()
+        self._cond = threading.Condition()
+
+    @classmethod
+    def loop(cls) -> asyncio.AbstractEventLoop:
+        """Return the shared event loop, starting its thread on first use"""
+        with cls._loop_lock:
+            if cls._loop is None:
+                cls._loop = asyncio.new_event_loop()
+                threading.Thread(target=cls._loop.run_forever, daemon=True).start()
+            return cls._loop
+
+    # -- Updates ---------------------------------------------------------------
+
+    def _diff(self, control, record: UpdateRecord):
+        try:
+            control.page = self
+        except AttributeError:
+            pass
+        state = control_state(control)
+        children = control_children(control)
+        child_ids = [id(child) for child in children]
+        old = self._states.get(id(control))
+        if old is None:
+            record.added.append(control)
+            record.bytes += len(json.dumps(state, default=str))
+        else:
+            changes = {
+                name: (old[1].get(name), value)
+                for name, value in state.items() if old[1].get(name) != value
+            }
+            if changes:
+                record.changed[control] = changes
+                record.bytes += len(json.dumps({k: v[1] for k, v in changes.items()}, default=str))
+            gone = set(old[2]).difference(child_ids)
+            for child_id in gone:
+                self._forget(child_id, record)
+        self._states[id(control)] = (control, state, child_ids)
+        for child in children:
+            self._diff(child, record)
+
+    def _forget(self, control_id: int, record: UpdateRecord):
+        entry = self._states.pop(control_id, None)
+        if entry is None:
+            return
+        record.removed.append(entry[0])
+        for child_id in entry[2]:
+            self._forget(child_id, record)
+
+    def add(self, *controls):
+        self.controls.extend(controls)
+        self.update()
+
+    def update(self, *controls):
+        roots = controls or tuple(self.controls) + tuple(self.overlay)
+        record = UpdateRecord(time.monotonic(), roots)
+        with self._cond:
+            for control in roots:
+                self._diff(control, record)
+            self.updates += 1
+            self.updated_controls += len(record.added) + len(record.changed)
+            self.update_bytes += record.bytes
+            if self.record_updates:
+                self.update_records.append(record)
+            self._cond.notify_all()
+        return record
+
+    # -- Tasks -----------------------------------------------------------------
+
+    def run_task(self, handler, *args):
+        future = asyncio.run_coroutine_threadsafe(handler(*args), self.loop())
+        with self._cond:
+            self._tasks.add(future)
+        future.add_done_callback(self._task_done)
+        return future
+
+    def _task_done(self, future):
+        with self._cond:
+            self._tasks.discard(future)
+            self._cond.notify_all()
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Error in task: {future.exception()!r}")
+
+    def wait_for(self, predicate, timeout: float = 10.0, poll: float = 0.05) -> bool:
+        """Wait until ``predicate()`` is true; returns False on timeout
+
+        The predicate is checked after every update and finished task, and
+        every ``poll`` seconds for changes that send no update.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not predicate():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(min(remaining, poll))
+            return True
+
+    def wait_idle(self, timeout: float = 10.0) -> bool:
+        """Wait until every task started with run_task has finished"""
+        return self.wait_for(lambda: not self._tasks, timeout)
+
+    # -- Dialogs and other page operations -------------------------------------
+
+    @property
+    def dialog(self):
+        return self._dialog
+
+    @dialog.setter
+    def dialog(self, dialog):
+        self.events.append(("dialog", dialog))
+        self._dialog = dialog
+
+    def open(self, control):
+        self.events.append(("open", control))
+        control.open = True
+        if control not in self.overlay:
+            self.overlay.append(control)
+        self.update()
+
+    def close(self, control):
+        self.events.append(("close", control))
+        control.open = False
+        self.update()
+
+    def disconnect(self):
+        """Simulate the session ending"""
+        if self.on_close is not None:
+            self.on_close(None)
+        self.pubsub.unsubscribe_all()
+
+    def show_snack_bar(self, snack_bar):
+        self.events.append(("snack_bar", snack_bar))
+        self.snack_bars.append(snack_bar)
+
+    async def launch_url_async(self, url: str, **kwargs):
+        self.events.append(("launch_url", url))
+        self.launched_urls.append(url)
+
+    def launch_url(self, url: str, **kwargs):
+        self.events.append(("launch_url", url))
+        self.launched_urls.append(url)
+
+
+class FakeEvent:
+    """Minimal ``ft.ControlEvent`` passed to simulated handlers"""
+
+    def __init__(self, control, name: str, data=None, page=None):
+        self.control = control
+        self.target = control
+        self.name = name
+        self.data = data
+        self.page = page
+
+
+class TypingSimulator:
+    """Types text into text fields at a fixed rate, for one or many sessions
+
+    Each keystroke appends a character to the field's ``value`` and calls
+    its ``on_change`` handler the way Flet would: sync handlers on a
+    thread pool of ``workers`` threads (or inline with ``workers=0``),
+    async handlers as tasks on the page. Keystrokes of all sessions are
+    scheduled by due time on the calling thread, so a thousand sessions
+    need no thousand threads. ``lag`` records how late each keystroke was
+    dispatched, which grows once the handlers saturate the process.
+    """
+
+    def __init__(self, keys_per_second: float = 5.0, workers: int = 0):
+        self.keys_per_second = keys_per_second
+        self.workers = workers
+        self.keystrokes = 0
+        self.lag = []
+        self._queue = []
+        self._seq = itertools.count()
+
+    def add(self, page: FakePage, field, text: str, delay: float = 0.0, handler=None):
+        """Queue text to be typed into field, starting ``delay`` seconds after run()"""
+        self._queue.append((delay, next(self._seq), page, field, text, handler))
+
+    def run(self) -> dict:
+        """Type everything queued; returns totals and dispatch lag in seconds"""
+        interval = 1.0 / self.keys_per_second
+        start = time.monotonic()
+        heap = []
+        for delay, seq, page, field, text, handler in self._queue:
+            if text:
+                heapq.heappush(heap, (start + delay, seq, page, field, text, 0, handler))
+        self._queue = []
+        executor = ThreadPoolExecutor(self.workers) if self.workers else None
+        pending = []
+        try:
+            while heap:
+                due, seq, page, field, text, i, handler = heapq.heappop(heap)
+                now = time.monotonic()
+                if due > now:
+                    time.sleep(due - now)
+                    now = time.monotonic()
+                self.lag.append(now - due)
+                field.value = (field.value or "") + text[i]
+                on_change = handler or field.on_change
+                event = FakeEvent(field, "change", field.value, page)
+                if on_change is None:
+                    pass
+                elif asyncio.iscoroutinefunction(on_change):
+                    pending.append(page.run_task(on_change, event))
+                elif executor is not None:
+                    pending.append(executor.submit(on_change, event))
+                else:
+                    on_change(event)
+                self.keystrokes += 1
+                if i + 1 < len(text):
+                    heapq.heappush(heap, (due + interval, seq, page, field, text, i + 1, handler))
+            for future in pending:
+                future.result()
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        lag = sorted(self.lag)
+        return {
+            "keystrokes": self.keystrokes,
+            "elapsed": time.monotonic() - start,
+            "lag_median": lag[len(lag) // 2] if lag else 0.0,
+            "lag_max": lag[-1] if lag else 0.0,
+        }
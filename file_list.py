@@ -0,0 +1,210 @@
+import threading
+
+import flet as ft
+
+
+class FileListReconciler:
+    """Keeps a ListView's controls in sync with a keyed list of items
+
+    Controls are created once per key and reused. Each sync computes which
+    keys were inserted, removed or moved and which existing rows need a
+    restyle, and then sends only those controls instead of rebuilding the
+    whole list. Changing the selection touches at most two rows.
+
+    ``create_item(item, selected)`` builds a new row control and
+    ``restyle_item(control, item, selected)`` mutates an existing one in place.
+    Optional ``leading``/``trailing`` controls are kept around the rows.
+    """
+
+    def __init__(self, list_view, create_item, restyle_item, placeholder=None,
+                 leading=None, trailing=None):
+        self.list_view = list_view
+        self.create_item = create_item
+        self.restyle_item = restyle_item
+        self.placeholder = placeholder
+        self.leading = leading
+        self.trailing = trailing
+        self.selected_key = None
+        self._order = []
+        self._controls = {}
+        self._items = {}
+        self._states = {}
+        self._lock = threading.RLock()
+
+    def __contains__(self, key) -> bool:
+        return key in self._controls
+
+    def control_for(self, key):
+        """Get the row control for a key, or None"""
+        return self._controls.get(key)
+
+    def sync(self, entries, selected_key=None):
+        """Reconcile the list with ``entries`` and push the minimal update
+
+        ``entries`` is an ordered iterable of ``(key, item, version)`` tuples;
+        a row is restyled only when its version or selection state changes.
+        Returns True if rows were inserted, removed or moved.
+        """
+        with self._lock:
+            self.selected_key = selected_key
+            order = []
+            dirty = []
+            seen = set()
+
+            for key, item, version in entries:
+                order.append(key)
+                seen.add(key)
+                self._items[key] = item
+                state = (version, key == selected_key)
+                control = self._controls.get(key)
+                if control is None:
+                    self._controls[key] = self.create_item(item, state[1])
+                elif self._states.get(key) != state:
+                    self.restyle_item(control, item, state[1])
+                    dirty.append(control)
+                self._states[key] = state
+
+            for key in list(self._controls):
+                if key not in seen:
+                    del self._controls[key]
+                    self._items.pop(key, None)
+                    self._states.pop(key, None)
+
+            structure_changed = order != self._order or not self.list_view.controls
+            if structure_changed:
+                self._order = order
+                if order:
+                    rows = [self._controls[k] for k in order]
+                    if self.leading is not None:
+                        rows.insert(0, self.leading)
+                    if self.trailing is not None:
+                        rows.append(self.trailing)
+                    self.list_view.controls = rows
+                elif self.placeholder is not None:
+                    self.list_view.controls = [self.placeholder]
+                else:
+                    self.list_view.controls = []
+
+            self._push(structure_changed, dirty)
+            return structure_changed
+
+    def select(self, key):
+        """Move the selection highlight, restyling only the affected rows"""
+        with self._lock:
+            previous = self.selected_key
+            if previous == key:
+                return
+            self.selected_key = key
+            dirty = []
+            for k, selected in ((previous, False), (key, True)):
+                control = self._controls.get(k)
+                if control is None:
+                    continue
+                self.restyle_item(control, self._items[k], selected)
+                self._states[k] = (self._states[k][0], selected)
+                dirty.append(control)
+            self._push(False, dirty)
+
+    def _push(self, structure_changed, dirty):
+        if self.list_view.page is None:
+            return  # Not mounted yet; the first page.update() will send it
+        if structure_changed:
+            # ListView diffing sends only added/removed/moved children plus
+            # the restyled rows
+            self.list_view.update()
+        else:
+            for control in dirty:
+                control.update()
+
+
+class VirtualFileList:
+    """Virtualized file list that only builds rows in or near the viewport
+
+    Items come from an already sorted sequence (e.g. ``NoteIndex.notes()``)
+    and every row has the same fixed extent, so the visible range follows
+    from the scroll offset alone. Rows are materialized one page at a time
+    (previous, current and next page around the viewport) and spacer
+    containers stand in for everything else, so the number of live controls
+    per session does not depend on the number of notes.
+
+    ``entry(item)`` maps an item to the ``(key, item, version)`` tuple used by
+    FileListReconciler. Rows built by ``create_item`` must have a fixed
+    height of ``item_extent`` (including any margin); the ListView should
+    use ``spacing=0``.
+    """
+
+    def __init__(self, list_view, create_item, restyle_item, entry, item_extent,
+                 placeholder=None, page_size=50, viewport=800):
+        self.list_view = list_view
+        self.entry = entry
+        self.item_extent = item_extent
+        self.page_size = page_size
+        self.viewport = viewport
+        self.offset = 0.0
+        self._items = []
+        self._range = None
+        self._top = ft.Container(height=0)
+        self._bottom = ft.Container(height=0)
+        self.rows = FileListReconciler(
+            list_view,
+            create_item=create_item,
+            restyle_item=restyle_item,
+            placeholder=placeholder,
+            leading=self._top,
+            trailing=self._bottom,
+        )
+        list_view.on_scroll = self._on_scroll
+        list_view.on_scroll_interval = 50
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def selected_key(self):
+        return self.rows.selected_key
+
+    def set_items(self, items, selected_key=None):
+        """Replace the sorted item sequence and render the current window"""
+        with self.rows._lock:
+            self._items = items
+            self.rows.selected_key = selected_key
+            self._render()
+
+    def select(self, key):
+        """Move the selection; rows outside the window pick it up when shown"""
+        self.rows.select(key)
+
+    def window(self):
+        """Return the ``[start, end)`` slice of items that should be built"""
+        count = len(self._items)
+        first = min(int(self.offset // self.item_extent), max(count - 1, 0))
+        visible = int(self.viewport // self.item_extent) + 1
+        page = first // self.page_size
+        start = max(0, (page - 1) * self.page_size)
+        end = min(count, (page + 2) * self.page_size + visible)
+        return start, end
+
+    def _on_scroll(self, e):
+        self.offset = e.pixels
+        if e.viewport_dimension:
+            self.viewport = e.viewport_dimension
+        with self.rows._lock:
+            if self.window() != self._range:
+                self._render()
+
+    def _render(self):
+        start, end = self.window()
+        self._range = (start, end)
+        top = start * self.item_extent
+        bottom = (len(self._items) - end) * self.item_extent
+        spacers_changed = (top, bottom) != (self._top.height, self._bottom.height)
+        self._top.height = top
+        self._bottom.height = bottom
+
+        structure_changed = self.rows.sync(
+            (self.entry(item) for item in self._items[start:end]),
+            selected_key=self.rows.selected_key,
+        )
+        if spacers_changed and not structure_changed and self.list_view.page is not None:
+            self._top.update()
+            self._bottom.update()
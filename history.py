@@ -0,0 +1,382 @@
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+from document import diff_span
+
+SNAPSHOT = 0
+DELTA = 1
+
+# History file header: magic and format version
+FILE_HEADER = struct.Struct("<4sH")
+MAGIC = b"NHST"
+FORMAT_VERSION = 1
+
+# Record header: timestamp, kind, note length, payload length, crc32 of payload
+RECORD = struct.Struct("<dBQII")
+
+# Delta payload prefix (before compression): position and removed length,
+# then the inserted text
+SPAN = struct.Struct("<QQ")
+
+
+class Revision:
+    """One stored revision: a compressed snapshot or a delta to the previous one"""
+
+    __slots__ = ("timestamp", "kind", "payload", "length")
+
+    def __init__(self, timestamp: float, kind: int, payload: bytes, length: int):
+        self.timestamp = timestamp
+        self.kind = kind
+        self.payload = payload
+        self.length = length
+
+    def to_record(self) -> bytes:
+        return RECORD.pack(self.timestamp, self.kind, self.length, len(self.payload),
+                           zlib.crc32(self.payload)) + self.payload
+
+
+class _NoteHistory:
+    """Revisions of one note plus the state needed to append the next one"""
+
+    __slots__ = ("revisions", "last", "since_snapshot", "pending", "last_recorded",
+                 "lock", "loaded", "evicted")
+
+    def __init__(self):
+        self.revisions = []
+        self.last = None
+        self.since_snapshot = 0
+        self.pending = None
+        self.last_recorded = 0.0
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.evicted = False
+
+
+class RevisionHistory:
+    """Per-note revision history stored as snapshots plus span deltas
+
+    Each revision is either a zlib-compressed snapshot or the single span
+    (position, removed length, inserted text) that changed since the
+    previous revision, so storage grows with the size of the edits. A
+    snapshot is taken every ``snapshot_every`` revisions, or when a delta
+    would be about as large as the note, so rebuilding any revision applies
+    at most that many deltas.
+
+    Saves closer together than ``min_interval`` seconds are coalesced into
+    one revision. A background compactor applies the retention settings
+    (``max_revisions`` per note, ``max_age`` seconds) and rewrites each
+    history file with its oldest kept revision as a snapshot.
+
+    With ``directory`` set, each note's history is an append-only file of
+    checksummed binary records in that directory, and at most
+    ``max_cached`` notes' histories are kept in memory (least recently used
+    first out); otherwise all history is kept in memory. Each note has its
+    own lock, so recording one note never waits for another's file I/O.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, directory: Path = None, snapshot_every: int = 20,
+                 max_revisions: int = 500, max_age: float = 90 * 24 * 3600,
+                 min_interval: float = 60.0, max_cached: int = 256):
+        self.directory = Path(directory) if directory else None
+        if self.directory:
+            self.directory.mkdir(exist_ok=True)
+        self.snapshot_every = snapshot_every
+        self.max_revisions = max_revisions
+        self.max_age = max_age
+        self.min_interval = min_interval
+        self.max_cached = max_cached
+        self._notes = OrderedDict()
+        self._lock = threading.Lock()  # Guards _notes only
+        self._compactor = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def shared(cls, directory: Path, **kwargs) -> "RevisionHistory":
+        """Return the process-wide history for a directory, with its compactor running"""
+        key = Path(directory).resolve()
+        with cls._shared_lock:
+            history = cls._shared.get(key)
+            if history is None:
+                history = cls(directory, **kwargs)
+                history.start_compactor()
+                cls._shared[key] = history
+            return history
+
+    def _path(self, name: str) -> Path:
+        return self.directory / f"{name}.hist"
+
+    @contextmanager
+    def _note(self, name: str):
+        """Lock a note's history, loading it from its file if needed"""
+        while True:
+            with self._lock:
+                note = self._notes.get(name)
+                if note is None:
+                    note = _NoteHistory()
+                    self._notes[name] = note
+                else:
+                    self._notes.move_to_end(name)
+            note.lock.acquire()
+            if not note.evicted:
+                break
+            note.lock.release()  # Evicted meanwhile; look it up again
+        try:
+            if not note.loaded:
+                self._load(name, note)
+            yield note
+        finally:
+            note.lock.release()
+        self._evict()
+
+    def _load(self, name: str, note: _NoteHistory):
+        note.loaded = True
+        if not self.directory:
+            return
+        note.revisions = self._read_file(self._path(name))
+        if note.revisions:
+            note.last_recorded = note.revisions[-1].timestamp
+            note.last = self._build(note.revisions, len(note.revisions) - 1)
+            note.since_snapshot = next(
+                i for i, rev in enumerate(reversed(note.revisions)) if rev.kind == SNAPSHOT
+            )
+
+    def _evict(self):
+        """Drop least recently used histories beyond max_cached (kept on disk)"""
+        if not self.directory:
+            return
+        with self._lock:
+            excess = len(self._notes) - self.max_cached
+            if excess <= 0:
+                return
+            for name, note in list(self._notes.items()):
+                if excess <= 0:
+                    break
+                if self._drop_locked(name, note):
+                    excess -= 1
+
+    def _drop_locked(self, name: str, note: _NoteHistory) -> bool:
+        """Drop an idle cached history; the caller holds ``_lock``"""
+        # Skip notes in use or with a coalesced save not yet written
+        if note.pending is not None or not note.lock.acquire(blocking=False):
+            return False
+        try:
+            if note.pending is not None:
+                return False
+            note.evicted = True
+            del self._notes[name]
+            return True
+        finally:
+            note.lock.release()
+
+    def _read_file(self, path: Path):
+        """Read a history file, dropping a torn record at the end"""
+        revisions = []
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return revisions
+        if not data:
+            return revisions
+        if (len(data) < FILE_HEADER.size
+                or FILE_HEADER.unpack_from(data) != (MAGIC, FORMAT_VERSION)):
+            # Unknown or older format: keep the file aside and start afresh
+            print(f"History {path.name} has an unsupported format; moving it aside")
+            os.replace(path, path.with_name(path.name + ".old"))
+            return revisions
+        offset = FILE_HEADER.size
+        while offset < len(data):
+            if offset + RECORD.size > len(data):
+                break
+            timestamp, kind, length, payload_len, crc = RECORD.unpack_from(data, offset)
+            start = offset + RECORD.size
+            payload = data[start:start + payload_len]
+            if len(payload) != payload_len or zlib.crc32(payload) != crc:
+                break
+            revisions.append(Revision(timestamp, kind, payload, length))
+            offset = start + payload_len
+        if offset < len(data):
+            print(f"Error reading history {path.name}; dropping its tail")
+            with open(path, "ab") as out:
+                out.truncate(offset)
+        return revisions
+
+    def _build(self, revisions, index: int) -> str:
+        """Rebuild a revision from the nearest snapshot at or before it"""
+        start = index
+        while revisions[start].kind != SNAPSHOT:
+            start -= 1
+        content = zlib.decompress(revisions[start].payload).decode("utf-8")
+        for rev in revisions[start + 1:index + 1]:
+            span = zlib.decompress(rev.payload)
+            pos, removed_len = SPAN.unpack_from(span)
+            inserted = span[SPAN.size:].decode("utf-8")
+            content = content[:pos] + inserted + content[pos + removed_len:]
+        return content
+
+    def record(self, name: str, content: str, timestamp: float = None):
+        """Record a saved version of a note (coalesced within min_interval)"""
+        now = timestamp if timestamp is not None else time.time()
+        with self._note(name) as note:
+            if content == note.last:
+                note.pending = None  # Back to the recorded version
+                return
+            if note.revisions and now - note.last_recorded < self.min_interval:
+                note.pending = (content, now)
+                return
+            note.pending = None
+            self._append(name, note, content, now)
+
+    def _append(self, name: str, note: _NoteHistory, content: str, timestamp: float):
+        span = diff_span(note.last, content) if note.last is not None else None
+        if (span is None or note.since_snapshot + 1 >= self.snapshot_every
+                or len(span[2]) * 2 >= len(content)):
+            revision = Revision(timestamp, SNAPSHOT, zlib.compress(content.encode("utf-8")), len(content))
+            note.since_snapshot = 0
+        else:
+            pos, removed_len, inserted = span
+            payload = zlib.compress(SPAN.pack(pos, removed_len) + inserted.encode("utf-8"))
+            revision = Revision(timestamp, DELTA, payload, len(content))
+            note.since_snapshot += 1
+        note.revisions.append(revision)
+        note.last = content
+        note.last_recorded = timestamp
+        if self.directory:
+            try:
+                with open(self._path(name), "ab") as f:
+                    if f.tell() == 0:
+                        f.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION))
+                    f.write(revision.to_record())
+            except Exception as e:
+                print(f"Error writing history for {name}: {e}")
+
+    def flush_pending(self, name: str = None, force: bool = False):
+        """Record coalesced saves whose interval has passed (or all, with force)"""
+        now = time.time()
+        with self._lock:
+            names = [name] if name is not None else list(self._notes)
+            notes = [(key, self._notes.get(key)) for key in names]
+        for key, note in notes:
+            if note is None or note.pending is None:
+                continue
+            with note.lock:
+                if note.evicted or note.pending is None:
+                    continue
+                content, timestamp = note.pending
+                if force or now - note.last_recorded >= self.min_interval:
+                    note.pending = None
+                    self._append(key, note, content, timestamp)
+
+    def revisions(self, name: str):
+        """Return ``(index, timestamp, length)`` for each revision, newest first"""
+        with self._note(name) as note:
+            self.flush_pending(name, force=True)
+            return [(i, rev.timestamp, rev.length) for i, rev in reversed(list(enumerate(note.revisions)))]
+
+    def get(self, name: str, index: int) -> str:
+        """Return the content of a revision"""
+        with self._note(name) as note:
+            if not 0 <= index < len(note.revisions):
+                raise IndexError(f"{name} has no revision {index}")
+            return self._build(note.revisions, index)
+
+    def forget(self, name: str):
+        """Drop a note's cached history (its file is kept)"""
+        with self._note(name) as note:
+            self.flush_pending(name, force=True)
+            with self._lock:
+                note.evicted = True
+                self._notes.pop(name, None)
+
+    def compact(self, name: str) -> int:
+        """Apply retention to one note; returns the number of revisions dropped"""
+        with self._note(name) as note:
+            self.flush_pending(name)
+            revisions = note.revisions
+            if not revisions:
+                return 0
+            cutoff = time.time() - self.max_age
+            first = max(0, len(revisions) - self.max_revisions)
+            while first < len(revisions) - 1 and revisions[first].timestamp < cutoff:
+                first += 1
+            if first == 0:
+                return 0
+
+            # Re-base the oldest kept revision as a snapshot
+            oldest = revisions[first]
+            content = self._build(revisions, first)
+            kept = [Revision(oldest.timestamp, SNAPSHOT,
+                             zlib.compress(content.encode("utf-8")), oldest.length)]
+            kept.extend(revisions[first + 1:])
+            note.revisions = kept
+            note.since_snapshot = next(
+                i for i, rev in enumerate(reversed(kept)) if rev.kind == SNAPSHOT
+            )
+            if self.directory:
+                self._rewrite(name, kept)
+            return first
+
+    def _rewrite(self, name: str, revisions):
+        path = self._path(name)
+        tmp = path.with_name(path.name + ".tmp")
+        try:
+            with open(tmp, "wb") as f:
+                f.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION))
+                for rev in revisions:
+                    f.write(rev.to_record())
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"Error compacting history for {name}: {e}")
+
+    def compact_all(self) -> int:
+        """Apply retention to every note with history; returns revisions dropped"""
+        if self.directory:
+            names = {path.name[:-len(".hist")] for path in self.directory.glob("*.hist")}
+        else:
+            names = set()
+        with self._lock:
+            names.update(self._notes)
+        dropped = 0
+        for name in names:
+            with self._lock:
+                cached = name in self._notes
+            dropped += self.compact(name)
+            if not cached:
+                # Loaded only to be compacted
+                with self._lock:
+                    note = self._notes.get(name)
+                    if note is not None:
+                        self._drop_locked(name, note)
+        return dropped
+
+    def start_compactor(self, interval: float = 3600.0):
+        """Flush coalesced saves and apply retention on a daemon thread"""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._stop.clear()
+
+        def run():
+            last_compact = 0.0
+            while not self._stop.wait(min(self.min_interval, interval)):
+                try:
+                    self.flush_pending()
+                    if time.monotonic() - last_compact >= interval:
+                        self.compact_all()
+                        last_compact = time.monotonic()
+                except Exception as e:
+                    print(f"Error compacting history: {e}")
+
+        self._compactor = threading.Thread(target=run, daemon=True)
+        self._compactor.start()
+
+    def stop_compactor(self):
+        """Stop the background compactor"""
+        self._stop.set()
@@ -0,0 +1,338 @@
+import os
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+
+# Record header: flags, name length, body length, crc32 of name + body
+HEADER = struct.Struct("<BIII")
+FLAG_WRITE = 0
+FLAG_DELETE = 1
+FLAG_EDIT = 2
+FLAG_BATCH = 3
+
+# Edit record body prefix: position and removed length (then inserted text)
+EDIT = struct.Struct("<QQ")
+
+# Batch record body: for each note, name and content lengths, then both
+BATCH_ENTRY = struct.Struct("<II")
+
+# Durability modes
+DURABILITY_ALWAYS = "always"      # fsync the journal on every append
+DURABILITY_INTERVAL = "interval"  # fsync at most every fsync_interval seconds
+DURABILITY_OS = "os"              # leave flushing to the operating system
+
+
+def fsync_directory(directory: Path):
+    """Persist a directory entry change (rename/unlink) where supported"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # Not supported on this platform (e.g. Windows)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: Path, content: str, fsync: bool = True):
+    """Replace a file's content via a temp file and rename
+
+    A crash leaves either the old or the new content, never a truncated
+    file.
+    """
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(content)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+    if fsync:
+        fsync_directory(path.parent)
+
+
+class WriteAheadJournal:
+    """Per-notebook write-ahead journal for note saves
+
+    Saves append a checksummed record to the journal instead of rewriting
+    the note. A background thread fsyncs according to ``durability`` and
+    periodically checkpoints the latest content of each note into its file
+    with a temp file plus rename, then truncates the journal. On startup
+    ``replay`` applies any records left over from a crash; a torn record at
+    the end of the journal is ignored.
+
+    ``on_checkpoint(path, content)`` is called for every note written by a
+    checkpoint.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: Path, directory: Path, durability: str = DURABILITY_INTERVAL,
+                 fsync_interval: float = 0.05, checkpoint_interval: float = 5.0,
+                 checkpoint_bytes: int = 8 * 1024 * 1024):
+        if durability not in (DURABILITY_ALWAYS, DURABILITY_INTERVAL, DURABILITY_OS):
+            raise ValueError(f"Unknown durability mode: {durability}")
+        self.path = Path(path)
+        self.directory = Path(directory)
+        self.durability = durability
+        self.fsync_interval = fsync_interval
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_bytes = checkpoint_bytes
+        self.on_checkpoint = None
+        self._latest = {}
+        self._appended = 0  # Records appended so far, to spot appends during a checkpoint
+        self._lock = threading.RLock()
+        self._checkpoint_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._needs_fsync = False
+        self._last_checkpoint = time.monotonic()
+
+        self.replay()
+        self._file = open(self.path, "ab")
+        self._flusher = threading.Thread(target=self._run, daemon=True)
+        self._flusher.start()
+
+    @classmethod
+    def shared(cls, path: Path, directory: Path, **kwargs) -> "WriteAheadJournal":
+        """Return the process-wide journal for a file, replaying it once"""
+        key = Path(path).resolve()
+        with cls._shared_lock:
+            journal = cls._shared.get(key)
+            if journal is None:
+                journal = cls(path, directory, **kwargs)
+                cls._shared[key] = journal
+            return journal
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._latest
+
+    def latest(self, name: str):
+        """Return journaled content not yet checkpointed, or None
+
+        Raises FileNotFoundError if the note was deleted after its last
+        checkpoint.
+        """
+        with self._lock:
+            if name not in self._latest:
+                return None
+            content = self._latest[name]
+        if content is None:
+            raise FileNotFoundError(name)
+        return content
+
+    def append(self, name: str, content: str):
+        """Journal a note write"""
+        self._append(FLAG_WRITE, name, content)
+
+    def append_edit(self, name: str, base: str, pos: int, removed_len: int,
+                    inserted: str, content: str):
+        """Journal a note write as the span that changed since base
+
+        Only the span is written when base is the note's latest journaled
+        content; otherwise (e.g. right after a checkpoint) the whole note is.
+        """
+        with self._lock:
+            if self._latest.get(name) is not base:
+                self._append(FLAG_WRITE, name, content)
+                return
+            body = EDIT.pack(pos, removed_len) + inserted.encode("utf-8")
+            self._append(FLAG_EDIT, name, content, body)
+
+    def append_batch(self, changes: dict):
+        """Journal writes of several notes as one record
+
+        The record is checksummed as a whole, so after a crash replay
+        applies either every write of the batch or none of them.
+        """
+        parts = []
+        for name, content in changes.items():
+            name_bytes = name.encode("utf-8")
+            body = content.encode("utf-8")
+            parts += [BATCH_ENTRY.pack(len(name_bytes), len(body)), name_bytes, body]
+        with self._lock:
+            self._append(FLAG_BATCH, "", None, b"".join(parts))
+            self._latest.pop("", None)
+            self._latest.update(changes)
+
+    def delete(self, name: str):
+        """Journal a note deletion so replay does not resurrect it"""
+        self._append(FLAG_DELETE, name, None)
+
+    def _append(self, flag: int, name: str, content, body: bytes = None):
+        name_bytes = name.encode("utf-8")
+        if body is None:
+            body = content.encode("utf-8") if content is not None else b""
+        crc = zlib.crc32(body, zlib.crc32(name_bytes))
+        record = HEADER.pack(flag, len(name_bytes), len(body), crc) + name_bytes + body
+        with self._lock:
+            self._file.write(record)
+            self._file.flush()
+            self._latest[name] = content
+            self._appended += 1
+            if self.durability == DURABILITY_ALWAYS:
+                os.fsync(self._file.fileno())
+            else:
+                self._needs_fsync = self.durability == DURABILITY_INTERVAL
+                if self._file.tell() >= self.checkpoint_bytes:
+                    self._wake.set()
+
+    def _records(self):
+        """Yield ``(flag, name, body, end_offset)`` for every intact record"""
+        try:
+            data = self.path.read_bytes()
+        except FileNotFoundError:
+            return
+        offset = 0
+        while offset + HEADER.size <= len(data):
+            flag, name_len, body_len, crc = HEADER.unpack_from(data, offset)
+            start = offset + HEADER.size
+            end = start + name_len + body_len
+            if end > len(data):
+                break  # Torn write at the tail
+            name_bytes = data[start:start + name_len]
+            body = data[start + name_len:end]
+            if zlib.crc32(body, zlib.crc32(name_bytes)) != crc:
+                break
+            yield flag, name_bytes.decode("utf-8"), body, end
+            offset = end
+
+    def replay(self) -> int:
+        """Apply records left in the journal to the notes; returns the count
+
+        The journal is emptied once the notes are checkpointed. If that
+        fails the intact records are kept (minus any torn tail) so they are
+        replayed again on the next start.
+        """
+        with self._lock:
+            valid_end = 0
+            for flag, name, body, valid_end in self._records():
+                if flag == FLAG_WRITE:
+                    self._latest[name] = body.decode("utf-8")
+                elif flag == FLAG_DELETE:
+                    self._latest[name] = None
+                elif flag == FLAG_EDIT:
+                    base = self._latest.get(name) if name in self._latest else self._read_note(name)
+                    if base is None:
+                        continue
+                    pos, removed_len = EDIT.unpack_from(body)
+                    inserted = body[EDIT.size:].decode("utf-8")
+                    self._latest[name] = base[:pos] + inserted + base[pos + removed_len:]
+                elif flag == FLAG_BATCH:
+                    self._latest.update(self._batch_entries(body))
+            count = len(self._latest)
+            if count and self._write_notes(dict(self._latest)):
+                self._latest.clear()
+            with open(self.path, "ab") as f:
+                f.truncate(0 if not self._latest else valid_end)
+                if self.durability != DURABILITY_OS:
+                    os.fsync(f.fileno())
+        return count
+
+    @staticmethod
+    def _batch_entries(body: bytes):
+        offset = 0
+        while offset < len(body):
+            name_len, content_len = BATCH_ENTRY.unpack_from(body, offset)
+            offset += BATCH_ENTRY.size
+            name = body[offset:offset + name_len].decode("utf-8")
+            offset += name_len
+            yield name, body[offset:offset + content_len].decode("utf-8")
+            offset += content_len
+
+    def _read_note(self, name: str):
+        try:
+            return (self.directory / name).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def sync(self):
+        """fsync the journal now"""
+        with self._lock:
+            if self._needs_fsync:
+                os.fsync(self._file.fileno())
+                self._needs_fsync = False
+
+    def checkpoint(self):
+        """Write the latest journaled content into the notes and truncate
+
+        The notes are written outside the journal lock, so saves carry on
+        while a checkpoint runs. Notes saved again meanwhile stay in the
+        journal, and the journal is only truncated if nothing was appended
+        since the checkpoint started; otherwise the next one truncates it.
+        """
+        with self._checkpoint_lock:
+            with self._lock:
+                if self._file.closed:
+                    return
+                pending = dict(self._latest)
+                appended = self._appended
+            if not self._write_notes(pending):
+                return  # Keep the journal; retry on the next checkpoint
+            written = []
+            with self._lock:
+                for name, content in pending.items():
+                    if name in self._latest and self._latest[name] is content:
+                        del self._latest[name]
+                        written.append((name, content))
+                self._last_checkpoint = time.monotonic()
+                if self._appended == appended and not self._file.closed:
+                    self._file.truncate(0)
+                    self._file.seek(0)
+                    if self.durability != DURABILITY_OS:
+                        os.fsync(self._file.fileno())
+                    self._needs_fsync = False
+            # Only notes not saved again since, so callbacks never see stale content
+            for name, content in written:
+                self._notify_checkpoint(name, content)
+
+    def _write_notes(self, pending: dict) -> bool:
+        """Write (or delete) notes; returns False if one of them failed"""
+        fsync = self.durability != DURABILITY_OS
+        for name, content in pending.items():
+            path = self.directory / name
+            try:
+                if content is None:
+                    path.unlink(missing_ok=True)
+                else:
+                    atomic_write(path, content, fsync=fsync)
+            except Exception as e:
+                print(f"Error checkpointing {name}: {e}")
+                return False
+        return True
+
+    def _notify_checkpoint(self, name: str, content):
+        if content is not None and self.on_checkpoint is not None:
+            try:
+                self.on_checkpoint(self.directory / name, content)
+            except Exception as e:
+                print(f"Error in checkpoint callback: {e}")
+
+    def close(self):
+        """Checkpoint and close the journal"""
+        self.checkpoint()
+        with self._lock:
+            self._file.close()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.fsync_interval if self.durability == DURABILITY_INTERVAL
+                            else self.checkpoint_interval)
+            self._wake.clear()
+            try:
+                with self._lock:
+                    if self._file.closed:
+                        return
+                    due = (time.monotonic() - self._last_checkpoint >= self.checkpoint_interval
+                           or self._file.tell() >= self.checkpoint_bytes)
+                    due = due and bool(self._latest)
+                    if not due and self._needs_fsync:
+                        os.fsync(self._file.fileno())
+                        self._needs_fsync = False
+                if due:
+                    self.checkpoint()
+            except Exception as e:
+                print(f"Error flushing journal: {e}")
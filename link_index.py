@@ -0,0 +1,138 @@
+import re
+from pathlib import Path
+from urllib.parse import quote, unquote, urlsplit
+
+from persisted_index import PersistedIndex, strip_code
+
+# [[Note Name]], [[Note Name|label]], [[Note Name#Heading]]
+WIKI_LINK_RE = re.compile(r"\[\[([^\[\]|#\n]+)(?:#[^\[\]|\n]*)?(?:\|([^\[\]\n]*))?\]\]")
+# [label](target) and [label](<target with spaces>), optionally with a title
+MD_LINK_RE = re.compile(r"\[[^\]\n]*\]\(\s*(<[^>\n]+>|[^)\s]+)(?:\s+\"[^\"]*\")?\s*\)")
+
+FORMAT_VERSION = 3
+
+
+def resolve_link(target: str, suffix: str = ".md"):
+    """Return the note name an internal link points to, or None for external links
+
+    Wiki-link targets are note names without the suffix; Markdown link
+    targets are relative paths to a note file. Notes live in one flat
+    directory, so only the file name of a relative path is kept.
+    """
+    target = target.strip()
+    if target.startswith("<") and target.endswith(">"):
+        target = target[1:-1]
+    parts = urlsplit(target)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None  # http:, mailto:, pure #fragment links
+    name = Path(unquote(parts.path)).name
+    return name if name.endswith(suffix) else None
+
+
+def wiki_target(name: str, suffix: str = ".md") -> str:
+    """Return the note file name for a wiki-link target"""
+    name = name.strip()
+    return name if name.endswith(suffix) else name + suffix
+
+
+def extract_links(content: str, suffix: str = ".md"):
+    """Return the set of note names a note links to (outside code)"""
+    text = strip_code(content)
+    links = {wiki_target(m.group(1), suffix) for m in WIKI_LINK_RE.finditer(text)}
+    for m in MD_LINK_RE.finditer(text):
+        name = resolve_link(m.group(1), suffix)
+        if name is not None:
+            links.add(name)
+    return links
+
+
+def render_wiki_links(block: str, suffix: str = ".md") -> str:
+    """Rewrite wiki links as Markdown links to the note file, for the preview"""
+    if "[[" not in block:
+        return block
+
+    def replace(m):
+        label = (m.group(2) or m.group(1)).strip()
+        return f"[{label}]({quote(wiki_target(m.group(1), suffix))})"
+
+    return WIKI_LINK_RE.sub(replace, block)
+
+
+class LinkIndex(PersistedIndex):
+    """Link graph between notes, with outgoing and incoming edges
+
+    Each note's outgoing links are re-extracted when it is saved, and only
+    the edges that changed are added to or removed from the reverse
+    (backlink) map, so an update costs the size of the note and looking up
+    a note's links or backlinks costs its degree. Links may point at notes
+    that do not exist (yet); their backlinks are kept.
+
+    When ``path`` is set the outgoing links are persisted there (see
+    PersistedIndex); the reverse map is rebuilt on load.
+    """
+
+    format_version = FORMAT_VERSION
+    description = "link index"
+
+    def __init__(self, path: Path = None):
+        super().__init__(path)
+        self._outgoing = {}
+        self._incoming = {}
+
+    def __len__(self) -> int:
+        return len(self._outgoing)
+
+    def links(self, name: str):
+        """Return the notes a note links to, sorted"""
+        with self._lock:
+            return sorted(self._outgoing.get(name, ()))
+
+    def backlinks(self, name: str):
+        """Return the notes linking to a note, sorted"""
+        with self._lock:
+            return sorted(self._incoming.get(name, ()))
+
+    def _parse(self, content: str):
+        return frozenset(extract_links(content))
+
+    def _index(self, name: str, links, version):
+        """Update only the edges that changed"""
+        self._set_links(name, links)
+        self._dirty = self._dirty or version != self._versions.get(name, ())
+        self._versions[name] = version
+
+    def _unindex(self, name: str):
+        # Links to the note stay, as dangling ones
+        self._set_links(name, frozenset())
+
+    def _set_links(self, name: str, links: frozenset):
+        old = self._outgoing.get(name, frozenset())
+        if links == old:
+            return
+        for target in old - links:
+            sources = self._incoming.get(target)
+            if sources is not None:
+                sources.discard(name)
+                if not sources:
+                    del self._incoming[target]
+        for target in links - old:
+            self._incoming.setdefault(target, set()).add(name)
+        if links:
+            self._outgoing[name] = links
+        else:
+            self._outgoing.pop(name, None)
+        self._dirty = True
+
+    def _entries(self) -> dict:
+        return dict(self._outgoing)
+
+    def _encode(self, links):
+        return sorted(links)
+
+    def _clear(self):
+        self._outgoing = {}
+        self._incoming = {}
+
+    def _load_entry(self, name: str, links):
+        if links:
+            self._set_links(name, frozenset(links))
@@ -0,0 +1,174 @@
+"""Load test: many simulated sessions typing at once in one process
+
+Starts ``--sessions`` FakePage sessions of one front-end on a synthetic
+corpus, has each open its own note and type into it at
+``--keys-per-second``, and reports updates, update bytes, client storage
+traffic and dialogs per keystroke as JSON. ``--max-updates-per-key`` and
+``--max-bytes-per-key`` turn it into a check that exits non-zero when
+exceeded.
+
+    python loadtest.py --sessions 1000 --keys 20 --max-updates-per-key 3
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmark import load_notebook_app
+from corpus import CorpusSpec, corpus_client_storage, write_corpus
+from fake_page import FakePage, TypingSimulator
+
+
+def start_main_sessions(workdir: Path, spec: CorpusSpec, args):
+    write_corpus(workdir / "notes", spec)
+    os.chdir(workdir)
+    import main
+
+    sessions = []
+    for _ in range(args.sessions):
+        page = FakePage(record_updates=False)
+        sessions.append((page, main.NotebookApp(page)))
+    page, app = sessions[0]
+    app.store.wait_ready(args.timeout)
+    notes = app.store.list_meta()
+    for i, (page, app) in enumerate(sessions):
+        page.run_task(app.open_file_async, notes[i % len(notes)].path).result(args.timeout)
+    return [(page, app, app.editor) for page, app in sessions]
+
+
+def start_notebook_app_sessions(workdir: Path, spec: CorpusSpec, args):
+    os.chdir(workdir)
+    notebook_app = load_notebook_app()
+    storage = corpus_client_storage(spec)
+    names = storage[notebook_app.ClientStorageNoteStore.MANIFEST_KEY]
+
+    sessions = []
+    for i in range(args.sessions):
+        # Every session is its own browser with its own client storage
+        page = FakePage(client_storage=storage, record_updates=False)
+        page.client_storage.data[notebook_app.LAST_FILE_KEY] = names[i % len(names)]
+        app = notebook_app.NotebookApp(page)
+        sessions.append((page, app, app.markdown_editor))
+    for page, app, _ in sessions:
+        if not page.wait_for(lambda: app.current_file is not None, args.timeout):
+            raise TimeoutError("Timed out waiting for a session to open its note")
+    return sessions
+
+
+def totals(sessions) -> dict:
+    return {
+        "updates": sum(page.updates for page, _, _ in sessions),
+        "update_bytes": sum(page.update_bytes for page, _, _ in sessions),
+        "storage_calls": sum(page.client_storage.call_count for page, _, _ in sessions),
+        "storage_bytes_written": sum(page.client_storage.bytes_written for page, _, _ in sessions),
+        "dialogs": sum(
+            sum(1 for kind, _ in page.events if kind in ("dialog", "open")) for page, _, _ in sessions
+        ),
+        "snack_bars": sum(len(page.snack_bars) for page, _, _ in sessions),
+    }
+
+
+def run(workdir: Path, args) -> dict:
+    spec = CorpusSpec(count=args.notes, seed=args.seed, median_size=args.median_size)
+    start = time.perf_counter()
+    if args.app == "main":
+        sessions = start_main_sessions(workdir, spec, args)
+    else:
+        sessions = start_notebook_app_sessions(workdir, spec, args)
+    startup = time.perf_counter() - start
+    for page, _, _ in sessions:
+        page.wait_idle(args.timeout)
+    before = totals(sessions)
+
+    rng = random.Random(args.seed)
+    typing = TypingSimulator(args.keys_per_second, workers=args.workers)
+    for page, _, editor in sessions:
+        text = "".join(rng.choice("abcdefghij \n") for _ in range(args.keys))
+        # Stagger sessions over one keystroke interval
+        typing.add(page, editor, text, delay=rng.random() / args.keys_per_second)
+    typed = typing.run()
+    for page, _, _ in sessions:
+        page.wait_idle(args.timeout)
+    if args.app == "main":
+        sessions[0][1].autosave.flush()  # Write what is still queued, for every session
+    else:
+        for _, app, _ in sessions:
+            app.file_manager.flush()
+    after = totals(sessions)
+
+    delta = {key: after[key] - before[key] for key in after}
+    keys = max(typed["keystrokes"], 1)
+    for page, _, _ in sessions:
+        page.disconnect()
+    return {
+        "app": args.app,
+        "sessions": args.sessions,
+        "corpus": spec.to_dict(),
+        "keys_per_second": args.keys_per_second,
+        "startup_seconds": startup,
+        "typing": typed,
+        "totals": delta,
+        "per_keystroke": {
+            "updates": delta["updates"] / keys,
+            "update_bytes": delta["update_bytes"] / keys,
+            "storage_calls": delta["storage_calls"] / keys,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the notebook with simulated sessions")
+    parser.add_argument("--app", choices=("main", "notebook-app"), default="main")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--notes", type=int, default=200)
+    parser.add_argument("--median-size", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keys", type=int, default=20, help="keystrokes typed per session")
+    parser.add_argument("--keys-per-second", type=float, default=5.0, help="typing rate per session")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="threads running sync handlers (0 runs them inline)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--max-updates-per-key", type=float)
+    parser.add_argument("--max-bytes-per-key", type=float)
+    parser.add_argument("--output", type=Path, help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+    if importlib.util.find_spec("flet") is None:
+        parser.error("flet is not installed; the load test drives the real app (pip install flet)")
+
+    workdir = Path(tempfile.mkdtemp(prefix="notebook-load-"))
+    cwd = os.getcwd()
+    try:
+        # App output goes to stderr so stdout stays machine-readable
+        with contextlib.redirect_stdout(sys.stderr):
+            result = run(workdir, args)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = json.dumps(result, indent=2)
+    if args.output:
+        args.output.write_text(report + "\n")
+    else:
+        print(report)
+
+    failures = []
+    per_key = result["per_keystroke"]
+    if args.max_updates_per_key is not None and per_key["updates"] > args.max_updates_per_key:
+        failures.append(f"{per_key['updates']:.2f} updates per keystroke > {args.max_updates_per_key}")
+    if args.max_bytes_per_key is not None and per_key["update_bytes"] > args.max_bytes_per_key:
+        failures.append(f"{per_key['update_bytes']:.0f} update bytes per keystroke > {args.max_bytes_per_key}")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,16 +3,189 @@ import os
 from pathlib import Path
 from datetime import datetime
 import asyncio
-import time
+import re
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from autosave import AutosaveScheduler
+from bulk_replace import ReplaceJob, StaleMatches
+from crdt import CollabHub
+from document import Document, diff_span, merge_spans, rebase_span
+from facet_index import FacetIndex, parse_facet_query
+from file_list import VirtualFileList
+from history import RevisionHistory
+from journal import WriteAheadJournal
+from link_index import LinkIndex, render_wiki_links, resolve_link
+from metrics import Counter, Gauge, Histogram, MetricsServer
+from note_cache import NoteCache
+from note_events import NoteChanged, NoteVersions, VersionConflict
+from note_index import NoteMeta, extract_title
+from note_store import FileNoteStore, MemoryNoteStore, NoteStore
+from preview import MarkdownPreview, PreviewScheduler
+from quick_open import LatestQuery, TrigramIndex
+from search_index import SearchIndex, StoreSearch
+from sqlite_store import SQLiteNoteStore
 
 # Directory to store notes
 NOTES_DIR = Path("notes")
 
+# Storage backend: "files" keeps one .md file per note in NOTES_DIR,
+# "sqlite" keeps notes (with a full-text index) in NOTES_DB and imports
+# NOTES_DIR into it the first time the database is empty, "memory" keeps
+# notes in a process-wide dict (nothing is persisted)
+NOTES_BACKEND = "files"
+NOTES_DB = Path("notes.db")
+
+# Write-ahead journal for the "files" backend (None writes files directly).
+# Saves are appended to the journal and checkpointed into the notes every
+# NOTES_CHECKPOINT_INTERVAL seconds; the journal is replayed after a crash.
+# NOTES_DURABILITY is "always" (fsync every save), "interval" (fsync at most
+# every NOTES_FSYNC_INTERVAL seconds) or "os" (never fsync)
+NOTES_JOURNAL = Path("notes.journal")
+NOTES_DURABILITY = "interval"
+NOTES_FSYNC_INTERVAL = 0.05
+NOTES_CHECKPOINT_INTERVAL = 5.0
+
+# Persisted full-text search index (rebuilt incrementally at startup)
+SEARCH_INDEX_PATH = Path("notes.search")
+SEARCH_SAVE_DELAY = 30.0
+
+# Persisted link graph between notes ([[wiki links]] and relative .md
+# links), updated on every save; feeds the backlinks panel
+LINK_INDEX_PATH = Path("notes.links")
+
+# Persisted tag and frontmatter facets, updated on every save; "#tag" and
+# "field:value" terms in the search box filter the file list by them.
+# The most used TAG_CHIPS tags are offered as one-click filters
+FACET_INDEX_PATH = Path("notes.facets")
+TAG_CHIPS = 12
+
+# Collaborative editing: sessions editing the same note exchange CRDT
+# operations over pubsub instead of saving whole notes, so concurrent edits
+# merge. Operations are logged in COLLAB_DIR (synced to disk on autosave)
+# and written to the note store and snapshotted every COLLAB_SNAPSHOT_EVERY
+# batches or COLLAB_SNAPSHOT_INTERVAL seconds, and on save
+COLLAB_MODE = False
+COLLAB_DIR = Path("notes.collab")
+COLLAB_SNAPSHOT_EVERY = 500
+COLLAB_SNAPSHOT_INTERVAL = 300.0
+
+# Budget for the process-wide cache of note contents shared by sessions
+# ("files" backend); notes open in a session are never evicted
+NOTE_CACHE_BYTES = 64 * 1024 * 1024
+
+# Revision history: one file per note in NOTES_HISTORY_DIR holding
+# snapshots plus deltas. Saves within HISTORY_MIN_INTERVAL seconds form one
+# revision; a full snapshot is stored every HISTORY_SNAPSHOT_EVERY
+# revisions. The compactor keeps at most HISTORY_MAX_REVISIONS revisions
+# per note, none older than HISTORY_MAX_AGE seconds (except the latest)
+NOTES_HISTORY_DIR = Path("notes.history")
+HISTORY_MIN_INTERVAL = 60.0
+HISTORY_SNAPSHOT_EVERY = 20
+HISTORY_MAX_REVISIONS = 500
+HISTORY_MAX_AGE = 90 * 24 * 3600
+
+# Fixed height of a file list row plus the gap below it (virtualized list)
+FILE_ROW_HEIGHT = 56
+FILE_ROW_GAP = 5
+
+# Client storage key remembering the note this browser had open last; it
+# is reopened at startup without waiting for the notes directory scan
+LAST_NOTE_KEY = "notebook_last_note"
+
+# Autosave: write after this much idle time, but never later than
+# max latency after the first unsaved change; flush everything early once
+# this many characters are queued across all sessions
+AUTOSAVE_IDLE_DELAY = 1.0
+AUTOSAVE_MAX_LATENCY = 5.0
+AUTOSAVE_MAX_DIRTY_BYTES = 4 * 1024 * 1024
+
+# File reads, writes and stats from UI handlers run on this many threads
+# (shared by all sessions) instead of blocking Flet's handler threads
+IO_WORKERS = 4
+
+# Find and replace across all notes searches on a process pool of this
+# many workers (shared by all sessions); the preview lists at most
+# REPLACE_PREVIEW_NOTES notes, but replacing covers every match
+REPLACE_WORKERS = os.cpu_count() or 1
+REPLACE_PREVIEW_NOTES = 200
+
+# Prometheus metrics are served at http://METRICS_HOST:METRICS_PORT/metrics
+# (set METRICS_PORT to None to turn the endpoint off)
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9464
+
+_memory_store = None
+_io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="note-io")
+
+HANDLER_SECONDS = Histogram(
+    "notebook_handler_seconds", "Time spent in UI handlers", ["handler"]
+)
+PAGE_UPDATE_SECONDS = Histogram(
+    "notebook_page_update_seconds", "Time spent in page.update(), including control.update()"
+)
+PAGE_UPDATE_CONTROLS = Histogram(
+    "notebook_page_update_controls",
+    "Controls in the subtrees passed to page.update(): what Flet diffs, not the bytes it sends",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+)
+BYTES_WRITTEN = Counter(
+    "notebook_bytes_written_total", "Note bytes handed to the store by saves", ["kind"]
+)
+ACTIVE_SESSIONS = Gauge("notebook_active_sessions", "Open sessions")
+Gauge("notebook_threads", "Live threads in the process").set_function(threading.active_count)
+Gauge("notebook_timers", "Pending autosave callbacks and live threading.Timer threads").set_function(
+    lambda: AutosaveScheduler.shared().scheduled_calls
+    + sum(isinstance(t, threading.Timer) for t in threading.enumerate())
+)
+Gauge("notebook_autosave_pending", "Notes with unsaved changes queued for autosave").set_function(
+    lambda: len(AutosaveScheduler.shared())
+)
+
+
+def count_controls(controls) -> int:
+    """Count controls in the given subtrees"""
+    count = 0
+    stack = list(controls)
+    while stack:
+        control = stack.pop()
+        count += 1
+        children = getattr(control, "_get_children", None)
+        if callable(children):
+            stack.extend(children() or ())
+    return count
+
+
+def open_store() -> NoteStore:
+    """Return the note store for NOTES_BACKEND (shared by all sessions)"""
+    global _memory_store
+    if NOTES_BACKEND == "sqlite":
+        store = SQLiteNoteStore.shared(NOTES_DB, root=NOTES_DIR)
+        if not len(store):
+            store.import_directory(NOTES_DIR)
+        return store
+    if NOTES_BACKEND == "memory":
+        if _memory_store is None:
+            _memory_store = MemoryNoteStore(root=NOTES_DIR)
+        return _memory_store
+    journal = None
+    if NOTES_JOURNAL is not None:
+        NOTES_DIR.mkdir(exist_ok=True)
+        journal = WriteAheadJournal.shared(
+            NOTES_JOURNAL,
+            NOTES_DIR,
+            durability=NOTES_DURABILITY,
+            fsync_interval=NOTES_FSYNC_INTERVAL,
+            checkpoint_interval=NOTES_CHECKPOINT_INTERVAL,
+        )
+    return FileNoteStore(NOTES_DIR, journal=journal, cache=NoteCache.shared(NOTE_CACHE_BYTES))
+
+
 class NotebookApp:
     """Multi-file Markdown Editor with live preview"""
     
-    def __init__(self, page: ft.Page):
+    def __init__(self, page: ft.Page, store: NoteStore = None):
         self.page = page
         self.page.title = "The Notebook - Markdown Editor"
         self.page.padding = 0
@@ -21,19 +194,113 @@ class NotebookApp:
         # Ensure notes directory exists
         NOTES_DIR.mkdir(exist_ok=True)
         
+        # Note storage (files, SQLite or memory); listing is served from
+        # shared metadata, not a directory scan
+        self.store = store if store is not None else open_store()
+        self.unwatch_store = None
+        
+        # Full-text search: the store's own (SQLite FTS5) if it has one,
+        # otherwise a shared index built in the background on first use
+        if callable(getattr(self.store, "search", None)):
+            self.search_index = StoreSearch(self.store)
+        else:
+            self.search_index = SearchIndex.shared(SEARCH_INDEX_PATH, self.store)
+        self.search_query = ""
+        
+        # Shared link graph: outgoing links and backlinks per note
+        self.link_index = LinkIndex.shared(LINK_INDEX_PATH, self.store)
+        
+        # Shared tag and frontmatter facets for filtering the file list
+        self.facet_index = FacetIndex.shared(FACET_INDEX_PATH, self.store)
+        
+        # Shared fuzzy index over note names and titles for quick open
+        store_key = (type(self.store).__name__, self.store.root.resolve())
+        self.quick_index = TrigramIndex.shared(store_key, self.store)
+        
+        # Per-note versions shared by all sessions: saves based on an older
+        # version are merged or rejected, and each save is announced to the
+        # other sessions on notes_topic
+        self.versions = NoteVersions.shared(store_key)
+        self.notes_topic = f"notes:{store_key[0]}:{store_key[1]}"
+        
+        # Shared CRDT operation log for collaborative mode
+        self.collab_hub = (
+            CollabHub.shared(COLLAB_DIR, self.store, snapshot_every=COLLAB_SNAPSHOT_EVERY,
+                             snapshot_interval=COLLAB_SNAPSHOT_INTERVAL)
+            if COLLAB_MODE else None
+        )
+        self.replica = None  # This session's replica of the open note
+        self.collab_topic = None
+        self.collab_shown = ""  # Last replica text written to the editor
+        
+        # Shared revision history with its background compactor
+        self.history = RevisionHistory.shared(
+            NOTES_HISTORY_DIR,
+            snapshot_every=HISTORY_SNAPSHOT_EVERY,
+            max_revisions=HISTORY_MAX_REVISIONS,
+            max_age=HISTORY_MAX_AGE,
+            min_interval=HISTORY_MIN_INTERVAL,
+        )
+        
+        # Shared autosave queue (one worker thread for all sessions)
+        self.autosave = AutosaveScheduler.shared(
+            idle_delay=AUTOSAVE_IDLE_DELAY,
+            max_latency=AUTOSAVE_MAX_LATENCY,
+            max_dirty_bytes=AUTOSAVE_MAX_DIRTY_BYTES,
+        )
+        
         # Application state
         self.current_file = None
+        self.document = None  # Open note text and its unsaved span
+        self.base_version = 0  # Version the editor content is based on
+        self.base_content = None  # Content of that version
+        self.conflict_open = False
+        self.open_generation = 0  # Bumped per open; superseded opens are dropped
+        self.pending_io = 0
+        self.awaiting_first_note = False  # Open the newest note once listed
         self.files = []
         self.is_loading = False
-        self.save_timer = None
         
         # UI Components
+        self.empty_list_text = ft.Text(
+            "Loading notes...",
+            size=12,
+            color=ft.Colors.GREY_600,
+            text_align=ft.TextAlign.CENTER,
+        )
+        
         self.file_list = ft.ListView(
-            spacing=5,
+            spacing=0,
             padding=10,
             expand=True,
         )
         
+        # Virtualized, keyed rows for file_list: only rows near the viewport
+        # exist, and only changed rows are sent on update
+        self.file_rows = VirtualFileList(
+            self.file_list,
+            create_item=self.create_file_list_item,
+            restyle_item=self.restyle_file_list_item,
+            entry=lambda meta: (meta.path, meta, meta.mtime),
+            item_extent=FILE_ROW_HEIGHT + FILE_ROW_GAP,
+            placeholder=ft.Container(
+                content=self.empty_list_text,
+                padding=20,
+            ),
+        )
+        
+        self.search_field = ft.TextField(
+            hint_text="Search notes, #tag, field:value",
+            prefix_icon=ft.Icons.SEARCH,
+            dense=True,
+            text_size=13,
+            on_change=self.on_search_change,
+        )
+        
+        # Most used tags as filters; filled in once the facets are built
+        self.tag_chip_key = None
+        self.tag_chips = ft.Row(wrap=True, spacing=4, run_spacing=4)
+        
         self.editor = ft.TextField(
             multiline=True,
             min_lines=1,
@@ -44,14 +311,35 @@ class NotebookApp:
             on_change=self.on_editor_change,
         )
         
-        self.preview = ft.Markdown(
+        # Block-level preview: only edited blocks are re-sent and re-rendered
+        self.preview = MarkdownPreview(
             value="",
             selectable=True,
             extension_set=ft.MarkdownExtensionSet.GITHUB_WEB,
             on_tap_link=self.handle_link_click,
+            link_transform=render_wiki_links,
             expand=True,
         )
         
+        # Notes linking to the open note, refreshed on open and on saves
+        self.backlink_names = None
+        self.backlinks_list = ft.Column(spacing=0)
+        self.backlinks_panel = ft.Container(
+            content=ft.Column([
+                ft.Row([
+                    ft.Icon(ft.Icons.LINK, size=16),
+                    ft.Text("Linked from", size=14, weight=ft.FontWeight.BOLD),
+                ], spacing=10),
+                self.backlinks_list,
+            ], spacing=5),
+            padding=10,
+            bgcolor=ft.Colors.GREY_100,
+            border=ft.border.only(top=ft.BorderSide(1, ft.Colors.GREY_300)),
+        )
+        
+        # Adapts preview refresh rate to note size and measured render cost
+        self.preview_scheduler = PreviewScheduler(self.render_preview)
+        
         self.current_file_label = ft.Text(
             "No file selected",
             size=14,
@@ -64,15 +352,256 @@ class NotebookApp:
             color=ft.Colors.GREEN_700,
         )
         
+        # Shown while off-thread file I/O started from a handler is running
+        self.loading_indicator = ft.ProgressRing(
+            width=14,
+            height=14,
+            stroke_width=2,
+            visible=False,
+        )
+        
+        # Time every update this session sends (control.update() goes
+        # through page.update too)
+        self.instrument_page_updates()
+        
         # Build UI
         self.build_ui()
         
-        # Load existing files
+        # Reload the list when notes are added/removed (also from outside);
+        # on a cold start the directory scan streams notes in through this
+        self.unwatch_store = self.store.watch(self.on_store_changed)
+        # Saves made by other sessions
+        self.page.pubsub.subscribe_topic(self.notes_topic, self.on_note_event)
+        # Backlinks show "Indexing links..." until the graph is built
+        self.link_index.when_ready(self.on_link_index_ready)
+        self.facet_index.when_ready(self.on_facet_index_ready)
+        self.page.on_close = self.on_page_close
+        ACTIVE_SESSIONS.inc()
+        self.page.on_keyboard_event = self.on_keyboard
+        
+        # Show the notes listed so far and open the last note right away;
+        # neither waits for the whole notebook to be scanned
         self.load_files()
+        self.page.run_task(self.open_initial_note)
+    
+    def on_keyboard(self, e: ft.KeyboardEvent):
+        """Handle global keyboard shortcuts"""
+        if e.ctrl and e.key.upper() == "P":
+            self.open_quick_open(None)
+        elif e.ctrl and e.shift and e.key.upper() == "H":
+            self.open_replace(None)
+    
+    def on_page_close(self, e):
+        """Flush unsaved changes and detach from shared services"""
+        ACTIVE_SESSIONS.dec()
+        if self.unwatch_store:
+            self.unwatch_store()
+        self.page.pubsub.unsubscribe_topic(self.notes_topic)
+        if self.replica is not None:
+            # Write this session's collaborative edits to the store
+            try:
+                self.collab_hub.flush(self.current_file.name)
+            except Exception as ex:
+                print(f"Error flushing collaborative edits: {ex}")
+        self.leave_collab()
+        self.autosave.flush(self)
+        if self.current_file is not None:
+            self.release_note(self.current_file.name)
+    
+    def instrument_page_updates(self):
+        """Record latency and size of each page.update() in the metrics"""
+        update = self.page.update
+        
+        def timed_update(*controls):
+            start = time.perf_counter()
+            try:
+                return update(*controls)
+            finally:
+                PAGE_UPDATE_SECONDS.observe(time.perf_counter() - start)
+                PAGE_UPDATE_CONTROLS.observe(count_controls(controls or (self.page,)))
+        
+        self.page.update = timed_update
+    
+    def acquire_note(self, name: str) -> str:
+        """Read a note, pinning it in the store's cache if it has one"""
+        acquire = getattr(self.store, "acquire", None)
+        return acquire(name) if acquire is not None else self.store.read(name)
+    
+    def release_note(self, name: str):
+        """Unpin a note read with acquire_note"""
+        release = getattr(self.store, "release", None)
+        if release is not None:
+            release(name)
+    
+    def on_store_changed(self):
+        """Handle notes added or removed in the store"""
+        try:
+            self.load_files()
+            self.open_first_note()
+        except Exception:
+            pass  # Page might be closed
+    
+    def store_ready(self) -> bool:
+        """Check whether the store has finished listing its notes"""
+        wait_ready = getattr(self.store, "wait_ready", None)
+        return wait_ready is None or wait_ready(0)
+    
+    async def open_initial_note(self):
+        """Open the note this browser had open last, else the newest one"""
+        try:
+            name = await self.page.client_storage.get_async(LAST_NOTE_KEY)
+        except Exception:
+            name = None
+        if isinstance(name, str) and name:
+            try:
+                exists = await self.run_io(self.store.exists, name)
+            except Exception:
+                exists = False
+            if exists and not self.open_generation and self.current_file is None:
+                await self.open_file_async(self.store.root / name)
+                return
+        # The newest note is only known once the listing is complete
+        self.awaiting_first_note = True
+        self.open_first_note()
+    
+    def open_first_note(self):
+        """Open the newest note once the store is listed, unless one was opened"""
+        if not self.awaiting_first_note or not self.store_ready():
+            return
+        if self.open_generation or self.current_file is not None:
+            self.awaiting_first_note = False
+            return
+        self.awaiting_first_note = False
+        notes = self.store.list_meta()
+        if notes:
+            self.page.run_task(self.open_file_async, notes[0].path)
+    
+    def on_note_event(self, topic, event):
+        """Handle a note saved by another session"""
+        if not isinstance(event, NoteChanged):
+            return
+        try:
+            if (
+                self.current_file is not None
+                and event.name == self.current_file.name
+                and event.version > self.base_version
+                and not self.document.modified
+                and not self.autosave.is_dirty(self, self.current_file)
+            ):
+                # No local edits to lose: follow the other session
+                self.reload_current_file()
+            # Otherwise the next save sees the newer version and merges
+            
+            # Keyed reconciliation: only the changed row is re-sent or moved
+            self.load_files()
+            
+            # The saved note may have gained or dropped a link to this one
+            if self.refresh_backlinks():
+                self.backlinks_panel.update()
+            # ... or a new tag
+            if self.refresh_tag_chips():
+                self.tag_chips.update()
+        except Exception:
+            pass  # Page might be closed
     
     async def handle_link_click(self, e):
-        """Handle markdown link clicks (async handler)"""
-        await self.page.launch_url_async(e.data)
+        """Open links to other notes in the editor, others in the browser"""
+        name = resolve_link(e.data)
+        if name is None:
+            await self.page.launch_url_async(e.data)
+            return
+        try:
+            exists = await self.run_io(self.store.exists, name)
+        except Exception as ex:
+            self.show_error(f"Error opening link: {str(ex)}")
+            return
+        if not exists:
+            self.show_error(f"Note not found: {name}")
+            return
+        await self.open_file_async(self.store.root / name)
+    
+    def refresh_backlinks(self) -> bool:
+        """Rebuild the backlinks list for the open note; returns whether it changed"""
+        if self.current_file is None:
+            names = []
+        elif not self.link_index.ready.is_set():
+            names = None
+        else:
+            names = self.link_index.backlinks(self.current_file.name)
+        if names == self.backlink_names and self.backlinks_list.controls:
+            return False
+        self.backlink_names = names
+        
+        if names is None:
+            self.backlinks_list.controls = [
+                ft.Text("Indexing links...", size=12, color=ft.Colors.GREY_600),
+            ]
+        elif not names:
+            self.backlinks_list.controls = [
+                ft.Text("No notes link here.", size=12, color=ft.Colors.GREY_600),
+            ]
+        else:
+            self.backlinks_list.controls = [
+                ft.TextButton(
+                    Path(name).stem,
+                    icon=ft.Icons.DESCRIPTION,
+                    on_click=lambda e, name=name: self.page.run_task(
+                        self.open_file_async, self.store.root / name
+                    ),
+                )
+                for name in names
+            ]
+        return True
+    
+    def on_link_index_ready(self):
+        """Fill in the backlinks panel once the link graph is built"""
+        try:
+            if self.refresh_backlinks():
+                self.backlinks_panel.update()
+        except Exception:
+            pass  # Page might be closed
+    
+    def on_facet_index_ready(self):
+        """Show the tag filters and re-run a facet query once facets are built"""
+        try:
+            if self.refresh_tag_chips():
+                self.tag_chips.update()
+            if self.search_query:
+                self.load_files()
+        except Exception:
+            pass  # Page might be closed
+    
+    def refresh_tag_chips(self) -> bool:
+        """Rebuild the tag filter chips; returns whether they changed"""
+        _, selected, _ = parse_facet_query(self.search_query)
+        tags = [tag for tag, _ in self.facet_index.tags()[:TAG_CHIPS]]
+        key = (tags, selected)
+        if key == self.tag_chip_key:
+            return False
+        self.tag_chip_key = key
+        self.tag_chips.controls = [
+            ft.Container(
+                content=ft.Text(f"#{tag}", size=11),
+                padding=ft.padding.symmetric(horizontal=6, vertical=2),
+                border_radius=10,
+                bgcolor=ft.Colors.BLUE_100 if tag in selected else ft.Colors.GREY_200,
+                on_click=lambda e, tag=tag: self.page.run_task(self.toggle_tag_filter, tag),
+            )
+            for tag in tags
+        ]
+        return True
+    
+    async def toggle_tag_filter(self, tag: str):
+        """Add or remove a #tag term in the search box and filter by it"""
+        terms = (self.search_field.value or "").split()
+        term = f"#{tag}"
+        if any(t.casefold() == term for t in terms):
+            terms = [t for t in terms if t.casefold() != term]
+        else:
+            terms.append(term)
+        self.search_field.value = " ".join(terms)
+        self.search_field.update()
+        await self.on_search_change(None)
         
     def build_ui(self):
         """Construct the three-panel layout"""
@@ -83,15 +612,40 @@ class NotebookApp:
             center_title=False,
             bgcolor=ft.Colors.BLUE_700,
             actions=[
+                ft.IconButton(
+                    icon=ft.Icons.MANAGE_SEARCH,
+                    tooltip="Quick open (Ctrl+P)",
+                    on_click=self.open_quick_open,
+                ),
+                ft.IconButton(
+                    icon=ft.Icons.FIND_REPLACE,
+                    tooltip="Find and replace in all notes (Ctrl+Shift+H)",
+                    on_click=self.open_replace,
+                ),
+                ft.IconButton(
+                    icon=ft.Icons.UNDO,
+                    tooltip="Undo edit",
+                    on_click=self.undo_edit,
+                ),
+                ft.IconButton(
+                    icon=ft.Icons.REDO,
+                    tooltip="Redo edit",
+                    on_click=self.redo_edit,
+                ),
+                ft.IconButton(
+                    icon=ft.Icons.HISTORY,
+                    tooltip="Revision history",
+                    on_click=self.open_history,
+                ),
                 ft.IconButton(
                     icon=ft.Icons.SAVE,
                     tooltip="Save (Ctrl+S)",
-                    on_click=self.save_current_file,
+                    on_click=self.save_current_file_async,
                 ),
                 ft.IconButton(
                     icon=ft.Icons.REFRESH,
                     tooltip="Refresh file list",
-                    on_click=lambda _: self.load_files(),
+                    on_click=self.refresh_files_async,
                 ),
             ],
         )
@@ -100,7 +654,7 @@ class NotebookApp:
         new_note_btn = ft.ElevatedButton(
             "New Note",
             icon=ft.Icons.ADD,
-            on_click=self.create_new_note,
+            on_click=self.create_new_note_async,
             width=200,
         )
         
@@ -115,6 +669,14 @@ class NotebookApp:
                     content=ft.Text("Your Notes", size=16, weight=ft.FontWeight.BOLD),
                     padding=ft.padding.only(left=10, top=10, bottom=5),
                 ),
+                ft.Container(
+                    content=self.search_field,
+                    padding=ft.padding.symmetric(horizontal=10),
+                ),
+                ft.Container(
+                    content=self.tag_chips,
+                    padding=ft.padding.symmetric(horizontal=10),
+                ),
                 self.file_list,
             ]),
             width=250,
@@ -127,6 +689,7 @@ class NotebookApp:
             content=ft.Row([
                 ft.Icon(ft.Icons.EDIT, size=16),
                 self.current_file_label,
+                self.loading_indicator,
                 self.save_status,
             ], spacing=10),
             padding=10,
@@ -168,6 +731,7 @@ class NotebookApp:
             content=ft.Column([
                 preview_header,
                 ft.Column([preview_container], scroll=ft.ScrollMode.AUTO, expand=True),
+                self.backlinks_panel,
             ], spacing=0, expand=True),
             expand=2,
         )
@@ -182,46 +746,474 @@ class NotebookApp:
         self.page.add(main_content)
         self.page.update()
         
+    async def run_io(self, fn, *args):
+        """Run blocking file I/O on the shared I/O executor, showing the loading state"""
+        self.set_loading(1)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(_io_executor, fn, *args)
+        finally:
+            self.set_loading(-1)
+    
+    def set_loading(self, delta: int):
+        """Track I/O in flight and toggle the loading indicator"""
+        self.pending_io += delta
+        visible = self.pending_io > 0
+        if self.loading_indicator.visible != visible:
+            self.loading_indicator.visible = visible
+            try:
+                self.loading_indicator.update()
+            except Exception:
+                pass  # Page might be closed
+    
+    def refresh_files(self, e):
+        """Rescan the notes directory and reload the file list"""
+        self.store.refresh()
+        self.load_files()
+    
+    async def refresh_files_async(self, e):
+        """Rescan the notes directory off-thread, then reload the file list"""
+        try:
+            await self.run_io(self.store.refresh)
+        except Exception as ex:
+            self.show_error(f"Error refreshing files: {str(ex)}")
+        self.load_files()
+    
+    @HANDLER_SECONDS.labels("load_files").time()
     def load_files(self):
-        """Load all markdown files from notes directory"""
+        """Load all markdown files from the note store"""
         try:
-            self.files = sorted(
-                [f for f in NOTES_DIR.iterdir() if f.suffix == '.md'],
-                key=lambda x: x.stat().st_mtime,
-                reverse=True
-            )
+            self.update_empty_list_text()
+            if self.search_query:
+                self.files = self.search_notes(self.search_query)
+            else:
+                # Sorted metadata is shared with the store, not copied per session
+                self.files = self.store.list_meta()
             
-            self.file_list.controls.clear()
+            # Reconcile the visible rows by path; unchanged rows are not re-sent
+            self.file_rows.set_items(self.files, selected_key=self.current_file)
             
-            if not self.files:
-                self.file_list.controls.append(
-                    ft.Container(
-                        content=ft.Text(
-                            "No notes yet.\nClick 'New Note' to start!",
-                            size=12,
-                            color=ft.Colors.GREY_600,
-                            text_align=ft.TextAlign.CENTER,
-                        ),
-                        padding=20,
+        except Exception as e:
+            self.show_error(f"Error loading files: {str(e)}")
+    
+    @HANDLER_SECONDS.labels("load_files_async").time()
+    async def load_files_async(self):
+        """Compute the listing (or search results) off-thread, then show it"""
+        query = self.search_query
+        try:
+            files = await self.run_io(
+                lambda: self.search_notes(query) if query else self.store.list_meta()
+            )
+        except Exception as e:
+            self.show_error(f"Error loading files: {str(e)}")
+            return
+        if query != self.search_query:
+            return  # Superseded by a newer query
+        self.files = files
+        self.update_empty_list_text()
+        self.file_rows.set_items(self.files, selected_key=self.current_file)
+    
+    def update_empty_list_text(self):
+        """Say whether an empty file list is still loading or really empty"""
+        if self.search_query:
+            text = "No matching notes."
+        elif self.store_ready():
+            text = "No notes yet.\nClick 'New Note' to start!"
+        else:
+            text = "Loading notes..."
+        if self.empty_list_text.value != text:
+            self.empty_list_text.value = text
+            try:
+                self.empty_list_text.update()
+            except Exception:
+                pass  # Not on the page yet
+    
+    def search_notes(self, query: str):
+        """Return metadata of notes matching a query, best first
+        
+        "#tag" and "field:value" terms are answered from the facet index
+        without reading notes; the rest is a full-text query. Facet-only
+        queries list the matching notes newest first.
+        """
+        text, tags, fields = parse_facet_query(query, self.facet_index.fields())
+        if not tags and not fields:
+            names = self.search_index.search(text)
+        else:
+            matching = self.facet_index.filter(tags, fields)
+            if text:
+                names = [name for name in self.search_index.search(text) if name in matching]
+            else:
+                names = matching
+        metas = [meta for meta in (self.store.get_meta(name) for name in names) if meta is not None]
+        if (tags or fields) and not text:
+            metas.sort(key=lambda meta: meta.mtime, reverse=True)
+        return metas
+    
+    async def on_search_change(self, e):
+        """Filter the file list by the search box query"""
+        self.search_query = (self.search_field.value or "").strip()
+        if self.refresh_tag_chips():
+            self.tag_chips.update()
+        await self.load_files_async()
+    
+    def open_quick_open(self, e):
+        """Show the quick-open palette with fuzzy matching over note names"""
+        matches = []
+        results = ft.ListView(height=320, spacing=0)
+        
+        def show_results(query, names):
+            matches[:] = names
+            results.controls = []
+            for name in names:
+                meta = self.store.get_meta(name)
+                results.controls.append(
+                    ft.ListTile(
+                        title=ft.Text(name, size=14),
+                        subtitle=ft.Text(meta.title if meta else "", size=11),
+                        dense=True,
+                        on_click=lambda _, n=name: choose(n),
                     )
                 )
+            try:
+                results.update()
+            except Exception:
+                pass  # Dialog might be closed
+        
+        # Each keystroke supersedes the previous query
+        runner = LatestQuery(self.quick_index.search, show_results)
+        
+        def on_change(e):
+            query = (query_field.value or "").strip()
+            if query:
+                runner.submit(query)
             else:
-                for file_path in self.files:
-                    is_selected = self.current_file == file_path
-                    self.file_list.controls.append(
-                        self.create_file_list_item(file_path, is_selected)
-                    )
-            
+                runner.cancel()
+                show_results("", [])
+        
+        def choose(name):
+            runner.cancel()
+            dialog.open = False
             self.page.update()
+            self.page.run_task(self.open_file_async, self.store.root / name)
+        
+        def on_submit(e):
+            if matches:
+                choose(matches[0])
+        
+        query_field = ft.TextField(
+            hint_text="Jump to note...",
+            autofocus=True,
+            on_change=on_change,
+            on_submit=on_submit,
+        )
+        
+        dialog = ft.AlertDialog(
+            title=ft.Text("Quick Open"),
+            content=ft.Column([query_field, results], tight=True, width=420),
+            on_dismiss=lambda _: runner.cancel(),
+        )
+        
+        self.page.dialog = dialog
+        dialog.open = True
+        self.page.update()
+    
+    def open_history(self, e):
+        """Show the current note's revisions and restore one into the editor"""
+        if not self.current_file:
+            return
+        name = self.current_file.name
+        
+        def restore(index):
+            try:
+                content = self.history.get(name, index)
+            except Exception as ex:
+                self.show_error(f"Error loading revision: {str(ex)}")
+                return
+            dialog.open = False
+            self.page.update()
+            if self.current_file is None or self.current_file.name != name:
+                return
+            self.editor.value = content
+            self.editor.update()
+            # Goes through the usual path: preview refresh plus autosave
+            self.on_editor_change(None)
+        
+        revisions = ft.ListView(height=320, spacing=0)
+        for index, timestamp, length in self.history.revisions(name):
+            revisions.controls.append(
+                ft.ListTile(
+                    title=ft.Text(datetime.fromtimestamp(timestamp).strftime("%b %d, %Y %H:%M:%S"), size=14),
+                    subtitle=ft.Text(f"{length} characters", size=11),
+                    dense=True,
+                    on_click=lambda _, i=index: restore(i),
+                )
+            )
+        if not revisions.controls:
+            revisions.controls.append(ft.Text("No revisions yet.", size=12, color=ft.Colors.GREY_600))
+        
+        dialog = ft.AlertDialog(
+            title=ft.Text(f"History - {name}"),
+            content=ft.Column([revisions], tight=True, width=420),
+            actions=[
+                ft.TextButton("Close", on_click=lambda _: setattr(dialog, "open", False) or self.page.update()),
+            ],
+        )
+        
+        self.page.dialog = dialog
+        dialog.open = True
+        self.page.update()
+    
+    def open_replace(self, e):
+        """Find a regular expression in all notes and replace it in the chosen ones
+        
+        The search runs on the shared process pool and matches stream into
+        the preview as they are found; the session stays usable meanwhile.
+        Replacing writes every chosen note as one batch.
+        """
+        job = None
+        checkboxes = {}
+        results = ft.ListView(height=360, spacing=0)
+        status = ft.Text("", size=12, color=ft.Colors.GREY_600)
+        
+        def show_progress(scan):
+            shown = len(checkboxes)
+            found = len(scan.results)
+            text = f"{scan.match_count} matches in {found} notes ({scan.scanned} of {scan.total} searched)"
+            if found > shown:
+                text += f"; {found - shown} more notes not listed (replaced too)"
+            status.value = text
+        
+        def selected_names():
+            # Notes beyond the listed ones have no checkbox and are included
+            return [name for name, result in list(job.results.items())
+                    if result.digest is not None
+                    and (name not in checkboxes or checkboxes[name].value)]
+        
+        def on_selection_change(e):
+            if job is None or not job.done.is_set() or job.error is not None:
+                return
+            disabled = not selected_names()
+            if replace_button.disabled != disabled:
+                replace_button.disabled = disabled
+                replace_button.update()
+        
+        def on_results(scan, found):
+            # Runs on the scan thread
+            if scan is not job:
+                return  # Superseded by a newer search
+            for result in found:
+                if len(checkboxes) >= REPLACE_PREVIEW_NOTES:
+                    break
+                results.controls.append(
+                    self.create_replace_item(result, checkboxes, on_selection_change)
+                )
+            show_progress(job)
+            try:
+                self.page.update(results, status)
+            except Exception:
+                pass  # Dialog might be closed
+        
+        def on_done(finished):
+            if finished is not job:
+                return  # Superseded by a newer search
+            if finished.error is not None:
+                status.value = f"Search failed: {finished.error}"
+            else:
+                show_progress(finished)
+                if finished.cancelled.is_set():
+                    status.value += " - stopped"
+            stop_button.disabled = True
+            replace_button.disabled = finished.error is not None or not selected_names()
+            try:
+                self.page.update(status, stop_button, replace_button)
+            except Exception:
+                pass  # Dialog might be closed
+        
+        async def search(e):
+            nonlocal job
+            if job is not None:
+                job.cancel()
+            pattern = pattern_field.value or ""
+            if not pattern:
+                return
+            try:
+                new_job = ReplaceJob(
+                    self.store, self.versions, pattern, replace_field.value or "",
+                    ignore_case=bool(ignore_case.value), workers=REPLACE_WORKERS,
+                    on_results=on_results, on_done=on_done,
+                )
+            except re.error as ex:
+                status.value = f"Invalid pattern or replacement: {ex}"
+                status.update()
+                return
+            job = new_job
+            checkboxes.clear()
+            results.controls = []
+            status.value = "Searching..."
+            stop_button.disabled = False
+            replace_button.disabled = True
+            self.page.update(results, status, stop_button, replace_button)
+            # Search what this session has typed, not the last autosave
+            if self.has_unsaved_edits():
+                await self.run_io(lambda: self.save_current_file(None, show_status=False))
+            if job is new_job:
+                new_job.start()
+        
+        def stop(e):
+            if job is not None:
+                job.cancel()
+        
+        async def replace(e):
+            if job is None or not job.done.is_set():
+                return
+            names = selected_names()
+            if not names:
+                return
+            replace_button.disabled = True
+            status.value = f"Replacing in {len(names)} notes..."
+            self.page.update(status, replace_button)
             
-        except Exception as e:
-            self.show_error(f"Error loading files: {str(e)}")
+            def apply():
+                # Edits typed since the search make that note conflict
+                if self.has_unsaved_edits():
+                    self.save_current_file(None, show_status=False)
+                return job.apply(names)
+            
+            try:
+                versions, changes = await self.run_io(apply)
+            except (StaleMatches, VersionConflict) as ex:
+                status.value = f"Nothing replaced: {ex}"
+                status.update()
+                return
+            except Exception as ex:
+                status.value = ""
+                status.update()
+                self.show_error(f"Error replacing: {str(ex)}")
+                return
+            await self.run_io(self.index_replaced_notes, versions, changes)
+            replaced = sum(job.results[name].count for name in changes)
+            status.value = f"Replaced {replaced} matches in {len(changes)} notes."
+            status.update()
+            self.load_files()
+        
+        def close(e):
+            if job is not None:
+                job.cancel()
+            dialog.open = False
+            self.page.update()
+        
+        pattern_field = ft.TextField(
+            label="Find (regular expression)",
+            autofocus=True,
+            dense=True,
+            on_submit=search,
+        )
+        replace_field = ft.TextField(
+            label="Replace with (\\1 for groups)",
+            dense=True,
+            on_submit=search,
+        )
+        ignore_case = ft.Checkbox(label="Ignore case", value=False)
+        search_button = ft.ElevatedButton("Search", icon=ft.Icons.SEARCH, on_click=search)
+        stop_button = ft.TextButton("Stop", icon=ft.Icons.STOP, on_click=stop, disabled=True)
+        replace_button = ft.TextButton("Replace in selected", on_click=replace, disabled=True)
+        
+        dialog = ft.AlertDialog(
+            title=ft.Text("Find and Replace in All Notes"),
+            content=ft.Column([
+                pattern_field,
+                replace_field,
+                ft.Row([ignore_case, search_button, stop_button], spacing=10),
+                status,
+                results,
+            ], tight=True, width=560),
+            actions=[
+                replace_button,
+                ft.TextButton("Close", on_click=close),
+            ],
+            on_dismiss=lambda _: job is not None and job.cancel(),
+        )
+        
+        self.page.dialog = dialog
+        dialog.open = True
+        self.page.update()
+    
+    def create_replace_item(self, result, checkboxes, on_change=None):
+        """Create a preview row for one note's matches, with a checkbox to include it"""
+        checkbox = ft.Checkbox(
+            value=result.error is None,
+            disabled=result.error is not None,
+            on_change=on_change,
+        )
+        checkboxes[result.name] = checkbox
+        lines = []
+        if result.error is not None:
+            lines.append(ft.Text(f"Could not read: {result.error}", size=11, color=ft.Colors.RED_700))
+        for match in result.matches:
+            lines.append(ft.Text(
+                f"{match.line}: {match.text.strip()}",
+                size=11,
+                color=ft.Colors.RED_700,
+                no_wrap=True,
+            ))
+            if match.replaced is not None:
+                lines.append(ft.Text(
+                    f"{match.line}: {match.replaced.strip()}",
+                    size=11,
+                    color=ft.Colors.GREEN_700,
+                    no_wrap=True,
+                ))
+        if result.count > len(result.matches):
+            lines.append(ft.Text(f"... {result.count - len(result.matches)} more", size=11,
+                                 color=ft.Colors.GREY_600))
+        return ft.Row([
+            checkbox,
+            ft.Column([
+                ft.Text(f"{result.name} ({result.count})", size=13, weight=ft.FontWeight.BOLD),
+                *lines,
+            ], spacing=2, expand=True),
+        ], vertical_alignment=ft.CrossAxisAlignment.START)
+    
+    def index_replaced_notes(self, versions: dict, changes: dict):
+        """Update the indexes and other sessions after a batch replace (blocking)"""
+        for name, content in changes.items():
+            meta = self.store.get_meta(name)
+            file_version = (meta.mtime, meta.size) if meta else None
+            self.search_index.update(name, content, file_version)
+            self.link_index.update(name, content, file_version)
+            self.facet_index.update(name, content, file_version)
+            self.quick_index.add(name, extract_title(content, Path(name).stem))
+            self.history.record(name, content)
+            try:
+                self.page.pubsub.send_others_on_topic(
+                    self.notes_topic,
+                    NoteChanged(name, versions[name], meta.mtime if meta else 0.0),
+                )
+            except Exception:
+                pass  # Page might be closed
+        self.search_index.save_later(self.autosave.call_later, SEARCH_SAVE_DELAY)
+        self.link_index.save_later(self.autosave.call_later, SEARCH_SAVE_DELAY)
+        self.facet_index.save_later(self.autosave.call_later, SEARCH_SAVE_DELAY)
+        
+        # Show the replaced text in this session unless it has edits since
+        if (
+            self.current_file is not None
+            and self.current_file.name in changes
+            and not self.has_unsaved_edits()
+        ):
+            self.reload_current_file()
+    
+    def has_unsaved_edits(self) -> bool:
+        """Check whether the editor differs from the open note as last saved"""
+        if self.current_file is None or self.document is None:
+            return False
+        return (self.editor.value or "") != self.base_content
     
-    def create_file_list_item(self, file_path: Path, is_selected: bool):
+    def create_file_list_item(self, meta: NoteMeta, is_selected: bool):
         """Create a clickable file list item"""
+        file_path = meta.path
         
-        # Get file modified time
-        mod_time = datetime.fromtimestamp(file_path.stat().st_mtime)
+        # Get file modified time (cached by the store, no stat() here)
+        mod_time = datetime.fromtimestamp(meta.mtime)
         time_str = mod_time.strftime("%b %d, %Y %H:%M")
         
         return ft.Container(
@@ -239,28 +1231,26 @@ class NotebookApp:
                 ),
             ], spacing=2),
             padding=10,
+            height=FILE_ROW_HEIGHT,
+            margin=ft.margin.only(bottom=FILE_ROW_GAP),
             bgcolor=ft.Colors.BLUE_50 if is_selected else ft.Colors.WHITE,
             border_radius=5,
-            on_click=lambda _, fp=file_path: self.open_file(fp),
+            on_click=lambda _, fp=file_path: self.page.run_task(self.open_file_async, fp),
             ink=True,
         )
     
+    def restyle_file_list_item(self, item: ft.Container, meta: NoteMeta, is_selected: bool):
+        """Update an existing file list item in place"""
+        name_text, time_text = item.content.controls
+        name_text.weight = ft.FontWeight.BOLD if is_selected else ft.FontWeight.NORMAL
+        name_text.color = ft.Colors.BLUE_700 if is_selected else ft.Colors.BLACK
+        time_text.value = datetime.fromtimestamp(meta.mtime).strftime("%b %d, %Y %H:%M")
+        item.bgcolor = ft.Colors.BLUE_50 if is_selected else ft.Colors.WHITE
+    
     def create_new_note(self, e):
         """Create a new markdown note"""
         try:
-            # Generate unique filename
-            base_name = "Untitled"
-            counter = 1
-            file_name = f"{base_name}.md"
-            file_path = NOTES_DIR / file_name
-            
-            while file_path.exists():
-                file_name = f"{base_name}{counter}.md"
-                file_path = NOTES_DIR / file_name
-                counter += 1
-            
-            # Create empty file
-            file_path.write_text("# New Note\n\nStart writing here...", encoding='utf-8')
+            file_path = self.create_note_file()
             
             # Reload files and open the new one
             self.load_files()
@@ -269,76 +1259,508 @@ class NotebookApp:
         except Exception as ex:
             self.show_error(f"Error creating new note: {str(ex)}")
     
+    async def create_new_note_async(self, e):
+        """Create a new markdown note off-thread, then open it"""
+        try:
+            file_path = await self.run_io(self.create_note_file)
+        except Exception as ex:
+            self.show_error(f"Error creating new note: {str(ex)}")
+            return
+        self.load_files()
+        await self.open_file_async(file_path)
+    
+    def create_note_file(self) -> Path:
+        """Create an untitled note in the store (blocking); returns its path"""
+        # Generate unique filename
+        base_name = "Untitled"
+        counter = 1
+        file_name = f"{base_name}.md"
+        file_path = self.store.root / file_name
+        
+        while self.store.exists(file_name):
+            file_name = f"{base_name}{counter}.md"
+            file_path = self.store.root / file_name
+            counter += 1
+        
+        # Create empty file
+        content = "# New Note\n\nStart writing here..."
+        self.store.create(file_name, content)
+        self.search_index.update(file_name, content)
+        self.link_index.update(file_name, content)
+        self.facet_index.update(file_name, content)
+        self.quick_index.add(file_name, extract_title(content, file_path.stem))
+        return file_path
+    
+    @HANDLER_SECONDS.labels("open_file").time()
     def open_file(self, file_path: Path):
         """Open a file for editing"""
         try:
-            self.is_loading = True
-            
-            # Save current file before switching
-            if self.current_file and self.current_file != file_path:
-                self.save_current_file(None, show_status=False)
-            
-            # Load file content
-            content = file_path.read_text(encoding='utf-8')
-            
-            self.current_file = file_path
-            self.editor.value = content
-            self.preview.value = content
-            self.current_file_label.value = file_path.name
-            
-            # Update file list to show selection
-            self.load_files()
-            
+            result = self.read_for_open(file_path)
+            if result is not None:
+                self.show_note(file_path, *result)
+        except Exception as ex:
             self.is_loading = False
-            self.page.update()
-            
+            self.show_error(f"Error opening file: {str(ex)}")
+    
+    @HANDLER_SECONDS.labels("open_file_async").time()
+    async def open_file_async(self, file_path: Path):
+        """Open a file with its I/O off-thread; a later open supersedes this one"""
+        self.open_generation += 1
+        generation = self.open_generation
+        
+        def read():
+            # Skip the read entirely if another note was clicked meanwhile
+            if generation != self.open_generation:
+                return None
+            return self.read_for_open(file_path)
+        
+        try:
+            result = await self.run_io(read)
+        except Exception as ex:
+            if generation == self.open_generation:
+                self.show_error(f"Error opening file: {str(ex)}")
+            return
+        if result is None:
+            return
+        if generation != self.open_generation:
+            self.release_note(file_path.name)
+            return
+        try:
+            self.show_note(file_path, *result)
         except Exception as ex:
             self.is_loading = False
             self.show_error(f"Error opening file: {str(ex)}")
     
+    def read_for_open(self, file_path: Path):
+        """Blocking part of opening a note: save the current one, read the new one
+        
+        Returns ``(content, version)``; the version is taken before the read
+        so a save racing with it is detected as a conflict later. Returns
+        None, and the switch is abandoned, if saving the current note ran
+        into a conflict the user has to resolve first.
+        """
+        # Save current file before switching, unless it is as last saved
+        if self.current_file and self.current_file != file_path:
+            if self.replica is None and not self.has_unsaved_edits():
+                self.autosave.cancel(self, self.current_file)
+            else:
+                self.save_current_file(None, show_status=False)
+                if self.conflict_open:
+                    return None  # Stay on the note the conflict dialog is about
+        
+        # Load file content, pinned in the shared cache while it is open
+        version = self.versions.current(file_path.name)
+        return self.acquire_note(file_path.name), version
+    
+    def show_note(self, file_path: Path, content: str, version: int):
+        """Show a note read by read_for_open in the editor and preview"""
+        self.is_loading = True
+        
+        if self.current_file is not None:
+            self.release_note(self.current_file.name)
+        if self.collab_hub is not None:
+            content = self.join_collab(file_path.name)
+        
+        # Drop preview refreshes still queued for the previous note; one
+        # still rendering is followed by this note's content
+        self.preview_scheduler.cancel(content)
+        
+        if self.current_file != file_path:
+            self.remember_last_note(file_path.name)
+        self.current_file = file_path
+        self.document = Document(content)
+        self.base_version = version
+        self.base_content = content
+        self.editor.value = content
+        self.preview.value = content
+        self.current_file_label.value = file_path.name
+        
+        # Update file list to show selection (restyles two rows at most)
+        self.file_rows.select(file_path)
+        
+        self.is_loading = False
+        controls = [self.editor, self.preview, self.current_file_label]
+        if self.refresh_backlinks():
+            controls.append(self.backlinks_panel)
+        self.page.update(*controls)
+    
+    def remember_last_note(self, name: str):
+        """Store the open note's name in client storage for the next startup"""
+        try:
+            self.page.run_task(self.page.client_storage.set_async, LAST_NOTE_KEY, name)
+        except Exception as e:
+            print(f"Error remembering last note: {e}")
+    
+    @HANDLER_SECONDS.labels("on_editor_change").time()
     def on_editor_change(self, e):
         """Handle editor text changes for live preview"""
-        if not self.is_loading:
-            # Update preview in real-time
-            self.preview.value = self.editor.value if self.editor.value else ""
+        if not self.is_loading and self.document is not None:
+            content = self.editor.value or ""
+            # Record the edit as a span; nothing to do if the text is unchanged
+            if self.document.sync(content) is None:
+                return
+            self.after_edit(content)
+    
+    def after_edit(self, content: str):
+        """Preview, share and autosave an edit the document has recorded"""
+        # Update preview (immediately or coalesced, depending on cost)
+        self.preview_scheduler.request(content)
+        
+        if self.replica is not None:
+            self.send_collab_ops(content)
+            # The hub's text, not this value, is what gets saved
+            self.autosave.mark_dirty(self, self.current_file, content, self.autosave_collab_note)
+            return
+        
+        # Coalesced auto-save through the shared scheduler; the write keeps
+        # the version it is based on in case the note is closed before it runs
+        version, base = self.base_version, self.base_content
+        self.autosave.mark_dirty(
+            self, self.current_file, content,
+            lambda path, text: self.autosave_note(path, text, version, base),
+        )
+    
+    def undo_edit(self, e):
+        """Revert the last edit made in the editor"""
+        if self.document is not None and not self.is_loading:
+            self.show_undo_step(self.document.undo())
+    
+    def redo_edit(self, e):
+        """Re-apply the last undone edit"""
+        if self.document is not None and not self.is_loading:
+            self.show_undo_step(self.document.redo())
+    
+    def show_undo_step(self, content):
+        """Show undone or redone text and handle it like a typed edit"""
+        if content is None:
+            return
+        self.editor.value = content
+        try:
+            self.editor.update()
+        except Exception:
+            pass  # Page might be closed
+        self.after_edit(content)
+    
+    def join_collab(self, name: str) -> str:
+        """Switch collaboration to a note; returns its shared content"""
+        self.leave_collab()
+        self.replica = self.collab_hub.join(name)
+        self.collab_topic = f"collab:{self.notes_topic}:{name}"
+        self.page.pubsub.subscribe_topic(self.collab_topic, self.on_collab_ops)
+        self.collab_shown = self.replica.text
+        return self.collab_shown
+    
+    def leave_collab(self):
+        """Stop receiving operations for the open note"""
+        if self.collab_topic is not None:
+            self.page.pubsub.unsubscribe_topic(self.collab_topic)
+            self.collab_topic = None
+        self.replica = None
+    
+    def send_collab_ops(self, content: str):
+        """Turn the editor change into CRDT operations and share them
+        
+        The edit is the difference from the text last written to the
+        editor. Remote operations merged into the replica since then are
+        not in that text, so the edit is rebased over them instead of being
+        diffed against the replica (which would undo them).
+        """
+        replica = self.replica
+        with replica.lock:
+            change = diff_span(self.collab_shown, content)
+            if change is None:
+                return
+            current = replica.text
+            if current != self.collab_shown:
+                change = rebase_span(change, diff_span(self.collab_shown, current))
+            ops = replica.edit(*change)
+            merged = replica.text
+            self.collab_shown = merged
+        if ops:
+            self.collab_hub.submit(self.current_file.name, ops)
+            self.page.pubsub.send_others_on_topic(self.collab_topic, ops)
+        if merged != content:
+            # Show the remote edits the typed value did not include
+            self.document.sync(merged, record=False)
+            self.editor.value = merged
+            self.preview_scheduler.request(merged)
+            try:
+                self.editor.update()
+            except Exception:
+                pass  # Page might be closed
+    
+    def on_collab_ops(self, topic, ops):
+        """Merge operations from another session into the editor"""
+        replica = self.replica
+        if replica is None or topic != self.collab_topic:
+            return
+        with replica.lock:
+            if not replica.apply(ops):
+                return
+            content = replica.text
+            self.collab_shown = content
+            self.editor.value = content
+        self.document.sync(content, record=False)
+        self.preview_scheduler.request(content)
+        try:
+            self.editor.update()
+        except Exception:
+            pass  # Page might be closed
+    
+    def render_preview(self, content: str):
+        """Render content into the preview panel"""
+        self.preview.value = content
+        self.page.update(self.preview)
+    
+    def write_note(self, file_path: Path, content: str, expected: int = None):
+        """Write a note to the note store and update the search index
+        
+        The open note is written as the span changed since its last save
+        when the store supports it (journaled file store). Raises
+        VersionConflict if another session saved the note since this
+        session's content was based on it: for the open note that is
+        ``base_version``, for other notes the ``expected`` version.
+        """
+        is_open = file_path == self.current_file and self.document is not None
+        if is_open:
+            expected = self.base_version
+        
+        def write():
+            write_edit = getattr(self.store, "write_edit", None)
+            change = self.document.take_change() if is_open and write_edit is not None else None
+            if change is not None:
+                write_edit(file_path.name, *change)
+                BYTES_WRITTEN.labels("edit").inc(len(change[3].encode("utf-8")))
+                return change[-1]
+            self.store.write(file_path.name, content)
+            BYTES_WRITTEN.labels("full").inc(len(content.encode("utf-8")))
+            return content
+        
+        version, content = self.versions.commit(file_path.name, expected, write)
+        if is_open:
+            self.base_version = version
+            self.base_content = content
+        
+        meta = self.store.get_meta(file_path.name)
+        try:
+            self.page.pubsub.send_others_on_topic(
+                self.notes_topic,
+                NoteChanged(file_path.name, version, meta.mtime if meta else 0.0),
+            )
+        except Exception:
+            pass  # Page might be closed
+
+        file_version = (meta.mtime, meta.size) if meta else None
+        self.search_index.update(file_path.name, content, file_version)
+        self.link_index.update(file_path.name, content, file_version)
+        self.facet_index.update(file_path.name, content, file_version)
+        self.quick_index.add(file_path.name, extract_title(content, file_path.stem))
+        self.history.record(file_path.name, content)
+        self.search_index.save_later(self.autosave.call_later, SEARCH_SAVE_DELAY)
+        self.link_index.save_later(self.autosave.call_later, SEARCH_SAVE_DELAY)
+        self.facet_index.save_later(self.autosave.call_later, SEARCH_SAVE_DELAY)
+    
+    def save_collab_note(self, file_path: Path, snapshot: bool = True):
+        """Persist a collaborative note and index its text
+        
+        With ``snapshot`` False only the operation log is made durable; the
+        hub writes the note to the store once its snapshot threshold is
+        reached.
+        """
+        name = file_path.name
+        if snapshot:
+            self.collab_hub.flush(name)
+        else:
+            self.collab_hub.sync(name)
+        content = self.collab_hub.text(name)
+        self.search_index.update(name, content)
+        self.link_index.update(name, content)
+        self.facet_index.update(name, content)
+        self.quick_index.add(name, extract_title(content, file_path.stem))
+        self.history.record(name, content)
+    
+    def autosave_collab_note(self, file_path: Path, content: str):
+        """Autosave callback for collaborative notes (content is ignored)"""
+        try:
+            self.save_collab_note(file_path, snapshot=False)
+        except Exception as ex:
+            self.show_error(f"Error saving collaborative note {file_path.name}: {ex}")
+    
+    def autosave_note(self, file_path: Path, content: str, expected: int = None,
+                      base: str = None):
+        """Write a note flushed by the autosave scheduler
+        
+        ``expected`` and ``base`` are the version and content the edit was
+        based on, used if the note was closed before the write ran.
+        """
+        try:
+            self.write_note(file_path, content, expected)
+        except VersionConflict:
+            if file_path == self.current_file:
+                self.resolve_conflict(file_path, content)
+            else:
+                self.merge_closed_note(file_path, content, base)
+        except Exception as ex:
+            self.show_error(f"Error saving file: {str(ex)}")
+    
+    def merge_closed_note(self, file_path: Path, content: str, base: str):
+        """Merge an autosave of a note no longer open with another session's save
+        
+        If the edits overlap, they are kept in the note's revision history
+        instead of overwriting the other session's save.
+        """
+        name = file_path.name
+        version = self.versions.current(name)
+        theirs = self.store.read(name)
+        merged = merge_spans(base, content, theirs) if base is not None else None
+        if merged is not None:
+            try:
+                self.write_note(file_path, merged, version)
+                return
+            except VersionConflict:
+                pass  # Saved again meanwhile
+        self.history.record(name, content)
+        self.show_error(
+            f"{name} was changed in another session; your last edits are in its revision history"
+        )
+    
+    def resolve_conflict(self, file_path: Path, content: str):
+        """Merge a save that raced with another session's, or ask the user"""
+        if self.conflict_open or file_path != self.current_file:
+            return
+        name = file_path.name
+        theirs_version = self.versions.current(name)
+        theirs = self.store.read(name)
+        merged = merge_spans(self.base_content, content, theirs) if self.base_content is not None else None
+        if merged is None:
+            self.show_conflict(file_path)
+            return
+        
+        # The editor may have moved on since content was queued
+        current = self.editor.value or ""
+        if current != content:
+            merged = merge_spans(content, current, merged)
+            if merged is None:
+                self.show_conflict(file_path)
+                return
+        
+        self.base_version = theirs_version
+        self.base_content = theirs
+        self.document.sync(merged, record=False)
+        if merged != current:
+            self.editor.value = merged
+            self.preview_scheduler.request(merged)
+            try:
+                self.editor.update()
+            except Exception:
+                pass  # Page might be closed
+        try:
+            self.write_note(file_path, merged)
+        except VersionConflict:
+            # A third session saved meanwhile; the merged text stays in the
+            # editor for the user to keep or drop
+            self.show_conflict(file_path)
+    
+    def show_conflict(self, file_path: Path):
+        """Ask whether to keep this session's text or load the other session's"""
+        self.conflict_open = True
+        
+        def close():
+            self.conflict_open = False
+            dialog.open = False
             self.page.update()
-            
-            # Debounced auto-save
-            if self.save_timer:
-                self.save_timer.cancel()
-            
-            self.save_timer = threading.Timer(1.0, lambda: self.save_current_file(None, auto=True))
-            self.save_timer.daemon = True
-            self.save_timer.start()
+        
+        def keep_mine(e):
+            close()
+            if self.current_file == file_path:
+                self.base_version = self.versions.current(file_path.name)
+                self.save_current_file(None)
+        
+        def load_theirs(e):
+            close()
+            if self.current_file == file_path:
+                self.reload_current_file()
+        
+        dialog = ft.AlertDialog(
+            title=ft.Text("Note changed in another session"),
+            content=ft.Text(
+                f"'{file_path.name}' was saved elsewhere while you were editing it, "
+                "and the changes overlap."
+            ),
+            actions=[
+                ft.TextButton("Load theirs", on_click=load_theirs),
+                ft.ElevatedButton("Keep mine", on_click=keep_mine),
+            ],
+        )
+        
+        self.page.dialog = dialog
+        dialog.open = True
+        self.page.update()
+    
+    def reload_current_file(self):
+        """Replace the editor content with the stored note, dropping local edits"""
+        if not self.current_file:
+            return
+        self.autosave.cancel(self, self.current_file)
+        name = self.current_file.name
+        version = self.versions.current(name)
+        content = self.store.read(name)
+        self.preview_scheduler.cancel(content)
+        self.document = Document(content)
+        self.base_version = version
+        self.base_content = content
+        self.editor.value = content
+        self.preview.value = content
+        self.page.update(self.editor, self.preview)
+    
+    def clear_save_status(self):
+        """Clear the save status label"""
+        self.save_status.value = ""
+        try:
+            self.save_status.update()
+        except:
+            pass  # Page might be closed
     
+    @HANDLER_SECONDS.labels("save_current_file").time()
     def save_current_file(self, e, auto=False, show_status=True):
         """Save the current file to disk"""
         if not self.current_file:
             return
         
         try:
+            if self.replica is not None:
+                self.autosave.cancel(self, self.current_file)
+                self.save_collab_note(self.current_file)
+                if not auto and show_status:
+                    self.save_status.value = "✓ Saved"
+                    self.save_status.update()
+                    self.autosave.call_later(2.0, self.clear_save_status)
+                return
+            
             content = self.editor.value or ""
-            self.current_file.write_text(content, encoding='utf-8')
+            # This write supersedes anything queued for the note
+            self.autosave.cancel(self, self.current_file)
+            try:
+                self.write_note(self.current_file, content)
+            except VersionConflict:
+                self.resolve_conflict(self.current_file, content)
+                return
             
             if not auto and show_status:
                 self.save_status.value = "✓ Saved"
-                self.page.update()
-                
-                # Clear status after 2 seconds
-                def clear_status():
-                    time.sleep(2)
-                    self.save_status.value = ""
-                    try:
-                        self.page.update()
-                    except:
-                        pass  # Page might be closed
+                self.save_status.update()
                 
-                threading.Thread(target=clear_status, daemon=True).start()
+                # Clear status after 2 seconds (on the shared scheduler thread)
+                self.autosave.call_later(2.0, self.clear_save_status)
                 
         except Exception as ex:
             if show_status:
                 self.show_error(f"Error saving file: {str(ex)}")
     
+    async def save_current_file_async(self, e):
+        """Save the current file with the write off-thread"""
+        await self.run_io(self.save_current_file, e)
+    
     def show_error(self, message: str):
         """Display error dialog"""
         def close_dialog(e):
@@ -360,6 +1782,11 @@ class NotebookApp:
 
 def main(page: ft.Page):
     """Main entry point for the application"""
+    if METRICS_PORT is not None:
+        try:
+            MetricsServer.shared(METRICS_HOST, METRICS_PORT)
+        except OSError as e:
+            print(f"Error starting metrics endpoint: {e}")
     NotebookApp(page)
 
 
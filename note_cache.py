@@ -0,0 +1,140 @@
+import threading
+from collections import OrderedDict
+
+
+class _Entry:
+    __slots__ = ("content", "version", "size", "refs")
+
+    def __init__(self, content: str, version, refs: int = 0):
+        self.content = content
+        self.version = version
+        self.size = len(content.encode("utf-8"))
+        self.refs = refs
+
+
+class NoteCache:
+    """Process-wide LRU cache of note contents with a byte budget
+
+    Sessions opening the same note share one decoded copy: concurrent
+    misses for a key wait for a single load instead of each reading the
+    file. Entries carry the note's version (e.g. mtime and size) and are
+    reloaded when the caller expects a different one. Notes that are open
+    somewhere are pinned with ``acquire``/``release`` and never evicted;
+    unpinned entries are evicted least recently used first once the
+    cached text, counted as UTF-8 bytes, exceeds ``max_bytes``.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, max_bytes: int = 64 * 1024 * 1024) -> "NoteCache":
+        """Return the process-wide cache, creating it on first use"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(max_bytes)
+            return cls._shared
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def get(self, key, load, version=None, acquire: bool = False) -> str:
+        """Return cached content for key, calling ``load()`` once on a miss
+
+        With ``version`` set, an entry cached under another version is
+        reloaded. With ``acquire`` the entry is also pinned.
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and (version is None or entry.version == version):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    if acquire:
+                        entry.refs += 1
+                    return entry.content
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # Another session is reading this note; share its result
+            loading.wait()
+
+        try:
+            content = load()
+        except BaseException:
+            with self._lock:
+                del self._loading[key]
+            loading.set()
+            raise
+        with self._lock:
+            del self._loading[key]
+            self._store(key, content, version, 1 if acquire else 0)
+        loading.set()
+        return content
+
+    def acquire(self, key, load, version=None) -> str:
+        """Return content for key and pin it until ``release``"""
+        return self.get(key, load, version, acquire=True)
+
+    def release(self, key):
+        """Unpin an entry returned by ``acquire``"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.refs > 0:
+                entry.refs -= 1
+                if not entry.refs:
+                    self._evict()
+
+    def put(self, key, content: str, version=None):
+        """Cache content just written for key (write-through)"""
+        with self._lock:
+            self._store(key, content, version, 0)
+
+    def invalidate(self, key):
+        """Drop an entry (pinned entries are dropped too)"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry.size
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def _store(self, key, content: str, version, refs: int):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old.size
+            refs += old.refs
+        entry = _Entry(content, version, refs)
+        self._entries[key] = entry
+        self.bytes += entry.size
+        self._evict()
+
+    def _evict(self):
+        if self.bytes <= self.max_bytes:
+            return
+        for key in list(self._entries):
+            entry = self._entries[key]
+            if entry.refs:
+                continue
+            del self._entries[key]
+            self.bytes -= entry.size
+            if self.bytes <= self.max_bytes:
+                return
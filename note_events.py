@@ -0,0 +1,102 @@
+import threading
+from contextlib import ExitStack
+
+
+class VersionConflict(Exception):
+    """A save was based on an older version of the note than the current one"""
+
+    def __init__(self, name: str, expected: int, actual: int):
+        super().__init__(f"{name} changed in another session (version {actual}, expected {expected})")
+        self.name = name
+        self.expected = expected
+        self.actual = actual
+
+
+class NoteChanged:
+    """Change event published to other sessions after a save"""
+
+    __slots__ = ("name", "version", "mtime", "sender")
+
+    def __init__(self, name: str, version: int, mtime: float, sender=None):
+        self.name = name
+        self.version = version
+        self.mtime = mtime
+        self.sender = sender
+
+    def __repr__(self):
+        return f"NoteChanged({self.name!r}, version={self.version}, mtime={self.mtime})"
+
+
+class NoteVersions:
+    """Process-wide version counters for optimistic concurrency control
+
+    Every save through ``commit`` bumps the note's version. A session
+    remembers the version its editor content is based on and passes it as
+    ``expected``; if another session saved in between, the write is not
+    performed and VersionConflict is raised instead.
+
+    Each note has its own lock, held while its write runs, so saves of
+    different notes do not wait for each other's I/O.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self._versions = {}
+        self._locks = {}
+        self._lock = threading.Lock()  # Guards _locks only
+
+    @classmethod
+    def shared(cls, key) -> "NoteVersions":
+        """Return the process-wide counters for key (e.g. a store's root)"""
+        with cls._shared_lock:
+            versions = cls._shared.get(key)
+            if versions is None:
+                versions = cls()
+                cls._shared[key] = versions
+            return versions
+
+    def _note_lock(self, name: str) -> threading.Lock:
+        with self._lock:
+            lock = self._locks.get(name)
+            if lock is None:
+                lock = self._locks[name] = threading.Lock()
+            return lock
+
+    def current(self, name: str) -> int:
+        """Return a note's current version (0 if never saved here)"""
+        return self._versions.get(name, 0)
+
+    def commit(self, name: str, expected, write):
+        """Run ``write()`` if the note is still at ``expected``; returns ``(version, result)``
+
+        With ``expected`` None the write is unconditional.
+        """
+        with self._note_lock(name):
+            actual = self._versions.get(name, 0)
+            if expected is not None and expected != actual:
+                raise VersionConflict(name, expected, actual)
+            result = write()
+            self._versions[name] = actual + 1
+            return actual + 1, result
+
+    def commit_many(self, expected: dict, write):
+        """Run ``write()`` if every note is still at its expected version
+
+        ``expected`` maps note names to versions; the first note that moved
+        on raises VersionConflict and nothing is written. Returns
+        ``(versions, result)`` with the new version of each note. The notes'
+        locks are taken in name order, so overlapping calls cannot deadlock.
+        """
+        with ExitStack() as stack:
+            for name in sorted(expected):
+                stack.enter_context(self._note_lock(name))
+            for name, version in expected.items():
+                actual = self._versions.get(name, 0)
+                if version != actual:
+                    raise VersionConflict(name, version, actual)
+            result = write()
+            versions = {name: version + 1 for name, version in expected.items()}
+            self._versions.update(versions)
+            return versions, result
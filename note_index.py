@@ -0,0 +1,489 @@
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # Optional: without it the watcher only polls
+    FileSystemEventHandler = object
+    Observer = None
+
+# Changes remembered for changes_since; readers further behind re-list
+CHANGE_LOG_SIZE = 4096
+# A note's title is its first line, so only the start of the file is read
+TITLE_READ_CHARS = 4096
+# Titles read from disk per listener notification
+TITLE_BATCH = 1000
+# Full rescans (a stat per note) catch edits in place that change neither the
+# directory nor, on network volumes, raise filesystem events; the interval
+# doubles while rescans find nothing, up to the maximum
+FULL_SCAN_INTERVAL = 30.0
+MAX_FULL_SCAN_INTERVAL = 600.0
+
+
+def extract_title(content: str, fallback: str) -> str:
+    """Return the first Markdown heading of a note, or the fallback"""
+    for line in content.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("#"):
+            title = stripped.lstrip("#").strip()
+            if title:
+                return title
+        elif stripped:
+            break
+    return fallback
+
+
+class NoteMeta:
+    """Cached metadata for a single note on disk"""
+
+    __slots__ = ("path", "mtime", "size", "title")
+
+    def __init__(self, path: Path, mtime: float, size: int, title: str):
+        self.path = path
+        self.mtime = mtime
+        self.size = size
+        self.title = title
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+
+class NoteIndex:
+    """In-memory index of the notes in a directory
+
+    The directory is scanned once; afterwards the index is kept current by
+    save/create calls from the app and by a watcher: filesystem events (with
+    watchdog installed) restat just the notes they name, a change of the
+    directory's mtime triggers a rescan, and an occasional full rescan
+    compares each file's mtime and size with the last ones seen, so notes
+    edited in place by other programs are picked up too.
+    Titles fall back to the file stem until the note's content has been seen
+    by the index; after each scan the titles of new and changed notes are
+    read from the start of their files, in batches.
+
+    Every change is numbered, so ``changes_since`` can tell listeners which
+    notes changed instead of making them compare the whole listing.
+
+    With ``scan=False`` the first scan is left to the watcher thread: notes
+    are published in batches of doubling size as they are found, listeners
+    are notified after each batch, and ``ready`` is set once the scan is
+    complete.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, directory: Path, suffix: str = ".md", scan: bool = True):
+        self.directory = Path(directory)
+        self.suffix = suffix
+        self._notes = {}
+        self._sorted = None
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._stats = {}  # path -> (st_mtime_ns, st_size) last seen on disk
+        self._untitled = set()  # paths whose title has not been read yet
+        self._generation = 0
+        self._changes = deque(maxlen=CHANGE_LOG_SIZE)  # (generation, path)
+        self._watcher = None
+        self._observer = None
+        self._events = set()  # paths named by filesystem events, not yet checked
+        self._wake = threading.Event()
+        self._dir_mtime = None  # directory st_mtime_ns at the last full scan
+        self._stop = threading.Event()
+        self.ready = threading.Event()
+        if scan:
+            self.refresh()
+
+    @classmethod
+    def shared(cls, directory: Path) -> "NoteIndex":
+        """Return the process-wide index for a directory, creating it once"""
+        key = Path(directory).resolve()
+        with cls._shared_lock:
+            index = cls._shared.get(key)
+            if index is None:
+                # Sessions start against an empty index that fills in as
+                # the watcher's first scan runs
+                index = cls(directory, scan=False)
+                index.start_watching()
+                cls._shared[key] = index
+            return index
+
+    def __contains__(self, path: Path) -> bool:
+        return Path(path) in self._notes
+
+    def __len__(self) -> int:
+        return len(self._notes)
+
+    def get(self, path: Path):
+        """Get cached metadata for a note, or None"""
+        return self._notes.get(Path(path))
+
+    def notes(self):
+        """Return note metadata sorted by modification time, newest first"""
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(
+                    self._notes.values(),
+                    key=lambda meta: meta.mtime,
+                    reverse=True,
+                )
+            return self._sorted
+
+    def _changed(self, path: Path):
+        """Record a change to one note; the caller holds ``_lock``"""
+        self._generation += 1
+        self._changes.append((self._generation, path))
+        self._sorted = None
+
+    def changes_since(self, generation):
+        """Return ``(generation, paths)``: the notes changed after a generation
+
+        ``paths`` is None when ``generation`` is None or too old to answer,
+        in which case the caller should re-read the whole listing. Pass the
+        returned generation next time.
+        """
+        with self._lock:
+            current = self._generation
+            if generation is None:
+                return current, None
+            if generation >= current:
+                return current, set()
+            if not self._changes or self._changes[0][0] > generation + 1:
+                return current, None
+            return current, {path for gen, path in self._changes if gen > generation}
+
+    def _directory_mtime(self):
+        try:
+            return os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return None
+
+    def refresh(self, batch: int = 0) -> bool:
+        """Rescan the directory and notify listeners if anything changed
+
+        With ``batch`` set, new notes are also published (and listeners
+        notified) every ``batch`` entries, doubling each time, before the
+        scan completes. Returns whether anything changed.
+        """
+        with self._lock:
+            known = set(self._notes)
+        # Taken before scanning, so changes made during the scan trigger another
+        self._dir_mtime = self._directory_mtime()
+        scanned = {}
+        found = []
+        try:
+            entries = os.scandir(self.directory)
+        except FileNotFoundError:
+            self.ready.set()
+            return False
+        with entries:
+            for entry in entries:
+                if not entry.name.endswith(self.suffix) or not entry.is_file():
+                    continue
+                st = entry.stat()
+                path = self.directory / entry.name
+                scanned[path] = (st.st_mtime, st.st_size, st.st_mtime_ns)
+                if batch:
+                    found.append(path)
+                    if len(found) >= batch:
+                        self._publish(found, scanned)
+                        found = []
+                        batch *= 2
+
+        changed = False
+        with self._lock:
+            # Only drop notes indexed before the scan started; ones the app
+            # added meanwhile may be missing from it
+            for path in [p for p in known if p in self._notes and p not in scanned]:
+                del self._notes[path]
+                self._stats.pop(path, None)
+                self._untitled.discard(path)
+                self._changed(path)
+                changed = True
+            for path, (mtime, size, mtime_ns) in scanned.items():
+                meta = self._notes.get(path)
+                # Compared with the file as last seen, not with the metadata,
+                # which may describe a write not checkpointed to the file yet
+                stat = (mtime_ns, size)
+                if meta is None:
+                    self._notes[path] = NoteMeta(path, mtime, size, path.stem)
+                    self._untitled.add(path)
+                    self._changed(path)
+                    changed = True
+                elif self._stats.get(path, stat) != stat:
+                    # Changed by another program; its title may have too
+                    meta.mtime = mtime
+                    meta.size = size
+                    self._untitled.add(path)
+                    self._changed(path)
+                    changed = True
+                self._stats[path] = stat
+
+        first = not self.ready.is_set()
+        self.ready.set()
+        if changed or first:
+            self.notify()
+        self._read_titles()
+        return changed
+
+    def refresh_paths(self, paths) -> bool:
+        """Restat only the given notes (e.g. named by filesystem events)
+
+        Returns whether anything changed; listeners are notified if so.
+        """
+        changed = False
+        for path in paths:
+            path = Path(path)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                st = None
+            except OSError as e:
+                print(f"Error checking {path}: {e}")
+                continue
+            with self._lock:
+                meta = self._notes.get(path)
+                if st is None:
+                    if meta is not None:
+                        del self._notes[path]
+                        self._stats.pop(path, None)
+                        self._untitled.discard(path)
+                        self._changed(path)
+                        changed = True
+                    continue
+                stat = (st.st_mtime_ns, st.st_size)
+                if meta is None:
+                    self._notes[path] = NoteMeta(path, st.st_mtime, st.st_size, path.stem)
+                elif self._stats.get(path) != stat:
+                    meta.mtime = st.st_mtime
+                    meta.size = st.st_size
+                else:
+                    continue
+                self._stats[path] = stat
+                self._untitled.add(path)
+                self._changed(path)
+                changed = True
+        if changed:
+            self.notify()
+            self._read_titles()
+        return changed
+
+    def _read_titles(self):
+        """Read the titles of notes only known by file name, notifying per batch"""
+        with self._lock:
+            pending = list(self._untitled)
+        for start in range(0, len(pending), TITLE_BATCH):
+            titles = []
+            for path in pending[start:start + TITLE_BATCH]:
+                try:
+                    with open(path, encoding="utf-8", errors="replace") as f:
+                        head = f.read(TITLE_READ_CHARS)
+                except OSError:
+                    continue
+                titles.append((path, extract_title(head, path.stem)))
+            changed = False
+            with self._lock:
+                for path, title in titles:
+                    meta = self._notes.get(path)
+                    # Skip notes the app wrote meanwhile (it knows their title)
+                    if path not in self._untitled or meta is None:
+                        continue
+                    self._untitled.discard(path)
+                    if meta.title != title:
+                        meta.title = title
+                        self._changed(path)
+                        changed = True
+            if changed:
+                self.notify()
+
+    def _publish(self, paths, scanned):
+        """Add notes found by a scan still in progress and notify"""
+        with self._lock:
+            for path in paths:
+                if path not in self._notes:
+                    mtime, size, mtime_ns = scanned[path]
+                    self._notes[path] = NoteMeta(path, mtime, size, path.stem)
+                    self._stats[path] = (mtime_ns, size)
+                    self._untitled.add(path)
+                    self._changed(path)
+        self.notify()
+
+    def touch(self, path: Path, content: str = None):
+        """Update a single entry after the app wrote it (one stat, no rescan)"""
+        path = Path(path)
+        st = path.stat()
+        with self._lock:
+            meta = self._notes.get(path)
+            if meta is None:
+                meta = NoteMeta(path, st.st_mtime, st.st_size, path.stem)
+                self._notes[path] = meta
+            else:
+                meta.mtime = st.st_mtime
+                meta.size = st.st_size
+            if content is not None:
+                meta.title = extract_title(content, path.stem)
+                self._untitled.discard(path)
+            # Our own write; the watcher must not report it as an edit
+            self._stats[path] = (st.st_mtime_ns, st.st_size)
+            self._changed(path)
+        self._own_change()
+
+    def _own_change(self):
+        """Adopt the directory mtime after the app's own write or delete
+
+        Otherwise every save would look like a change by another program and
+        cost a rescan. Another program's change in the same instant is left
+        to the next full rescan.
+        """
+        if self._watcher is not None:
+            self._dir_mtime = self._directory_mtime()
+
+    def update(self, path: Path, content: str, mtime: float):
+        """Record a write that has not reached the file yet (e.g. journaled)"""
+        path = Path(path)
+        size = len(content.encode("utf-8"))
+        with self._lock:
+            meta = self._notes.get(path)
+            if meta is None:
+                meta = NoteMeta(path, mtime, size, path.stem)
+                self._notes[path] = meta
+            else:
+                meta.mtime = mtime
+                meta.size = size
+            meta.title = extract_title(content, path.stem)
+            self._untitled.discard(path)
+            self._changed(path)
+
+    def remove(self, path: Path):
+        """Drop a note from the index"""
+        with self._lock:
+            path = Path(path)
+            self._stats.pop(path, None)
+            self._untitled.discard(path)
+            if self._notes.pop(path, None) is not None:
+                self._changed(path)
+        self._own_change()
+
+    def subscribe(self, callback):
+        """Register a callback invoked when the watcher detects changes"""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        """Remove a previously registered callback"""
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def notify(self):
+        """Invoke all registered callbacks"""
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error in note index listener: {e}")
+
+    def _on_event(self, path: str):
+        """Queue a path named by a filesystem event for the watcher thread"""
+        if path.endswith(self.suffix):
+            with self._lock:
+                self._events.add(self.directory / os.path.basename(path))
+            self._wake.set()
+
+    def _start_observer(self):
+        if Observer is None:
+            return
+        try:
+            observer = Observer()
+            observer.schedule(_EventHandler(self), str(self.directory), recursive=False)
+            observer.daemon = True
+            observer.start()
+        except Exception as e:
+            print(f"Error watching {self.directory}, polling instead: {e}")
+            return
+        self._observer = observer
+
+    def start_watching(self, interval: float = 2.0, batch: int = 500,
+                       full_interval: float = FULL_SCAN_INTERVAL):
+        """Start a daemon thread that keeps the index current
+
+        Notes named by filesystem events are restatted as the events arrive.
+        Every ``interval`` seconds the thread stats the directory itself and
+        rescans it only if its mtime changed (a note was added, removed or
+        replaced). Edits in place change no directory mtime and may raise no
+        event on network volumes, so a full rescan also runs after
+        ``full_interval`` seconds, backing off to MAX_FULL_SCAN_INTERVAL
+        while rescans find nothing. Listeners are only notified when a note
+        was added, removed or changed on disk.
+
+        If the directory has not been scanned yet, the thread scans it
+        first, publishing notes ``batch`` at a time.
+        """
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+        self._start_observer()
+
+        def watch():
+            if not self.ready.is_set():
+                try:
+                    self.refresh(batch)
+                except OSError as e:
+                    print(f"Error scanning {self.directory}: {e}")
+                    self.ready.set()
+            backoff = full_interval
+            next_full = time.monotonic() + backoff
+            while not self._stop.is_set():
+                self._wake.wait(interval)
+                self._wake.clear()
+                if self._stop.is_set():
+                    break
+                with self._lock:
+                    events, self._events = self._events, set()
+                try:
+                    if events:
+                        self.refresh_paths(events)
+                    if time.monotonic() >= next_full:
+                        backoff = full_interval if self.refresh() else min(backoff * 2, MAX_FULL_SCAN_INTERVAL)
+                        next_full = time.monotonic() + backoff
+                    elif self._directory_mtime() != self._dir_mtime:
+                        if self.refresh():
+                            backoff = full_interval
+                            next_full = time.monotonic() + backoff
+                except OSError as e:
+                    print(f"Error scanning {self.directory}: {e}")
+
+        self._watcher = threading.Thread(target=watch, daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        """Stop the watcher thread"""
+        self._stop.set()
+        self._wake.set()
+        self._watcher = None
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+
+
+class _EventHandler(FileSystemEventHandler):
+    """Forwards watchdog events for a directory to its NoteIndex"""
+
+    def __init__(self, index: NoteIndex):
+        super().__init__()
+        self.index = index
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        self.index._on_event(event.src_path)
+        dest = getattr(event, "dest_path", "")
+        if dest:
+            self.index._on_event(dest)
@@ -0,0 +1,424 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Protocol
+
+from journal import WriteAheadJournal, atomic_write, fsync_directory
+from note_cache import NoteCache
+from note_index import NoteIndex, NoteMeta, extract_title
+
+
+class NoteStore(Protocol):
+    """Storage operations shared by both front-ends
+
+    Notes are addressed by file name (e.g. ``"Untitled.md"``); metadata paths
+    are reported under the store's ``root``. Missing and duplicate notes
+    raise FileNotFoundError and FileExistsError. ``watch`` callbacks run when
+    notes are created or deleted, or when the store notices changes made
+    outside the process; they return a function that removes the callback.
+    """
+
+    root: Path
+
+    def list_meta(self) -> List[NoteMeta]: ...
+
+    def get_meta(self, name: str) -> Optional[NoteMeta]: ...
+
+    def exists(self, name: str) -> bool: ...
+
+    def read(self, name: str) -> str: ...
+
+    def write(self, name: str, content: str) -> None: ...
+
+    def create(self, name: str, content: str) -> None: ...
+
+    def delete(self, name: str) -> None: ...
+
+    def refresh(self) -> None: ...
+
+    def watch(self, callback: Callable[[], None]) -> Callable[[], None]: ...
+
+
+class StoreWatchers:
+    """Listener bookkeeping for stores that notify in-process"""
+
+    def _init_watchers(self):
+        self._watchers = []
+        self._watchers_lock = threading.Lock()
+
+    def watch(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Register a change callback; returns a function that removes it"""
+        with self._watchers_lock:
+            self._watchers.append(callback)
+
+        def unwatch():
+            with self._watchers_lock:
+                if callback in self._watchers:
+                    self._watchers.remove(callback)
+
+        return unwatch
+
+    def _notify(self):
+        with self._watchers_lock:
+            watchers = list(self._watchers)
+        for callback in watchers:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error in note store watcher: {e}")
+
+
+class FileNoteStore:
+    """Notes as ``.md`` files in a directory, listed through a NoteIndex
+
+    Writes replace files atomically (temp file plus rename). With a
+    ``journal`` they are appended to a WriteAheadJournal instead and reach
+    the files at its next checkpoint; reads see journaled content first.
+
+    With a ``cache``, reads are served from a shared NoteCache keyed by path
+    and checked against the index's version of the note (mtime and size),
+    and writes update the cache.
+    """
+
+    def __init__(self, directory: Path, journal: Optional[WriteAheadJournal] = None,
+                 cache: Optional[NoteCache] = None):
+        self.root = Path(directory)
+        self.root.mkdir(exist_ok=True)
+        self.index = NoteIndex.shared(self.root)
+        self.journal = journal
+        self.cache = cache
+        if journal is not None:
+            journal.on_checkpoint = self._on_checkpoint
+
+    def _version(self, path: Path):
+        meta = self.index.get(path)
+        return (meta.mtime, meta.size) if meta is not None else None
+
+    def _cache_put(self, path: Path, content: str):
+        if self.cache is not None:
+            self.cache.put(path, content, self._version(path))
+
+    def _on_checkpoint(self, path: Path, content: str):
+        self.index.touch(path, content)
+        self._cache_put(path, content)
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        """Wait until the index's first scan has finished; returns whether it has"""
+        return self.index.ready.wait(timeout)
+
+    def list_meta(self) -> List[NoteMeta]:
+        """Return note metadata, newest first (served from the index)
+
+        Until ``wait_ready`` returns True this lists the notes found so far.
+        """
+        return self.index.notes()
+
+    def get_meta(self, name: str) -> Optional[NoteMeta]:
+        """Return metadata for one note, or None"""
+        return self.index.get(self.root / name)
+
+    def exists(self, name: str) -> bool:
+        """Check whether a note exists"""
+        path = self.root / name
+        return path in self.index or path.exists()
+
+    def _read_uncached(self, name: str) -> str:
+        if self.journal is not None:
+            content = self.journal.latest(name)
+            if content is not None:
+                return content
+        return (self.root / name).read_text(encoding="utf-8")
+
+    def read(self, name: str) -> str:
+        """Return a note's content"""
+        if self.cache is None:
+            return self._read_uncached(name)
+        path = self.root / name
+        return self.cache.get(path, lambda: self._read_uncached(name), self._version(path))
+
+    def acquire(self, name: str) -> str:
+        """Read a note and keep it cached until ``release`` (e.g. while open)"""
+        if self.cache is None:
+            return self._read_uncached(name)
+        path = self.root / name
+        return self.cache.acquire(path, lambda: self._read_uncached(name), self._version(path))
+
+    def release(self, name: str):
+        """Let a note returned by ``acquire`` be evicted again"""
+        if self.cache is not None:
+            self.cache.release(self.root / name)
+
+    def write(self, name: str, content: str):
+        """Create or overwrite a note"""
+        path = self.root / name
+        if self.journal is not None:
+            self.journal.append(name, content)
+            self.index.update(path, content, time.time())
+        else:
+            atomic_write(path, content)
+            self.index.touch(path, content)
+        self._cache_put(path, content)
+
+    def write_many(self, changes: dict):
+        """Overwrite several notes at once (name -> content)
+
+        With a journal the batch is one journal record, so it survives a
+        crash entirely or not at all. Without one, every new file is
+        written and fsynced before any note is replaced, so a failure while
+        writing changes nothing; only a crash during the final renames can
+        leave part of the batch applied.
+        """
+        if self.journal is not None:
+            self.journal.append_batch(changes)
+            now = time.time()
+            for name, content in changes.items():
+                self.index.update(self.root / name, content, now)
+                self._cache_put(self.root / name, content)
+            return
+        staged = []
+        try:
+            for name, content in changes.items():
+                path = self.root / name
+                tmp = path.with_name(f".{path.name}.tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(content)
+                    f.flush()
+                    os.fsync(f.fileno())
+                staged.append((tmp, path))
+        except BaseException:
+            for tmp, _ in staged:
+                tmp.unlink(missing_ok=True)
+            raise
+        for tmp, path in staged:
+            os.replace(tmp, path)
+        fsync_directory(self.root)
+        for name, content in changes.items():
+            self.index.touch(self.root / name, content)
+            self._cache_put(self.root / name, content)
+
+    def file_path(self, name: str) -> Optional[Path]:
+        """Return the file holding a note's current content, or None
+
+        None means the latest content is only in the journal (not yet
+        checkpointed), so the file must not be read directly.
+        """
+        if self.journal is not None and name in self.journal:
+            return None
+        return self.root / name
+
+    def write_edit(self, name: str, base: str, pos: int, removed_len: int,
+                   inserted: str, content: str):
+        """Write a note given the span that changed since base
+
+        Journaled stores record just the span; otherwise this is ``write``.
+        """
+        if self.journal is not None:
+            self.journal.append_edit(name, base, pos, removed_len, inserted, content)
+            self.index.update(self.root / name, content, time.time())
+            self._cache_put(self.root / name, content)
+        else:
+            self.write(name, content)
+
+    def create(self, name: str, content: str):
+        """Create a new note, failing if it already exists"""
+        path = self.root / name
+        with open(path, "x", encoding="utf-8") as f:
+            f.write(content)
+        if self.journal is not None and name in self.journal:
+            self.journal.append(name, content)  # Supersede a pending deletion
+        self.index.touch(path, content)
+        self._cache_put(path, content)
+        self.index.notify()
+
+    def delete(self, name: str):
+        """Delete a note"""
+        path = self.root / name
+        path.unlink()
+        if self.journal is not None and name in self.journal:
+            self.journal.delete(name)
+        if self.cache is not None:
+            self.cache.invalidate(path)
+        self.index.remove(path)
+        self.index.notify()
+
+    def refresh(self):
+        """Rescan the directory"""
+        self.index.refresh()
+
+    def changes_since(self, generation):
+        """Return ``(generation, names)`` of notes changed since a generation
+
+        ``names`` is None if the caller must re-read the whole listing; see
+        ``NoteIndex.changes_since``.
+        """
+        generation, paths = self.index.changes_since(generation)
+        return generation, None if paths is None else {path.name for path in paths}
+
+    def watch(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Register a callback for changes seen by the index or its watcher"""
+        self.index.subscribe(callback)
+        return lambda: self.index.unsubscribe(callback)
+
+
+class MemoryNoteStore(StoreWatchers):
+    """Notes kept in a dict; for tests, benchmarks and scratch sessions"""
+
+    def __init__(self, root: Path = Path()):
+        self.root = Path(root)
+        self._notes = {}
+        self._meta = {}
+        self._sorted = None
+        self._lock = threading.Lock()
+        self._init_watchers()
+
+    def list_meta(self) -> List[NoteMeta]:
+        """Return note metadata, newest first"""
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(self._meta.values(), key=lambda meta: meta.mtime, reverse=True)
+            return self._sorted
+
+    def get_meta(self, name: str) -> Optional[NoteMeta]:
+        """Return metadata for one note, or None"""
+        return self._meta.get(name)
+
+    def exists(self, name: str) -> bool:
+        """Check whether a note exists"""
+        return name in self._notes
+
+    def read(self, name: str) -> str:
+        """Return a note's content"""
+        try:
+            return self._notes[name]
+        except KeyError:
+            raise FileNotFoundError(name) from None
+
+    def write(self, name: str, content: str):
+        """Create or overwrite a note"""
+        self.write_many({name: content})
+
+    def write_many(self, changes: dict):
+        """Create or overwrite several notes at once (name -> content)"""
+        now = time.time()
+        with self._lock:
+            created = any(name not in self._notes for name in changes)
+            for name, content in changes.items():
+                self._notes[name] = content
+                self._meta[name] = NoteMeta(
+                    self.root / name,
+                    now,
+                    len(content.encode("utf-8")),
+                    extract_title(content, Path(name).stem),
+                )
+            self._sorted = None
+        if created:
+            self._notify()
+
+    def create(self, name: str, content: str):
+        """Create a new note, failing if it already exists"""
+        if name in self._notes:
+            raise FileExistsError(name)
+        self.write(name, content)
+
+    def delete(self, name: str):
+        """Delete a note"""
+        with self._lock:
+            if name not in self._notes:
+                raise FileNotFoundError(name)
+            del self._notes[name]
+            del self._meta[name]
+            self._sorted = None
+        self._notify()
+
+    def refresh(self):
+        """Nothing to rescan for an in-memory store"""
+
+
+class ClientStorageNoteStore(StoreWatchers):
+    """Notes in Flet client storage (browser localStorage on the web)
+
+    Each note is stored under its own key, plus a small manifest with the
+    list of note names, so writing a note only transmits that note. Client
+    storage keeps no timestamps, so metadata is listed in manifest order.
+    A legacy single-blob layout is migrated on first use.
+    """
+
+    LEGACY_KEY = "notebook_files"
+    MANIFEST_KEY = "notebook_manifest"
+    FILE_KEY_PREFIX = "notebook_file:"
+
+    def __init__(self, page, root: Path = Path()):
+        self.page = page
+        self.root = Path(root)
+        self._names = []
+        self._init_watchers()
+        self.refresh()
+
+    def _file_key(self, name: str) -> str:
+        """Client storage key for a note"""
+        return self.FILE_KEY_PREFIX + name
+
+    def _save_manifest(self):
+        self.page.client_storage.set(self.MANIFEST_KEY, self._names)
+
+    def refresh(self):
+        """Reload the manifest, migrating the legacy blob if needed"""
+        manifest = self.page.client_storage.get(self.MANIFEST_KEY)
+        if manifest is not None:
+            self._names = list(manifest)
+            return
+
+        self._names = []
+        stored_data = self.page.client_storage.get(self.LEGACY_KEY)
+        if stored_data:
+            files_data = json.loads(stored_data) if isinstance(stored_data, str) else stored_data
+            for name, data in files_data.items():
+                self.page.client_storage.set(self._file_key(name), data.get("content", ""))
+                self._names.append(name)
+            self._save_manifest()
+            self.page.client_storage.remove(self.LEGACY_KEY)
+
+    def list_meta(self) -> List[NoteMeta]:
+        """Return note metadata in manifest order"""
+        return [NoteMeta(self.root / name, 0.0, 0, Path(name).stem) for name in self._names]
+
+    def get_meta(self, name: str) -> Optional[NoteMeta]:
+        """Return metadata for one note, or None"""
+        if name not in self._names:
+            return None
+        return NoteMeta(self.root / name, 0.0, 0, Path(name).stem)
+
+    def exists(self, name: str) -> bool:
+        """Check whether a note exists"""
+        return name in self._names
+
+    def read(self, name: str) -> str:
+        """Return a note's content"""
+        if name not in self._names:
+            raise FileNotFoundError(name)
+        return self.page.client_storage.get(self._file_key(name)) or ""
+
+    def write(self, name: str, content: str):
+        """Create or overwrite a note (writes only this note's key)"""
+        self.page.client_storage.set(self._file_key(name), content)
+        if name not in self._names:
+            self._names.append(name)
+            self._save_manifest()
+            self._notify()
+
+    def create(self, name: str, content: str):
+        """Create a new note, failing if it already exists"""
+        if name in self._names:
+            raise FileExistsError(name)
+        self.write(name, content)
+
+    def delete(self, name: str):
+        """Delete a note"""
+        if name not in self._names:
+            raise FileNotFoundError(name)
+        self._names.remove(name)
+        self._save_manifest()
+        self.page.client_storage.remove(self._file_key(name))
+        self._notify()
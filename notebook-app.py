@@ -1,7 +1,23 @@
 import flet as ft
-import json
 import os
-from typing import Dict, List
+import threading
+from datetime import datetime
+from typing import Dict, List, Set
+
+from autosave import AutosaveScheduler
+from document import Document
+from file_list import VirtualFileList
+from history import RevisionHistory
+from note_store import ClientStorageNoteStore, NoteStore
+from preview import MarkdownPreview, PreviewScheduler
+from search_index import SearchIndex
+
+# Fixed height of a file list row plus the gap below it (virtualized list)
+FILE_ROW_HEIGHT = 56
+FILE_ROW_GAP = 5
+
+# Client storage key remembering the note that was open last
+LAST_FILE_KEY = "notebook_last_file"
 
 
 class MarkdownFile:
@@ -15,52 +31,105 @@ class MarkdownFile:
 
 
 class FileManager:
-    """Handles file operations and storage"""
+    """Handles file operations and storage
     
-    STORAGE_KEY = "notebook_files"
+    Notes are persisted through a NoteStore (client storage by default,
+    one key per note). Notes are read lazily on first access. An edit only
+    updates the note in memory and adds it to a dirty set; the shared
+    autosave scheduler writes it (and records its history and search
+    terms) once typing pauses, and ``flush`` writes dirty notes right away.
+    """
     
-    def __init__(self, page: ft.Page):
+    def __init__(self, page: ft.Page, store: NoteStore = None, autosave: AutosaveScheduler = None):
         self.page = page
+        self.store = store if store is not None else ClientStorageNoteStore(page)
+        self.autosave = autosave if autosave is not None else AutosaveScheduler.shared()
         self._files: Dict[str, MarkdownFile] = {}
+        self._dirty: Set[str] = set()
+        self._lock = threading.Lock()
+        # Revisions of the session's saves (client storage has no room for them)
+        self.history = RevisionHistory()
         self._load_files()
+        # Full-text index over the session's notes, built in the background
+        self.search_index = SearchIndex()
+        self.search_index.build_in_background(self.store)
     
     def _load_files(self):
-        """Load files from browser local storage"""
+        """Create the welcome note if the store is empty"""
         try:
-            stored_data = self.page.client_storage.get(self.STORAGE_KEY)
-            if stored_data:
-                files_data = json.loads(stored_data) if isinstance(stored_data, str) else stored_data
-                for name, data in files_data.items():
-                    self._files[name] = MarkdownFile(name, data.get('content', ''))
-            else:
+            if not self.store.list_meta():
                 # Create default file if no files exist
                 default_file = MarkdownFile("Welcome.md", "# Welcome to Notebook\n\nThis is your first note. You can:\n\n- Create new files\n- Edit markdown content\n- See live preview\n- All data is saved locally in your browser\n\n## Getting Started\n\nClick the **New File** button to create a new note.")
-                self._files["Welcome.md"] = default_file
-                self._save_files()
+                self._files[default_file.name] = default_file
+                self.store.create(default_file.name, default_file.content)
         except Exception as e:
             print(f"Error loading files: {e}")
-            # Create default file on error
-            default_file = MarkdownFile("Welcome.md", "# Welcome to Notebook\n\nStart writing your notes here...")
-            self._files["Welcome.md"] = default_file
+            # Keep a default file in memory on error
+            if not self._files:
+                default_file = MarkdownFile("Welcome.md", "# Welcome to Notebook\n\nStart writing your notes here...")
+                self._files[default_file.name] = default_file
+                self._dirty.add(default_file.name)
     
-    def _save_files(self):
-        """Save files to browser local storage"""
+    def _save_file(self, name: str):
+        """Save a single note to the store"""
+        with self._lock:
+            file = self._files.get(name)
+            if file is None:
+                return
+            content = file.content
         try:
-            files_data = {
-                name: {"content": file.content}
-                for name, file in self._files.items()
-            }
-            self.page.client_storage.set(self.STORAGE_KEY, json.dumps(files_data))
+            self.store.write(name, content)
         except Exception as e:
-            print(f"Error saving files: {e}")
+            print(f"Error saving file {name}: {e}")
+            return
+        with self._lock:
+            # Still dirty if it was edited while being written
+            if file.content is content:
+                self._dirty.discard(name)
+        self.history.record(name, content)
+        self.search_index.update(name, content)
+    
+    def _autosave(self, name: str, content: str):
+        """Write a note queued by update_file (runs on the autosave worker)"""
+        self._save_file(name)
+    
+    def flush(self, name: str = None):
+        """Save all notes with unsaved changes now, or just ``name``"""
+        # Drops the queued autosaves and waits for one in flight
+        self.autosave.cancel(self, name)
+        with self._lock:
+            names = [n for n in self._dirty if name is None or n == name]
+        for n in names:
+            self._save_file(n)
+    
+    def is_dirty(self, name: str) -> bool:
+        """Check whether a note has changes not yet in storage"""
+        return name in self._dirty
+    
+    def search(self, query: str) -> List[str]:
+        """Get names of files matching a full-text query, best first"""
+        return self.search_index.search(query)
     
     def get_files(self) -> List[str]:
         """Get list of file names"""
-        return list(self._files.keys())
+        names = [meta.name for meta in self.store.list_meta()]
+        # Notes that only exist in memory (unsaved) are listed too
+        names.extend(name for name in self._files if name not in names)
+        return names
     
     def get_file(self, name: str) -> MarkdownFile:
-        """Get file by name"""
-        return self._files.get(name)
+        """Get file by name, reading it from storage on first access"""
+        file = self._files.get(name)
+        if file is None:
+            try:
+                file = MarkdownFile(name, self.store.read(name))
+            except FileNotFoundError:
+                return None
+            except Exception as e:
+                print(f"Error loading file {name}: {e}")
+                return None
+            self._files[name] = file
+        return file
     
     def create_file(self, name: str) -> MarkdownFile:
         """Create a new file"""
@@ -69,20 +138,38 @@ class FileManager:
         
         file = MarkdownFile(name)
         self._files[name] = file
-        self._save_files()
+        self._dirty.add(name)
+        try:
+            self.store.create(name, file.content)
+            self._dirty.discard(name)
+        except Exception as e:
+            print(f"Error creating file {name}: {e}")
+        self.search_index.update(name, file.content)
         return file
     
     def update_file(self, name: str, content: str):
-        """Update file content"""
-        if name in self._files:
-            self._files[name].content = content
-            self._save_files()
+        """Update a note in memory and mark it dirty (nothing is written yet)"""
+        file = self.get_file(name)
+        if file is not None:
+            with self._lock:
+                file.content = content
+                self._dirty.add(name)
+            self.autosave.mark_dirty(self, name, content, self._autosave)
     
     def delete_file(self, name: str):
         """Delete a file"""
-        if name in self._files and len(self._files) > 1:  # Keep at least one file
-            del self._files[name]
-            self._save_files()
+        if len(self.get_files()) > 1 and self.get_file(name) is not None:  # Keep at least one file
+            self.autosave.cancel(self, name)
+            with self._lock:
+                self._files.pop(name, None)
+                self._dirty.discard(name)
+            self.search_index.remove(name)
+            try:
+                self.store.delete(name)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"Error removing file {name}: {e}")
             return True
         return False
 
@@ -92,16 +179,35 @@ class NotebookApp:
     
     def __init__(self, page: ft.Page):
         self.page = page
-        self.file_manager = FileManager(page)
+        # Created in the background once the shell is on screen
+        self.file_manager = None
         self.current_file = None
+        self.document = None  # Open note text and its unsaved span
         
         # UI Components
         self.file_list = ft.ListView(
             expand=True,
-            spacing=5,
+            spacing=0,
             padding=ft.padding.all(10)
         )
         
+        # Virtualized, keyed rows for file_list: only rows near the viewport
+        # exist, and only changed rows are sent on update
+        self.file_rows = VirtualFileList(
+            self.file_list,
+            create_item=self._create_file_item,
+            restyle_item=self._restyle_file_item,
+            entry=lambda filename: (filename, filename, None),
+            item_extent=FILE_ROW_HEIGHT + FILE_ROW_GAP
+        )
+        
+        self.search_field = ft.TextField(
+            hint_text="Search notes",
+            prefix_icon=ft.icons.SEARCH,
+            dense=True,
+            on_change=self._on_search_change
+        )
+        
         self.markdown_editor = ft.TextField(
             multiline=True,
             expand=True,
@@ -111,7 +217,8 @@ class NotebookApp:
             text_style=ft.TextStyle(font_family="monospace", size=14)
         )
         
-        self.markdown_preview = ft.Markdown(
+        # Block-level preview: only edited blocks are re-sent and re-rendered
+        self.markdown_preview = MarkdownPreview(
             value="",
             selectable=True,
             extension_set=ft.MarkdownExtensionSet.GITHUB_WEB,
@@ -119,8 +226,11 @@ class NotebookApp:
             expand=True
         )
         
+        # Adapts preview refresh rate to note size and measured render cost
+        self.preview_scheduler = PreviewScheduler(self._render_preview)
+        
         self._setup_ui()
-        self._load_initial_file()
+        threading.Thread(target=self._load_in_background, daemon=True).start()
     
     def _setup_ui(self):
         """Setup the user interface"""
@@ -147,6 +257,10 @@ class NotebookApp:
                     padding=ft.padding.all(15),
                     bgcolor=ft.colors.SURFACE_VARIANT
                 ),
+                ft.Container(
+                    content=self.search_field,
+                    padding=ft.padding.symmetric(horizontal=15, vertical=10)
+                ),
                 ft.Container(
                     content=self.file_list,
                     expand=True,
@@ -174,6 +288,21 @@ class NotebookApp:
                                 tooltip="Save (Ctrl+S)",
                                 on_click=self._save_current_file
                             ),
+                            ft.IconButton(
+                                icon=ft.icons.UNDO,
+                                tooltip="Undo edit",
+                                on_click=self._undo_edit
+                            ),
+                            ft.IconButton(
+                                icon=ft.icons.REDO,
+                                tooltip="Redo edit",
+                                on_click=self._redo_edit
+                            ),
+                            ft.IconButton(
+                                icon=ft.icons.HISTORY,
+                                tooltip="Revision history",
+                                on_click=self._show_history
+                            ),
                             ft.IconButton(
                                 icon=ft.icons.DELETE,
                                 tooltip="Delete File",
@@ -236,55 +365,127 @@ class NotebookApp:
         ])
         
         self.page.add(main_layout)
+        self.page.on_close = self._on_page_close
         self._refresh_file_list()
     
+    def _on_page_close(self, e):
+        """Write notes with unsaved changes before the session ends"""
+        if self.file_manager is not None:
+            self.file_manager.flush()
+    
+    def _load_in_background(self):
+        """Open storage, show the last open note, then list the files"""
+        try:
+            self.file_manager = FileManager(self.page)
+            self._load_initial_file()
+            self._refresh_file_list()
+        except Exception as e:
+            print(f"Error loading files: {e}")
+    
     def _load_initial_file(self):
-        """Load the first available file"""
+        """Load the file that was open last, or the first available one"""
         files = self.file_manager.get_files()
-        if files:
-            self._select_file(files[0])
+        last = self.page.client_storage.get(LAST_FILE_KEY)
+        if self.current_file is None and files:
+            self._select_file(last if last in files else files[0])
     
     def _refresh_file_list(self):
         """Refresh the file list in the UI"""
-        self.file_list.controls.clear()
-        
-        files = self.file_manager.get_files()
-        for filename in sorted(files):
-            file_item = ft.Container(
-                content=ft.ListTile(
-                    leading=ft.Icon(ft.icons.INSERT_DRIVE_FILE, size=20),
-                    title=ft.Text(filename, size=14),
-                    on_click=lambda e, name=filename: self._select_file(name),
-                    selected=filename == (self.current_file.name if self.current_file else None)
-                ),
-                border_radius=8,
-                padding=ft.padding.symmetric(horizontal=5)
-            )
-            self.file_list.controls.append(file_item)
-        
-        self.page.update()
+        if self.file_manager is None:
+            return  # Still loading
+        query = (self.search_field.value or "").strip()
+        if query:
+            files = self.file_manager.search(query)
+        else:
+            files = sorted(self.file_manager.get_files())
+        self.file_rows.set_items(
+            files,
+            selected_key=self.current_file.name if self.current_file else None
+        )
+    
+    def _on_search_change(self, e):
+        """Filter the file list by the search box query"""
+        self._refresh_file_list()
+    
+    def _create_file_item(self, filename: str, selected: bool) -> ft.Container:
+        """Create a file list item"""
+        return ft.Container(
+            content=ft.ListTile(
+                leading=ft.Icon(ft.icons.INSERT_DRIVE_FILE, size=20),
+                title=ft.Text(filename, size=14),
+                on_click=lambda e, name=filename: self._select_file(name),
+                selected=selected
+            ),
+            border_radius=8,
+            padding=ft.padding.symmetric(horizontal=5),
+            height=FILE_ROW_HEIGHT,
+            margin=ft.margin.only(bottom=FILE_ROW_GAP)
+        )
+    
+    def _restyle_file_item(self, item: ft.Container, filename: str, selected: bool):
+        """Update the selection state of an existing file list item"""
+        item.content.selected = selected
     
     def _select_file(self, filename: str):
         """Select and load a file for editing"""
         file = self.file_manager.get_file(filename)
         if file:
+            if not self.current_file or self.current_file.name != filename:
+                self.page.client_storage.set(LAST_FILE_KEY, filename)
+                if self.current_file:
+                    # Write the note being left instead of waiting for autosave
+                    self.file_manager.flush(self.current_file.name)
+            self.preview_scheduler.cancel(file.content)
             self.current_file = file
+            self.document = Document(file.content)
             self.markdown_editor.value = file.content
             self.markdown_preview.value = file.content
-            self._refresh_file_list()
-            self.page.update()
+            self.file_rows.select(filename)
+            self.page.update(self.markdown_editor, self.markdown_preview)
     
     def _on_editor_change(self, e):
         """Handle editor content changes - real-time preview update"""
         if self.current_file:
-            content = self.markdown_editor.value
-            self.markdown_preview.value = content
-            # Auto-save to local storage
-            self.file_manager.update_file(self.current_file.name, content)
-            self.page.update()
+            content = self.markdown_editor.value or ""
+            # Change events that leave the text as it was need no work
+            if self.document is not None and self.document.sync(content) is None:
+                return
+            self._after_edit(content)
+    
+    def _after_edit(self, content: str):
+        """Preview and autosave an edit the document has recorded"""
+        self.preview_scheduler.request(content)
+        # Marks the note dirty; autosave writes it once typing pauses
+        self.file_manager.update_file(self.current_file.name, content)
+    
+    def _undo_edit(self, e):
+        """Revert the last edit made in the editor"""
+        if self.current_file and self.document is not None:
+            self._show_undo_step(self.document.undo())
+    
+    def _redo_edit(self, e):
+        """Re-apply the last undone edit"""
+        if self.current_file and self.document is not None:
+            self._show_undo_step(self.document.redo())
+    
+    def _show_undo_step(self, content):
+        """Show undone or redone text and handle it like a typed edit"""
+        if content is None:
+            return
+        self.markdown_editor.value = content
+        self.page.update(self.markdown_editor)
+        self._after_edit(content)
+    
+    def _render_preview(self, content: str):
+        """Render content into the preview panel"""
+        self.markdown_preview.value = content
+        self.page.update(self.markdown_preview)
     
     def _create_new_file(self, e):
         """Create a new markdown file"""
+        if self.file_manager is None:
+            return  # Still loading
+        
         def create_file_dialog(e):
             filename = filename_input.value.strip()
             if filename:
@@ -334,6 +535,8 @@ class NotebookApp:
         if self.current_file:
             content = self.markdown_editor.value
             self.file_manager.update_file(self.current_file.name, content)
+            # Retry anything an earlier write failed to store
+            self.file_manager.flush()
             # Show save confirmation
             self.page.show_snack_bar(
                 ft.SnackBar(
@@ -342,6 +545,42 @@ class NotebookApp:
                 )
             )
     
+    def _show_history(self, e):
+        """Show the current file's revisions and restore one into the editor"""
+        if not self.current_file:
+            return
+        name = self.current_file.name
+        
+        def restore(index):
+            dialog.open = False
+            if self.current_file and self.current_file.name == name:
+                self.markdown_editor.value = self.file_manager.history.get(name, index)
+                self._on_editor_change(None)
+            self.page.update()
+        
+        revisions = ft.ListView(height=320, spacing=0)
+        for index, timestamp, length in self.file_manager.history.revisions(name):
+            revisions.controls.append(
+                ft.ListTile(
+                    title=ft.Text(datetime.fromtimestamp(timestamp).strftime("%H:%M:%S")),
+                    subtitle=ft.Text(f"{length} characters"),
+                    dense=True,
+                    on_click=lambda e, i=index: restore(i)
+                )
+            )
+        
+        dialog = ft.AlertDialog(
+            title=ft.Text(f"History - {name}"),
+            content=ft.Column([revisions], tight=True, width=400),
+            actions=[
+                ft.TextButton("Close", on_click=lambda e: setattr(dialog, 'open', False) or self.page.update())
+            ]
+        )
+        
+        self.page.dialog = dialog
+        dialog.open = True
+        self.page.update()
+    
     def _delete_current_file(self, e):
         """Delete the current file"""
         if not self.current_file:
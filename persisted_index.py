@@ -0,0 +1,245 @@
+import abc
+import itertools
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+# Fenced code blocks and inline code spans, whose contents are not links or tags
+FENCE_RE = re.compile(r"^(```|~~~).*?^\1[ \t]*$", re.MULTILINE | re.DOTALL)
+INLINE_CODE_RE = re.compile(r"`[^`\n]*`")
+
+
+def strip_code(text: str) -> str:
+    """Return Markdown text without its fenced code blocks and inline code"""
+    return INLINE_CODE_RE.sub("", FENCE_RE.sub("", text))
+
+
+class PersistedIndex(abc.ABC):
+    """Base for in-memory note indexes persisted to one file per index
+
+    Subclasses keep their own structures, guarded by ``_lock``, and
+    implement the hooks below; this class tracks each note's version (mtime
+    and size), builds the index from a NoteStore in the background and
+    persists it. ``build`` loads the saved index and re-reads only notes
+    whose version changed since it was saved; a note saved while ``build``
+    was reading it keeps the saved content.
+
+    The file holds a format header and one JSON line per note with its
+    version and the subclass's entry for it. Only a shallow copy is taken
+    under the lock to save: entries must not be modified in place once
+    indexed, so they can be serialized while updates go on.
+    """
+
+    # Written in the file header; a file with another format is rebuilt
+    format_version = 1
+    # Used in error messages
+    description = "index"
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: Path = None):
+        self.path = Path(path) if path else None
+        self._versions = {}
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._save_scheduled = False
+        self._updates = itertools.count()
+        self._updated = {}  # name -> number of its last update or removal
+        self.ready = threading.Event()
+        self._ready_callbacks = []
+
+    @classmethod
+    def shared(cls, path: Path, store):
+        """Return the process-wide index persisted at path, built once in the background"""
+        key = (cls, Path(path).resolve())
+        with cls._shared_lock:
+            index = cls._shared.get(key)
+            if index is None:
+                index = cls(path)
+                index.build_in_background(store)
+                cls._shared[key] = index
+            return index
+
+    # -- Hooks -----------------------------------------------------------------
+
+    def _parse(self, content: str):
+        """Extract what ``_index`` needs from a note's content (without the lock)"""
+        return content
+
+    @abc.abstractmethod
+    def _index(self, name: str, parsed, version):
+        """Index a note's parsed content now (called with ``_lock`` held)"""
+
+    def _queue(self, name: str, parsed, version):
+        """Index a saved note; subclasses may defer the work"""
+        self._index(name, parsed, version)
+
+    @abc.abstractmethod
+    def _unindex(self, name: str):
+        """Drop a note's entries (called with ``_lock`` held)"""
+
+    @abc.abstractmethod
+    def _entries(self) -> dict:
+        """Return a copy of name -> entry (called with ``_lock`` held)"""
+
+    def _encode(self, entry):
+        """Return the JSON form of an entry (called without the lock)"""
+        return entry
+
+    @abc.abstractmethod
+    def _clear(self):
+        """Drop every entry before loading (called with ``_lock`` held)"""
+
+    @abc.abstractmethod
+    def _load_entry(self, name: str, data):
+        """Index a note's entry read back from the file (``_lock`` held)"""
+
+    # -- Updates ---------------------------------------------------------------
+
+    def update(self, name: str, content: str, version=None):
+        """Index a saved note"""
+        parsed = self._parse(content)
+        with self._lock:
+            self._updated[name] = next(self._updates)
+            self._queue(name, parsed, version)
+
+    def remove(self, name: str):
+        """Drop a note from the index"""
+        with self._lock:
+            self._updated[name] = next(self._updates)
+            self._unindex(name)
+            self._versions.pop(name, None)
+            self._dirty = True
+
+    def when_ready(self, callback):
+        """Call ``callback()`` once the index is built (now, if it already is)"""
+        with self._lock:
+            if not self.ready.is_set():
+                self._ready_callbacks.append(callback)
+                return
+        callback()
+
+    # -- Building --------------------------------------------------------------
+
+    def build(self, store):
+        """Bring the index up to date with a NoteStore
+
+        Loads the persisted index if there is one, re-reads only notes whose
+        version changed, drops notes that no longer exist and saves.
+        """
+        if self.path and not self._versions:
+            self.load()
+
+        # Stores that list notes as they are discovered must finish first,
+        # or notes not found yet would be dropped from the index
+        wait_ready = getattr(store, "wait_ready", None)
+        if wait_ready is not None:
+            wait_ready()
+
+        metas = list(store.list_meta())
+        names = {meta.name for meta in metas}
+        with self._lock:
+            for name in [n for n in self._versions if n not in names]:
+                self.remove(name)
+
+        for meta in metas:
+            version = (meta.mtime, meta.size)
+            with self._lock:
+                if self._versions.get(meta.name) == version:
+                    continue
+                last_update = self._updated.get(meta.name)
+            try:
+                parsed = self._parse(store.read(meta.name))
+            except Exception as e:
+                print(f"Error indexing {meta.name} for the {self.description}: {e}")
+                continue
+            with self._lock:
+                # A save while the note was read carries newer content
+                if self._updated.get(meta.name) == last_update:
+                    self._index(meta.name, parsed, version)
+
+        with self._lock:
+            self.ready.set()
+            callbacks, self._ready_callbacks = self._ready_callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error notifying {self.description} readiness: {e}")
+        self.save()
+
+    def build_in_background(self, store) -> threading.Thread:
+        """Run ``build(store)`` on a daemon thread"""
+        thread = threading.Thread(target=self.build, args=(store,), daemon=True)
+        thread.start()
+        return thread
+
+    # -- Persistence -----------------------------------------------------------
+
+    def load(self) -> bool:
+        """Load the persisted index; returns False if there is none"""
+        if not self.path or not self.path.exists():
+            return False
+        records = []
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                if json.loads(f.readline() or "{}").get("format") != self.format_version:
+                    return False
+                for line in f:
+                    records.append(json.loads(line))
+        except Exception as e:
+            print(f"Error loading {self.description}: {e}")
+            return False
+        with self._lock:
+            self._clear()
+            self._versions = {}
+            for name, version, data in records:
+                self._load_entry(name, data)
+                self._versions[name] = tuple(version) if version is not None else None
+            self._dirty = False
+        return True
+
+    def save_later(self, call_later, delay: float = 30.0):
+        """Schedule one save through ``call_later(delay, fn)`` unless one is pending"""
+        with self._lock:
+            if self._save_scheduled or not self.path:
+                return
+            self._save_scheduled = True
+        call_later(delay, self.save)
+
+    def _prepare_save(self):
+        """Bring the index up to date before it is copied for saving (``_lock`` held)"""
+
+    def save(self):
+        """Persist the index atomically if it changed since the last save
+
+        Only a shallow copy is taken under the lock; notes are serialized
+        one at a time afterwards, so updates and queries are not blocked
+        while the file is written.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            self._save_scheduled = False
+            self._prepare_save()
+            if not self._dirty:
+                return
+            entries = self._entries()
+            versions = dict(self._versions)
+            self._dirty = False
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"format": self.format_version}) + "\n")
+                for name, version in versions.items():
+                    entry = entries.get(name)
+                    record = [name, version, self._encode(entry) if entry is not None else None]
+                    f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"Error saving {self.description}: {e}")
+            with self._lock:
+                self._dirty = True
@@ -0,0 +1,263 @@
+import re
+import threading
+import time
+
+import flet as ft
+
+
+# Reference-style link and footnote definitions: "[label]: target"
+DEFINITION_RE = re.compile(r"^ {0,3}\[[^\]\n]+\]:", re.MULTILINE)
+ATX_HEADING_RE = re.compile(r"#{1,6}(?:[ \t]|$)")
+LIST_ITEM_RE = re.compile(r"(?:[-+*]|\d{1,9}[.)])(?:[ \t]|$)")
+FENCE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+# HTML blocks that may contain blank lines, and what ends each of them
+HTML_BLOCKS = (
+    (re.compile(r" {0,3}<(?:pre|script|style|textarea)(?:[ \t>]|$)", re.IGNORECASE),
+     re.compile(r"</(?:pre|script|style|textarea)>", re.IGNORECASE)),
+    (re.compile(r" {0,3}<!--"), re.compile(r"-->")),
+    (re.compile(r" {0,3}<\?"), re.compile(r"\?>")),
+    (re.compile(r" {0,3}<![A-Za-z]"), re.compile(r">")),
+    (re.compile(r" {0,3}<!\[CDATA\["), re.compile(r"\]\]>")),
+)
+
+
+def split_blocks(text: str):
+    """Split Markdown into top-level blocks that render the same on their own
+
+    Only boundaries that cannot change how the rest of the document is
+    parsed are used: around unindented ATX headings and fenced code, and at
+    blank lines followed by an unindented line that does not start a list
+    item (which could continue a loose list). Indented continuations,
+    setext headings, lists and HTML blocks therefore stay in one block.
+    Documents with link reference or footnote definitions, which other
+    blocks may refer to, are kept as a single block.
+    """
+    if DEFINITION_RE.search(text):
+        return [text] if text.strip() else []
+
+    blocks = []
+    current = []
+    fence = None
+    html_end = None
+    blank = False
+
+    def flush():
+        while current and not current[-1].strip():
+            current.pop()
+        if current:
+            blocks.append("\n".join(current))
+            current.clear()
+
+    for line in text.split("\n"):
+        stripped = line.lstrip()
+        if fence:
+            current.append(line)
+            if stripped.startswith(fence) and not stripped.rstrip().strip(fence[0]):
+                fence = None
+                if not line[:1].isspace():
+                    flush()
+            continue
+        if html_end:
+            current.append(line)
+            if html_end.search(line):
+                html_end = None
+            continue
+        if not stripped:
+            blank = True
+            if current:
+                current.append(line)
+            continue
+        top_level = not line[:1].isspace()
+        match = FENCE_RE.match(line)
+        if top_level and (ATX_HEADING_RE.match(line) or match):
+            flush()
+        elif blank and top_level and not LIST_ITEM_RE.match(line):
+            flush()
+        blank = False
+        if match:
+            fence = match.group(1)
+        else:
+            for start, end in HTML_BLOCKS:
+                found = start.match(line)
+                if found and not end.search(line, found.end()):
+                    html_end = end
+                    break
+        current.append(line)
+        if top_level and ATX_HEADING_RE.match(line):
+            flush()
+
+    flush()
+    return blocks
+
+
+class MarkdownPreview(ft.Column):
+    """Markdown preview rendered as one ft.Markdown control per block
+
+    Drop-in for ft.Markdown: assigning ``value`` splits the document into
+    blocks keyed by their content and reuses the controls of unchanged
+    blocks, so an update only sends the blocks an edit actually touched.
+    ``link_transform``, if given, rewrites each new block before it is
+    rendered (e.g. wiki links into Markdown links); ``value`` stays the
+    original text.
+    """
+
+    def __init__(self, value: str = "", selectable: bool = False, extension_set=None,
+                 on_tap_link=None, auto_follow_links: bool = False, link_transform=None,
+                 **kwargs):
+        kwargs.setdefault("spacing", 12)
+        super().__init__(**kwargs)
+        self._markdown_args = {
+            "selectable": selectable,
+            "extension_set": extension_set,
+            "on_tap_link": on_tap_link,
+            "auto_follow_links": auto_follow_links,
+        }
+        self._link_transform = link_transform
+        self._text = ""
+        self._blocks = {}
+        self.value = value
+
+    @property
+    def value(self) -> str:
+        return self._text
+
+    @value.setter
+    def value(self, text: str):
+        self._text = text or ""
+        blocks = {}
+        controls = []
+        occurrences = {}
+
+        for block in split_blocks(self._text):
+            # Identical blocks (e.g. repeated "---") get distinct keys
+            n = occurrences.get(block, 0)
+            occurrences[block] = n + 1
+            key = (block, n)
+            control = self._blocks.get(key)
+            if control is None:
+                rendered = self._link_transform(block) if self._link_transform else block
+                control = ft.Markdown(value=rendered, **self._markdown_args)
+            blocks[key] = control
+            controls.append(control)
+
+        self._blocks = blocks
+        self.controls = controls
+
+
+class PreviewScheduler:
+    """Adaptive scheduler for preview refreshes
+
+    ``render(text)`` is timed on every call and an exponential moving average
+    of its cost drives the refresh rate:
+
+    - small notes that render within the frame budget refresh immediately
+      in the change handler;
+    - otherwise changes are coalesced and rendered by a single worker thread
+      at most once per interval (twice the measured cost, never faster than
+      the frame budget), so keystrokes never wait on a render;
+    - if a render costs more than ``max_interval`` the preview only refreshes
+      once typing has been idle for ``idle_delay`` seconds.
+
+    The latest requested text is always rendered eventually, so the preview
+    ends up current once typing stops. The worker exits when nothing is
+    pending. ``render`` is always called with no lock held, so it may call
+    into the page from any thread.
+    """
+
+    def __init__(self, render, immediate_chars: int = 10_000, frame_budget: float = 1 / 30,
+                 max_interval: float = 1.0, idle_delay: float = 0.3):
+        self.render = render
+        self.immediate_chars = immediate_chars
+        self.frame_budget = frame_budget
+        self.max_interval = max_interval
+        self.idle_delay = idle_delay
+        self.cost = 0.0
+        self._pending = None
+        self._rendering = False
+        self._generation = 0  # bumped by cancel; older renders are skipped
+        self._worker = None
+        self._last_render = 0.0
+        self._last_request = 0.0
+        self._cond = threading.Condition()
+
+    def interval(self) -> float:
+        """Minimum time between coalesced refreshes for the measured cost"""
+        return max(self.frame_budget, 2 * self.cost)
+
+    def request(self, text: str):
+        """Schedule a refresh of the preview with ``text``"""
+        with self._cond:
+            self._last_request = time.monotonic()
+            immediate = (
+                len(text) <= self.immediate_chars
+                and self.cost <= self.frame_budget
+                and self._worker is None
+                and not self._rendering
+            )
+            if not immediate:
+                self._queue(text)
+                return
+            self._pending = None
+            self._rendering = True
+            generation = self._generation
+        self._render(text, generation)
+
+    def _queue(self, text: str):
+        """Make ``text`` the pending refresh; the caller holds ``_cond``"""
+        self._pending = text
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, daemon=True)
+            self._worker.start()
+        self._cond.notify()
+
+    def cancel(self, text: str = None):
+        """Drop any pending refresh without waiting for one in flight
+
+        A render already running finishes on its own thread. If ``text``
+        (the content the caller is about to show) is given and a render is
+        running, ``text`` is rendered again after it, so the stale render
+        cannot stay on screen.
+        """
+        with self._cond:
+            self._generation += 1
+            self._pending = None
+            if text is not None and self._rendering:
+                self._queue(text)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._pending is None:
+                    self._worker = None
+                    return
+                if self.interval() >= self.max_interval:
+                    due = self._last_request + self.idle_delay
+                else:
+                    due = self._last_render + self.interval()
+                delay = due - time.monotonic()
+                if delay > 0 or self._rendering:
+                    self._cond.wait(delay if delay > 0 else None)
+                    continue
+                text = self._pending
+                self._pending = None
+                self._rendering = True
+                generation = self._generation
+            self._render(text, generation)
+
+    def _render(self, text: str, generation: int):
+        start = time.monotonic()
+        # Cancelled between being taken and starting: skipped, and not timed
+        current = generation == self._generation
+        try:
+            if current:
+                self.render(text)
+        except Exception as e:
+            print(f"Error rendering preview: {e}")
+        finally:
+            end = time.monotonic()
+            with self._cond:
+                if current:
+                    self.cost = 0.7 * self.cost + 0.3 * (end - start) if self.cost else end - start
+                    self._last_render = end
+                self._rendering = False
+                self._cond.notify_all()
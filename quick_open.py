@@ -0,0 +1,213 @@
+import heapq
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+def trigrams(text: str) -> frozenset:
+    """Return the set of padded, lower-cased 3-grams of text"""
+    padded = f"  {text.lower()} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class TrigramIndex:
+    """Typo-tolerant index over note names and first headings
+
+    Each note's searchable text (file stem plus title) is broken into
+    trigrams. A query only scores notes that share at least half of its
+    trigrams; by the pigeonhole principle those notes must appear in one of
+    the rarest posting lists, so candidates are gathered from those lists
+    alone instead of the whole corpus. When even the rare lists are long,
+    trigram hits are counted over all lists at once instead of per note.
+    """
+
+    # Above this many candidates, count hits with a Counter over the posting
+    # lists rather than intersecting each candidate's trigram set
+    DENSE_CANDIDATES = 2000
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self._postings = {}
+        self._docs = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def shared(cls, key, store) -> "TrigramIndex":
+        """Return the process-wide index for key, built from a NoteStore once
+
+        The index then follows the store's change notifications.
+        """
+        with cls._shared_lock:
+            index = cls._shared.get(key)
+            if index is None:
+                index = cls()
+                index.follow(store)
+                cls._shared[key] = index
+            return index
+
+    def follow(self, store):
+        """Index a NoteStore and keep up with it; returns a function that stops
+
+        Stores that report which notes changed (``changes_since``) are
+        applied note by note; others are re-synced from their full listing.
+        """
+        changes_since = getattr(store, "changes_since", None)
+        generation = None
+
+        def on_change():
+            nonlocal generation
+            with self._lock:
+                names = None
+                if changes_since is not None:
+                    current, names = changes_since(generation)
+                if names is None:
+                    self.sync(store.list_meta())
+                else:
+                    for name in names:
+                        meta = store.get_meta(name)
+                        if meta is None:
+                            self.remove(name)
+                        else:
+                            self.add(name, meta.title)
+                if changes_since is not None:
+                    generation = current
+
+        # Watch first so notes the store discovers meanwhile are not missed
+        unwatch = store.watch(on_change)
+        on_change()
+        return unwatch
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._docs
+
+    def add(self, name: str, title: str = ""):
+        """Index (or re-index) a note by name and title"""
+        stem = Path(name).stem
+        text = (stem if not title or title == stem else f"{stem} {title}").lower()
+        with self._lock:
+            current = self._docs.get(name)
+            if current is not None and current[0] == text:
+                return
+            self.remove(name)
+            grams = trigrams(text)
+            self._docs[name] = (text, grams)
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(name)
+
+    def remove(self, name: str):
+        """Drop a note from the index"""
+        with self._lock:
+            doc = self._docs.pop(name, None)
+            if doc is None:
+                return
+            for gram in doc[1]:
+                postings = self._postings.get(gram)
+                if postings is not None:
+                    postings.discard(name)
+                    if not postings:
+                        del self._postings[gram]
+
+    def rename(self, old: str, new: str, title: str = ""):
+        """Move a note to a new name"""
+        with self._lock:
+            self.remove(old)
+            self.add(new, title)
+
+    def sync(self, metas):
+        """Add, re-title and drop notes to match a metadata listing"""
+        with self._lock:
+            seen = set()
+            for meta in metas:
+                seen.add(meta.name)
+                self.add(meta.name, meta.title)
+            for name in [n for n in self._docs if n not in seen]:
+                self.remove(name)
+
+    def search(self, query: str, limit: int = 50, is_cancelled=None):
+        """Return up to ``limit`` note names ranked by fuzzy similarity
+
+        Returns None if ``is_cancelled()`` became true while searching.
+        """
+        needle = query.strip().lower()
+        if not needle:
+            return []
+        grams = trigrams(needle)
+        min_hits = max(1, (len(grams) + 1) // 2)
+
+        with self._lock:
+            lists = sorted((self._postings.get(g, ()) for g in grams), key=len)
+            candidates = set()
+            for postings in lists[:len(grams) - min_hits + 1]:
+                candidates.update(postings)
+
+            if len(candidates) > self.DENSE_CANDIDATES:
+                counts = Counter()
+                for postings in lists:
+                    counts.update(postings)
+                    if is_cancelled is not None and is_cancelled():
+                        return None
+                matches = ((name, hits) for name, hits in counts.items() if hits >= min_hits)
+            else:
+                matches = ((name, len(grams & self._docs[name][1])) for name in candidates)
+
+            scored = []
+            for i, (name, hits) in enumerate(matches):
+                if is_cancelled is not None and not i % 1024 and is_cancelled():
+                    return None
+                if hits < min_hits:
+                    continue
+                text = self._docs[name][0]
+                score = hits / len(grams) - 0.001 * len(text)
+                if needle in text:
+                    score += 0.5
+                    if text.startswith(needle):
+                        score += 0.25
+                scored.append((score, name))
+
+        return [name for _, name in heapq.nlargest(limit, scored)]
+
+
+class LatestQuery:
+    """Runs queries on a shared worker pool, dropping superseded ones
+
+    Every ``submit`` supersedes the previous query of the same runner:
+    stale queries are skipped if they have not started, cancelled at the
+    next checkpoint if they have, and their results are never delivered.
+    """
+
+    _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="quick-open")
+
+    def __init__(self, search, on_result):
+        self.search = search
+        self.on_result = on_result
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def submit(self, query: str):
+        """Run ``search(query, is_cancelled=...)`` and deliver it if still current"""
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+
+        def is_stale():
+            return generation != self._generation
+
+        def run():
+            if is_stale():
+                return
+            results = self.search(query, is_cancelled=is_stale)
+            if results is not None and not is_stale():
+                self.on_result(query, results)
+
+        self._executor.submit(run)
+
+    def cancel(self):
+        """Supersede any query in flight without starting a new one"""
+        with self._lock:
+            self._generation += 1
@@ -0,0 +1,87 @@
+import hashlib
+import re
+from pathlib import Path
+
+# Matches described per note for the preview (all of them are replaced)
+MAX_PREVIEW_MATCHES = 20
+# Characters of the line shown on each side of a match
+PREVIEW_CONTEXT = 60
+
+
+class MatchPreview:
+    """One match as shown in the preview: its line, clipped around the match"""
+
+    __slots__ = ("line", "text", "start", "end", "replaced")
+
+    def __init__(self, line: int, text: str, start: int, end: int, replaced):
+        self.line = line
+        self.text = text
+        self.start = start
+        self.end = end
+        self.replaced = replaced
+
+
+class NoteMatches:
+    """Matches found in one note; ``digest`` identifies the content searched"""
+
+    __slots__ = ("name", "digest", "count", "matches", "error")
+
+    def __init__(self, name: str, digest, count: int, matches, error=None):
+        self.name = name
+        self.digest = digest
+        self.count = count
+        self.matches = matches
+        self.error = error
+
+
+def content_digest(content: str) -> bytes:
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).digest()
+
+
+def describe_matches(content: str, regex, replacement=None, limit: int = MAX_PREVIEW_MATCHES):
+    """Return (match count, previews of the first ``limit`` matches)"""
+    count = 0
+    previews = []
+    line = 1
+    pos = 0
+    for match in regex.finditer(content):
+        count += 1
+        if len(previews) >= limit:
+            continue
+        start, end = match.span()
+        line += content.count("\n", pos, start)
+        pos = start
+        line_start = content.rfind("\n", 0, start) + 1
+        line_end = content.find("\n", end)
+        if line_end < 0:
+            line_end = len(content)
+        clip_start = max(line_start, start - PREVIEW_CONTEXT)
+        clip_end = min(line_end, end + PREVIEW_CONTEXT)
+        text = content[clip_start:clip_end]
+        replaced = None
+        if replacement is not None:
+            replaced = text[:start - clip_start] + match.expand(replacement) + text[end - clip_start:]
+        previews.append(MatchPreview(line, text, start - clip_start, end - clip_start, replaced))
+    return count, previews
+
+
+def scan_chunk(tasks, pattern: str, flags: int, replacement=None, limit: int = MAX_PREVIEW_MATCHES):
+    """Search one chunk of notes (runs in a pool process)
+
+    ``tasks`` are ``(name, path, content)`` triples; notes given by path are
+    read here, so only file names cross the process boundary. Returns the
+    NoteMatches of notes with matches or read errors.
+    """
+    regex = re.compile(pattern, flags)
+    results = []
+    for name, path, content in tasks:
+        if content is None:
+            try:
+                content = Path(path).read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError) as e:
+                results.append(NoteMatches(name, None, 0, [], str(e)))
+                continue
+        count, previews = describe_matches(content, regex, replacement, limit)
+        if count:
+            results.append(NoteMatches(name, content_digest(content), count, previews))
+    return results
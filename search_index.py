@@ -0,0 +1,180 @@
+import math
+import re
+import threading
+from pathlib import Path
+
+from persisted_index import PersistedIndex
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+PHRASE_RE = re.compile(r'"([^"]+)"')
+
+FORMAT_VERSION = 3
+
+
+def tokenize(text: str):
+    """Return ``(token, position)`` pairs for lower-cased words in text"""
+    return [(m.group().lower(), i) for i, m in enumerate(TOKEN_RE.finditer(text))]
+
+
+class SearchIndex(PersistedIndex):
+    """Incrementally maintained inverted index over note contents
+
+    Postings map each token to the notes containing it and the token
+    positions within each note, so queries intersect the smallest posting
+    lists first and quoted phrases are checked by position. Updates are
+    queued and applied just before the next query (or by the background
+    builder), so per-keystroke updates coalesce into one re-tokenization.
+
+    When ``path`` is set the index is persisted there (see PersistedIndex)
+    with each note's token positions; postings are rebuilt from them on
+    load.
+    """
+
+    format_version = FORMAT_VERSION
+    description = "search index"
+
+    def __init__(self, path: Path = None):
+        super().__init__(path)
+        self._postings = {}
+        self._docs = {}  # name -> {token: positions}, shared with the postings
+        self._pending = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._docs or name in self._pending
+
+    def _queue(self, name: str, content: str, version):
+        # Tokenized by apply_pending, so repeated updates cost one pass
+        self._pending[name] = (content, version)
+
+    def remove(self, name: str):
+        """Remove a note from the index"""
+        with self._lock:
+            self._pending.pop(name, None)
+            super().remove(name)
+
+    def _unindex(self, name: str):
+        tokens = self._docs.pop(name, None)
+        self._versions.pop(name, None)
+        if tokens is None:
+            return
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(name, None)
+                if not postings:
+                    del self._postings[token]
+        self._dirty = True
+
+    def _index(self, name: str, content: str, version):
+        self._unindex(name)
+        positions = {}
+        for token, pos in tokenize(content):
+            positions.setdefault(token, []).append(pos)
+        for token, token_positions in positions.items():
+            self._postings.setdefault(token, {})[name] = token_positions
+        # Replaced on the next update, never modified, so save can copy it
+        self._docs[name] = positions
+        self._versions[name] = version
+        self._dirty = True
+
+    def _entries(self) -> dict:
+        return dict(self._docs)
+
+    def _clear(self):
+        self._postings = {}
+        self._docs = {}
+
+    def _load_entry(self, name: str, positions):
+        for token, token_positions in positions.items():
+            self._postings.setdefault(token, {})[name] = token_positions
+        self._docs[name] = positions
+
+    def _prepare_save(self):
+        self.apply_pending()
+
+    def apply_pending(self):
+        """Index all queued updates now"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            for name, (content, version) in pending.items():
+                self._index(name, content, version)
+
+    def search(self, query: str, limit: int = 50):
+        """Return note names matching every term and phrase, best first"""
+        phrases = [[t for t, _ in tokenize(p)] for p in PHRASE_RE.findall(query)]
+        terms = {t for t, _ in tokenize(PHRASE_RE.sub(" ", query))}
+        for phrase in phrases:
+            terms.update(phrase)
+        if not terms:
+            return []
+
+        with self._lock:
+            self.apply_pending()
+            lists = []
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    return []
+                lists.append((term, postings))
+            lists.sort(key=lambda item: len(item[1]))
+
+            candidates = set(lists[0][1])
+            for _, postings in lists[1:]:
+                candidates.intersection_update(postings)
+                if not candidates:
+                    return []
+
+            candidates = [
+                name for name in candidates
+                if all(self._has_phrase(name, phrase) for phrase in phrases)
+            ]
+
+            total = len(self._docs) or 1
+            idf = {term: math.log(1 + total / len(postings)) for term, postings in lists}
+            scores = {
+                name: sum(len(postings[name]) * idf[term] for term, postings in lists)
+                for name in candidates
+            }
+
+        return sorted(scores, key=scores.get, reverse=True)[:limit]
+
+    def _has_phrase(self, name: str, phrase):
+        if len(phrase) < 2:
+            return True
+        starts = set(self._postings[phrase[0]][name])
+        for offset, token in enumerate(phrase[1:], 1):
+            positions = self._postings[token][name]
+            starts.intersection_update(p - offset for p in positions)
+            if not starts:
+                return False
+        return True
+
+
+class StoreSearch:
+    """SearchIndex stand-in for stores that search their own notes
+
+    Stores with a ``search(query, limit)`` method (the SQLite store's FTS5
+    table) index every write themselves, so nothing is built, updated or
+    persisted here and queries go straight to the store.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.ready = threading.Event()
+        self.ready.set()
+
+    def update(self, name: str, content: str, version=None):
+        """Nothing to do: the store indexed the write"""
+
+    def remove(self, name: str):
+        """Nothing to do: the store dropped the note from its index"""
+
+    def save_later(self, call_later, delay: float):
+        """Nothing to persist"""
+
+    def search(self, query: str, limit: int = 50):
+        """Return note names matching the query, best first"""
+        return [name for name, _ in self.store.search(query, limit)]
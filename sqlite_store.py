@@ -0,0 +1,259 @@
+import queue
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from note_index import NoteMeta, extract_title
+from note_store import StoreWatchers
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    body TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS notes_mtime ON notes(mtime DESC);
+"""
+
+# "quoted phrases" and bare terms of a search query
+QUERY_TERM_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def fts_query(query: str) -> str:
+    """Turn a search box query into an FTS5 query matching every term
+
+    Each bare term and "quoted phrase" becomes an FTS5 string (with any
+    double quote doubled), so operators and punctuation typed by the user
+    are matched as text instead of being parsed as query syntax.
+    """
+    terms = []
+    for phrase, term in QUERY_TERM_RE.findall(query):
+        text = phrase or term
+        if text.strip():
+            terms.append('"' + text.replace('"', '""') + '"')
+    return " ".join(terms)
+
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+    name, title, body, content='notes', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS notes_ai AFTER INSERT ON notes BEGIN
+    INSERT INTO notes_fts(rowid, name, title, body)
+    VALUES (new.id, new.name, new.title, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_ad AFTER DELETE ON notes BEGIN
+    INSERT INTO notes_fts(notes_fts, rowid, name, title, body)
+    VALUES ('delete', old.id, old.name, old.title, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_au AFTER UPDATE ON notes BEGIN
+    INSERT INTO notes_fts(notes_fts, rowid, name, title, body)
+    VALUES ('delete', old.id, old.name, old.title, old.body);
+    INSERT INTO notes_fts(rowid, name, title, body)
+    VALUES (new.id, new.name, new.title, new.body);
+END;
+"""
+
+
+class SQLiteNoteStore(StoreWatchers):
+    """Note storage in a single SQLite database
+
+    Note bodies and metadata live in one table, with an FTS5 index kept in
+    sync by triggers (when the SQLite build has FTS5). The database runs in
+    WAL mode so readers never block the writer, and each process keeps one
+    pool of connections shared by all sessions.
+
+    Notes are addressed by file name, like the files in NOTES_DIR, and
+    metadata paths are reported under ``root`` so they line up with the
+    filesystem layout. Missing and duplicate notes raise FileNotFoundError
+    and FileExistsError.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, db_path: Path, root: Path = Path(), pool_size: int = 4):
+        self.db_path = Path(db_path)
+        self.root = Path(root)
+        self._init_watchers()
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        for _ in range(pool_size):
+            self._pool.put(None)
+        self.has_fts = False
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+            try:
+                conn.executescript(FTS_SCHEMA)
+                self.has_fts = True
+            except sqlite3.OperationalError:
+                pass  # SQLite built without FTS5; search falls back to LIKE
+
+    @classmethod
+    def shared(cls, db_path: Path, root: Path = Path()) -> "SQLiteNoteStore":
+        """Return the process-wide store for a database file"""
+        key = Path(db_path).resolve()
+        with cls._shared_lock:
+            store = cls._shared.get(key)
+            if store is None:
+                store = cls(db_path, root)
+                cls._shared[key] = store
+            return store
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Borrow a pooled connection, committing on success"""
+        conn = self._pool.get()
+        try:
+            if conn is None:
+                conn = self._connect()
+            with conn:
+                yield conn
+        finally:
+            self._pool.put(conn)
+
+    def __contains__(self, name: str) -> bool:
+        return self.exists(name)
+
+    def __len__(self) -> int:
+        with self._connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def exists(self, name: str) -> bool:
+        """Check whether a note exists"""
+        with self._connection() as conn:
+            row = conn.execute("SELECT 1 FROM notes WHERE name = ?", (name,)).fetchone()
+        return row is not None
+
+    def list_meta(self):
+        """Return note metadata sorted by modification time, newest first"""
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT name, mtime, size, title FROM notes ORDER BY mtime DESC"
+            ).fetchall()
+        return [NoteMeta(self.root / name, mtime, size, title) for name, mtime, size, title in rows]
+
+    def get_meta(self, name: str):
+        """Return metadata for one note, or None"""
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT mtime, size, title FROM notes WHERE name = ?", (name,)
+            ).fetchone()
+        if row is None:
+            return None
+        return NoteMeta(self.root / name, *row)
+
+    def read(self, name: str) -> str:
+        """Return a note's content"""
+        with self._connection() as conn:
+            row = conn.execute("SELECT body FROM notes WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise FileNotFoundError(name)
+        return row[0]
+
+    def write(self, name: str, content: str):
+        """Create or overwrite a note"""
+        self.write_many({name: content})
+
+    def write_many(self, changes: dict):
+        """Create or overwrite several notes in one transaction (name -> content)"""
+        now = time.time()
+        with self._connection() as conn:
+            conn.executemany(
+                """
+                INSERT INTO notes (name, title, body, size, created, mtime)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    title = excluded.title,
+                    body = excluded.body,
+                    size = excluded.size,
+                    mtime = excluded.mtime
+                """,
+                [
+                    (name, extract_title(content, Path(name).stem), content,
+                     len(content.encode("utf-8")), now, now)
+                    for name, content in changes.items()
+                ],
+            )
+
+    def create(self, name: str, content: str):
+        """Create a new note, failing if it already exists"""
+        now = time.time()
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    "INSERT INTO notes (name, title, body, size, created, mtime) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (name, extract_title(content, Path(name).stem), content,
+                     len(content.encode("utf-8")), now, now),
+                )
+        except sqlite3.IntegrityError:
+            raise FileExistsError(name) from None
+        self._notify()
+
+    def delete(self, name: str):
+        """Delete a note"""
+        with self._connection() as conn:
+            cur = conn.execute("DELETE FROM notes WHERE name = ?", (name,))
+        if cur.rowcount == 0:
+            raise FileNotFoundError(name)
+        self._notify()
+
+    def refresh(self):
+        """Nothing to rescan; the database is always current"""
+
+    def search(self, query: str, limit: int = 50):
+        """Full-text search; returns ``(name, snippet)`` pairs, best first"""
+        with self._connection() as conn:
+            if self.has_fts:
+                match = fts_query(query)
+                if not match:
+                    return []
+                try:
+                    rows = conn.execute(
+                        """
+                        SELECT name, snippet(notes_fts, 2, '**', '**', '…', 12)
+                        FROM notes_fts WHERE notes_fts MATCH ?
+                        ORDER BY bm25(notes_fts) LIMIT ?
+                        """,
+                        (match, limit),
+                    ).fetchall()
+                except sqlite3.OperationalError as e:
+                    print(f"Error searching notes: {e}")
+                    return []
+            else:
+                rows = conn.execute(
+                    "SELECT name, substr(body, 1, 80) FROM notes "
+                    "WHERE body LIKE ? ORDER BY mtime DESC LIMIT ?",
+                    (f"%{query}%", limit),
+                ).fetchall()
+        return rows
+
+    def import_directory(self, directory: Path, suffix: str = ".md") -> int:
+        """Copy notes from a directory into the database in one transaction"""
+        rows = []
+        for path in Path(directory).glob(f"*{suffix}"):
+            content = path.read_text(encoding="utf-8")
+            st = path.stat()
+            rows.append((path.name, extract_title(content, path.stem), content,
+                         st.st_size, st.st_mtime, st.st_mtime))
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO notes (name, title, body, size, created, mtime) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        self._notify()
+        return len(rows)
@@ -0,0 +1,88 @@
+import threading
+import time
+
+from autosave import AutosaveScheduler
+
+
+class Writes:
+    """Records writes; the first ``block`` writes wait for ``release``"""
+
+    def __init__(self, block: int = 0):
+        self.calls = []
+        self.block = block
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.done = threading.Event()
+
+    def __call__(self, key, content):
+        self.started.set()
+        if self.block:
+            self.block -= 1
+            self.release.wait(5)
+        self.calls.append((key, content))
+        self.done.set()
+
+
+def test_changes_coalesce_into_one_write_after_idle():
+    scheduler = AutosaveScheduler(idle_delay=0.05, max_latency=5)
+    session = object()
+    write = Writes()
+    for i in range(10):
+        scheduler.mark_dirty(session, "a.md", f"v{i}", write)
+    assert scheduler.is_dirty(session, "a.md")
+    assert write.done.wait(5)
+    time.sleep(0.1)
+    assert write.calls == [("a.md", "v9")]
+    assert not scheduler.is_dirty(session, "a.md")
+
+
+def test_dirty_bytes_count_utf8_and_force_a_flush():
+    scheduler = AutosaveScheduler(idle_delay=60, max_latency=60, max_dirty_bytes=1_000_000)
+    session = object()
+    write = Writes()
+    scheduler.mark_dirty(session, "a.md", "é" * 10, write)
+    assert scheduler.dirty_bytes == 20
+    scheduler.mark_dirty(session, "a.md", "ab", write)
+    assert scheduler.dirty_bytes == 2
+
+    scheduler.max_dirty_bytes = 10
+    scheduler.mark_dirty(session, "b.md", "€" * 4, write)  # 12 bytes, 4 characters
+    assert write.done.wait(5)
+    assert scheduler.dirty_bytes == 0
+
+
+def test_cancel_drops_changes_and_flush_writes_in_caller():
+    scheduler = AutosaveScheduler(idle_delay=60, max_latency=60)
+    first, second = object(), object()
+    write = Writes()
+    scheduler.mark_dirty(first, "a.md", "mine", write)
+    scheduler.mark_dirty(second, "a.md", "theirs", write)
+    scheduler.cancel(first)
+    scheduler.flush(second)
+    assert write.calls == [("a.md", "theirs")]
+    assert len(scheduler) == 0
+
+
+def test_cancel_waits_for_a_write_in_flight():
+    scheduler = AutosaveScheduler(idle_delay=0, max_latency=0)
+    session = object()
+    write = Writes(block=1)
+    scheduler.mark_dirty(session, "a.md", "autosaved", write)
+    assert write.started.wait(5)
+
+    cancelled = threading.Event()
+    thread = threading.Thread(target=lambda: (scheduler.cancel(session, "a.md"), cancelled.set()))
+    thread.start()
+    assert not cancelled.wait(0.1)
+    write.release.set()
+    assert cancelled.wait(5)
+    # A manual save made now cannot be overwritten by the older autosave
+    assert write.calls == [("a.md", "autosaved")]
+
+
+def test_call_later_runs_on_the_worker():
+    scheduler = AutosaveScheduler()
+    ran = threading.Event()
+    scheduler.call_later(0.01, ran.set)
+    assert ran.wait(5)
+    assert scheduler.scheduled_calls == 0
@@ -0,0 +1,94 @@
+import re
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+from bulk_replace import ReplaceJob, StaleMatches, compile_pattern, scan_chunk
+from note_events import NoteVersions, VersionConflict
+from note_store import MemoryNoteStore
+
+
+def scanned_job(store, pattern, replacement):
+    """A job whose scan ran in this process (no pool)"""
+    job = ReplaceJob(store, NoteVersions(), pattern, replacement)
+    tasks = []
+    for meta in store.list_meta():
+        job.expected[meta.name] = job.versions.current(meta.name)
+        tasks.append((meta.name, None, store.read(meta.name)))
+    for result in scan_chunk(tasks, job.regex.pattern, job.regex.flags, replacement):
+        job.results[result.name] = result
+    return job
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MemoryNoteStore(tmp_path)
+    store.write("a.md", "foo bar foo")
+    store.write("b.md", "no match")
+    store.write("c.md", "foo")
+    return store
+
+
+def test_plan_selection(store):
+    job = scanned_job(store, r"foo", "baz")
+    assert job.plan() == {"a.md": "baz bar baz", "c.md": "baz"}
+    assert job.plan(["c.md"]) == {"c.md": "baz"}
+    assert job.plan([]) == {}
+    assert job.plan(["b.md"]) == {}
+
+
+def test_plan_rejects_changed_notes(store):
+    job = scanned_job(store, r"foo", "baz")
+    store.write("a.md", "foo changed")
+    with pytest.raises(StaleMatches):
+        job.plan()
+
+
+def test_apply_writes_batch_and_checks_versions(store):
+    job = scanned_job(store, r"fo(o)", r"F\1")
+    versions, changes = job.apply()
+    assert store.read("a.md") == "Fo bar Fo"
+    assert set(versions) == set(changes) == {"a.md", "c.md"}
+
+    job = scanned_job(store, r"Fo", "foo")
+    job.versions.commit("c.md", None, lambda: store.read("c.md"))
+    with pytest.raises(VersionConflict):
+        job.apply()
+    assert store.read("a.md") == "Fo bar Fo"  # Nothing written
+
+
+def test_compile_pattern_checks_replacement():
+    with pytest.raises(re.error):
+        compile_pattern(r"(a)", replacement=r"\2")
+    with pytest.raises(re.error):
+        compile_pattern(r"(")
+
+
+def test_pool_workers_do_not_import_main(tmp_path):
+    # pytest runs as a package __main__, which spawned workers skip anyway,
+    # so the app's case (python main.py) is reproduced with a script
+    marker = tmp_path / "imported"
+    script = tmp_path / "app.py"
+    script.write_text(textwrap.dedent(f"""
+        import sys
+        from pathlib import Path
+
+        sys.path.insert(0, {str(Path(__file__).resolve().parent.parent)!r})
+        if __name__ == "__mp_main__":
+            Path({str(marker)!r}).write_text("imported")
+
+        if __name__ == "__main__":
+            from bulk_replace import ReplaceJob, scan_chunk
+
+            pool = ReplaceJob.pool(2)
+            for _ in range(4):
+                [result] = pool.submit(scan_chunk, [("a.md", None, "x")], "x", 0, "y").result()
+                assert result.name == "a.md"
+            pool.shutdown()
+    """))
+    completed = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, timeout=120)
+    assert completed.returncode == 0, completed.stderr
+    assert not marker.exists()
@@ -0,0 +1,153 @@
+import random
+
+import pytest
+
+from crdt import CollabHub, SequenceCRDT
+from note_store import MemoryNoteStore
+
+
+def random_edit(rng, doc, i):
+    text = doc.text
+    pos = rng.randint(0, len(text))
+    removed = rng.randint(0, min(3, len(text) - pos))
+    return doc.edit(pos, removed, rng.choice(["", "x", "yz", f"<{i}>"]))
+
+
+def test_replicas_converge_in_any_order():
+    rng = random.Random(1)
+    base = SequenceCRDT.from_text("shared text")
+    replicas = [SequenceCRDT.from_state(base.state()) for _ in range(3)]
+    logs = [[] for _ in replicas]
+    for i in range(60):
+        k = rng.randrange(len(replicas))
+        logs[k].append(random_edit(rng, replicas[k], i))
+
+    # Every replica receives the others' batches, shuffled
+    for k, replica in enumerate(replicas):
+        batches = [ops for j, log in enumerate(logs) if j != k for ops in log]
+        rng.shuffle(batches)
+        for ops in batches:
+            replica.apply(ops)
+    assert replicas[0].text == replicas[1].text == replicas[2].text
+
+
+def test_concurrent_inserts_at_same_place_converge():
+    base = SequenceCRDT.from_text("ac")
+    a = SequenceCRDT.from_state(base.state())
+    b = SequenceCRDT.from_state(base.state())
+    ops_a = a.edit(1, 0, "B")
+    ops_b = b.edit(1, 0, "X")
+    a.apply(ops_b)
+    b.apply(ops_a)
+    assert a.text == b.text
+    assert sorted(a.text) == sorted("aBXc")
+
+
+def test_hub_persists_and_prefers_newer_store_content(tmp_path):
+    store = MemoryNoteStore(tmp_path)
+    store.write("n.md", "abc")
+    hub = CollabHub(tmp_path / "collab", store)
+    replica = hub.join("n.md")
+    hub.submit("n.md", replica.edit(3, 0, "d"))
+    assert CollabHub(tmp_path / "collab", store).text("n.md") == "abcd"  # From the log
+
+    hub.flush()
+    assert store.read("n.md") == "abcd"
+
+    store.write("n.md", "edited elsewhere")
+    assert CollabHub(tmp_path / "collab", store).text("n.md") == "edited elsewhere"
+
+
+class FailingStore(MemoryNoteStore):
+    """Memory store whose writes fail while ``fail`` is set"""
+
+    fail = False
+
+    def write(self, name, content):
+        if self.fail:
+            raise OSError("disk full")
+        super().write(name, content)
+
+
+def test_failed_store_write_keeps_the_log(tmp_path):
+    store = FailingStore(tmp_path)
+    store.write("n.md", "abc")
+    hub = CollabHub(tmp_path / "collab", store)
+    hub.submit("n.md", hub.join("n.md").edit(3, 0, "d"))
+
+    store.fail = True
+    with pytest.raises(OSError):
+        hub.flush("n.md")
+    assert store.read("n.md") == "abc"
+    assert CollabHub(tmp_path / "collab", store).text("n.md") == "abcd"
+
+    store.fail = False
+    hub.flush("n.md")
+    assert store.read("n.md") == "abcd"
+
+
+def test_failed_snapshot_after_store_write_loses_nothing(tmp_path, monkeypatch):
+    store = MemoryNoteStore(tmp_path)
+    store.write("n.md", "abc")
+    hub = CollabHub(tmp_path / "collab", store)
+    hub.submit("n.md", hub.join("n.md").edit(0, 0, "_"))
+
+    def fail(name, doc):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(hub, "_write_snapshot", fail)
+    with pytest.raises(OSError):
+        hub.flush("n.md")
+    assert store.read("n.md") == "_abc"
+    # The old snapshot plus the log still match the store
+    reopened = CollabHub(tmp_path / "collab", store)
+    assert reopened.text("n.md") == "_abc"
+    reopened.submit("n.md", reopened.join("n.md").edit(4, 0, "!"))
+    reopened.flush()
+    assert store.read("n.md") == "_abc!"
+
+
+def test_outside_save_merges_with_logged_edits(tmp_path):
+    store = MemoryNoteStore(tmp_path)
+    store.write("n.md", "first line\nsecond line\n")
+    hub = CollabHub(tmp_path / "collab", store)
+    hub.submit("n.md", hub.join("n.md").edit(0, 5, "FIRST"))
+
+    # Saved outside collaboration before the logged edit reached the store
+    store.write("n.md", "first line\nsecond LINE\n")
+    reopened = CollabHub(tmp_path / "collab", store)
+    assert reopened.text("n.md") == "FIRST line\nsecond LINE\n"
+    assert store.read("n.md") == "FIRST line\nsecond LINE\n"
+
+
+def test_overlapping_outside_save_wins_and_keeps_the_log(tmp_path):
+    store = MemoryNoteStore(tmp_path)
+    store.write("n.md", "abc")
+    hub = CollabHub(tmp_path / "collab", store)
+    hub.submit("n.md", hub.join("n.md").edit(1, 1, "B"))
+
+    store.write("n.md", "aXc")
+    assert CollabHub(tmp_path / "collab", store).text("n.md") == "aXc"
+    assert (tmp_path / "collab" / "n.md.ops.old").read_text()
+
+
+def test_sync_snapshots_on_thresholds(tmp_path):
+    store = MemoryNoteStore(tmp_path)
+    store.write("n.md", "")
+    hub = CollabHub(tmp_path / "collab", store, snapshot_every=3, snapshot_interval=3600)
+    replica = hub.join("n.md")
+    for char in "ab":
+        hub.submit("n.md", replica.edit(len(replica.text), 0, char))
+    assert hub.sync("n.md") is False
+    assert store.read("n.md") == ""
+    assert CollabHub(tmp_path / "collab", store).text("n.md") == "ab"
+
+    hub.submit("n.md", replica.edit(2, 0, "c"))
+    assert store.read("n.md") == "abc"
+    assert (tmp_path / "collab" / "n.md.ops").stat().st_size == 0
+
+    hub.snapshot_interval = 0
+    hub.submit("n.md", replica.edit(3, 0, "d"))
+    assert hub.sync("n.md") is True
+    assert store.read("n.md") == "abcd"
+    assert hub.sync("n.md") is False
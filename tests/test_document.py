@@ -0,0 +1,157 @@
+import random
+
+from document import Document, diff_span, merge_spans, rebase_span
+
+
+def apply(text, span):
+    pos, removed_len, inserted = span
+    return text[:pos] + inserted + text[pos + removed_len:]
+
+
+def type_text(doc, text, pos=None):
+    """Sync one keystroke at a time, as the editor reports them"""
+    pos = len(doc) if pos is None else pos
+    for i, char in enumerate(text):
+        current = doc.text
+        doc.sync(current[:pos + i] + char + current[pos + i:])
+
+
+def test_diff_span_round_trips():
+    rng = random.Random(0)
+    for _ in range(500):
+        old = "".join(rng.choice("ab\n") for _ in range(rng.randint(0, 30)))
+        new = "".join(rng.choice("ab\n") for _ in range(rng.randint(0, 30)))
+        span = diff_span(old, new)
+        if old == new:
+            assert span is None
+        else:
+            assert apply(old, span) == new
+
+
+def test_merge_spans_disjoint_edits():
+    base = "line one\nline two\nline three\n"
+    ours = "line ONE\nline two\nline three\n"
+    theirs = "line one\nline two\nline THREE\n"
+    assert merge_spans(base, ours, theirs) == "line ONE\nline two\nline THREE\n"
+
+
+def test_merge_spans_identical_and_one_sided():
+    base = "abc"
+    assert merge_spans(base, "abXc", base) == "abXc"
+    assert merge_spans(base, base, "Yabc") == "Yabc"
+    assert merge_spans(base, "same", "same") == "same"
+
+
+def test_merge_spans_overlap_is_a_conflict():
+    base = "line one\n"
+    assert merge_spans(base, "line QRS\n", "line XYZ\n") is None
+
+
+def test_rebase_span_over_remote_edit():
+    shown = "hello world"
+    remote = diff_span(shown, "hello brave world")
+    assert apply("hello brave world", rebase_span(diff_span(shown, "hello world!"), remote)) \
+        == "hello brave world!"
+    assert apply("hello brave world", rebase_span(diff_span(shown, "hullo world"), remote)) \
+        == "hullo brave world"
+    assert rebase_span((0, 0, "x"), None) == (0, 0, "x")
+
+
+def test_pieces_track_random_edits():
+    rng = random.Random(1)
+    text = "0123456789" * 20
+    doc = Document(text)
+    for _ in range(2000):
+        pos = rng.randint(0, len(text))
+        end = min(len(text), pos + rng.randint(0, 4))
+        text = text[:pos] + rng.choice(["", "x", "yz\n"]) + text[end:]
+        doc.sync(text)
+        assert len(doc) == len(text)
+    assert doc.text == text
+    # Compaction keeps the piece list bounded
+    assert len(doc._pieces) <= Document.MAX_PIECES
+    doc._text = None
+    assert doc.text == text
+
+
+def test_typing_run_undoes_in_one_step():
+    doc = Document("title\n")
+    type_text(doc, "hello")
+    type_text(doc, "\nnext")
+    assert doc.undo() == "title\nhello"
+    assert doc.undo() == "title\n"
+    assert doc.undo() is None
+    assert doc.redo() == "title\nhello"
+    assert doc.redo() == "title\nhello\nnext"
+    assert doc.redo() is None
+
+
+def test_backspacing_undoes_in_one_step():
+    doc = Document("hello world")
+    for end in range(11, 5, -1):
+        doc.sync(doc.text[:end - 1])
+    assert doc.text == "hello"
+    assert doc.undo() == "hello world"
+
+
+def test_pause_starts_a_new_undo_step():
+    doc = Document("")
+    doc.UNDO_GROUP_SECONDS = -1
+    type_text(doc, "ab")
+    assert doc.undo() == "a"
+
+
+def test_new_edit_clears_redo():
+    doc = Document("abc")
+    doc.sync("abcd")
+    doc.undo()
+    assert doc.can_redo
+    doc.sync("Xabc")
+    assert not doc.can_redo
+    assert doc.redo() is None
+
+
+def test_undo_moves_past_unrecorded_changes():
+    doc = Document("first\nsecond\n")
+    type_text(doc, "!", pos=5)
+    # Another session edits a different line
+    doc.sync("first!\nSECOND\n", record=False)
+    # And a line in front of the local edit
+    doc.sync("zero\nfirst!\nSECOND\n", record=False)
+    assert doc.undo() == "zero\nfirst\nSECOND\n"
+    assert doc.redo() == "zero\nfirst!\nSECOND\n"
+    # The other sessions' changes are not undone
+    assert doc.undo() == "zero\nfirst\nSECOND\n"
+    assert not doc.can_undo
+
+
+def test_overlapping_unrecorded_change_drops_history():
+    doc = Document("hello")
+    type_text(doc, " world")
+    doc.sync("hello wor", record=False)
+    assert not doc.can_undo
+    assert doc.undo() is None
+    assert doc.text == "hello wor"
+
+
+def test_undo_and_redo_are_saved_as_changes():
+    doc = Document("hello world")
+    doc.sync("hello brave world")
+    doc.take_change()
+    doc.undo()
+    base, pos, removed_len, inserted, text = doc.take_change()
+    assert (base, text) == ("hello brave world", "hello world")
+    assert apply(base, (pos, removed_len, inserted)) == text
+
+
+def test_document_take_change_covers_all_syncs():
+    doc = Document("hello world")
+    assert not doc.modified
+    doc.sync("hello brave world")
+    doc.sync("hello brave world!")
+    base, pos, removed_len, inserted, text = doc.take_change()
+    assert base == "hello world"
+    assert text == "hello brave world!"
+    assert base[:pos] + inserted + base[pos + removed_len:] == text
+    assert doc.take_change() is None
+    assert doc.sync("hello brave world!") is None
@@ -0,0 +1,56 @@
+from facet_index import FacetIndex, extract_metadata, parse_facet_query
+from note_store import MemoryNoteStore
+
+
+def test_extract_metadata():
+    tags, fields = extract_metadata(
+        "---\ntags:\n  - Work\n  - '#ideas'\nstatus: Draft # comment\nowners: [ann, bob]\n---\n"
+        "Body #urgent and `#code` but not # heading or a#b\n```\n#fenced\n```\n"
+    )
+    assert tags == {"work", "ideas", "urgent"}
+    assert fields == {"status": {"draft"}, "owners": {"ann", "bob"}}
+
+
+def test_facet_index_filter_and_persist(tmp_path):
+    index = FacetIndex(tmp_path / "notes.facets")
+    index.update("a.md", "---\ntags: [Work, ideas]\nstatus: draft\n---\nText #urgent")
+    index.update("b.md", "#work only")
+    assert index.filter(["work"]) == {"a.md", "b.md"}
+    assert index.filter(["work"], {"status": "draft"}) == {"a.md"}
+    assert index.tags()[0] == ("work", 2)
+
+    index.update("a.md", "no metadata")
+    assert index.filter(["work"]) == {"b.md"}
+    assert index.fields() == []
+    index.remove("b.md")
+    assert index.tags() == []
+
+    index.update("c.md", "---\nstatus: done\n---\n#x")
+    index.save()
+    loaded = FacetIndex(tmp_path / "notes.facets")
+    assert loaded.load()
+    assert loaded.filter(["x"], {"status": ["done"]}) == {"c.md"}
+    assert loaded.metadata("c.md") == ({"x"}, {"status": {"done"}})
+    assert len(loaded) == 2  # a.md, indexed without metadata
+
+
+def test_notes_without_metadata_are_not_reread(tmp_path):
+    store = MemoryNoteStore(tmp_path)
+    store.write("plain.md", "nothing here")
+    store.write("tagged.md", "#t")
+    FacetIndex(tmp_path / "notes.facets").build(store)
+
+    reads = []
+    read = store.read
+    store.read = lambda name: reads.append(name) or read(name)
+    rebuilt = FacetIndex(tmp_path / "notes.facets")
+    rebuilt.build(store)
+    assert reads == []
+    assert rebuilt.filter(["t"]) == {"tagged.md"}
+
+
+def test_parse_facet_query():
+    text, tags, fields = parse_facet_query("plan #Work status:Draft other:x", known_fields=("status",))
+    assert text == "plan other:x"
+    assert tags == {"work"}
+    assert fields == {"status": {"draft"}}
@@ -0,0 +1,77 @@
+import asyncio
+
+from fake_page import FakeEvent, FakePage, FakePubSubHub
+
+
+class Box:
+    """Plain object standing in for a control"""
+
+    def __init__(self, value="", controls=None):
+        self.value = value
+        self.controls = list(controls or [])
+
+
+def test_update_records_changed_added_and_removed_controls():
+    page = FakePage(hub=FakePubSubHub())
+    child = Box("a")
+    root = Box("root", [child])
+    page.add(root)
+    first = page.update_records[-1]
+    assert first.added == [root, child]
+    assert first.bytes > 0
+
+    child.value = "b"
+    record = page.update()
+    assert record.changed == {child: {"value": ("a", "b")}}
+    assert record.added == [] and record.removed == []
+
+    root.controls = []
+    record = page.update()
+    assert record.removed == [child]
+    assert page.updates == 3
+
+
+def test_unchanged_update_sends_nothing():
+    page = FakePage(hub=FakePubSubHub())
+    page.add(Box("x"))
+    record = page.update()
+    assert not record.changed and not record.added and record.bytes == 0
+
+
+def test_client_storage_logs_wire_sizes():
+    page = FakePage({"a": "xyz"}, hub=FakePubSubHub())
+    storage = page.client_storage
+    assert storage.get("a") == "xyz"
+    storage.set("b", {"k": 1})
+    assert storage.get_keys("") == ["a", "b"]
+    assert storage.remove("a") and not storage.contains_key("a")
+    assert storage.calls[:2] == [("get", "a", 5), ("set", "b", 8)]
+    assert storage.bytes_written == 8
+    assert storage.count("get") == 1
+
+
+def test_pubsub_delivers_to_other_sessions():
+    hub = FakePubSubHub()
+    first, second = FakePage(hub=hub), FakePage(hub=hub)
+    seen = []
+    first.pubsub.subscribe_topic("notes", lambda topic, message: seen.append(("first", message)))
+    second.pubsub.subscribe_topic("notes", lambda topic, message: seen.append(("second", message)))
+    first.pubsub.send_others_on_topic("notes", "saved")
+    assert seen == [("second", "saved")]
+
+    second.disconnect()
+    first.pubsub.send_all_on_topic("notes", "again")
+    assert seen[-1] == ("first", "again") and len(seen) == 2
+
+
+def test_run_task_and_wait_idle():
+    page = FakePage(hub=FakePubSubHub())
+    done = []
+
+    async def handler(event):
+        await asyncio.sleep(0.01)
+        done.append(event.name)
+
+    page.run_task(handler, FakeEvent(None, "click", page=page))
+    assert page.wait_idle(5)
+    assert done == ["click"]
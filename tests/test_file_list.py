@@ -0,0 +1,109 @@
+import pytest
+
+pytest.importorskip("flet")
+
+from file_list import FileListReconciler  # noqa: E402
+
+
+class ListView:
+    def __init__(self):
+        self.controls = []
+        self.page = None
+
+
+class Row:
+    def __init__(self, item, selected):
+        self.item = item
+        self.selected = selected
+        self.restyles = 0
+
+
+def restyle(row, item, selected):
+    row.item = item
+    row.selected = selected
+    row.restyles += 1
+
+
+def entries(*names, version=1):
+    return [(name, name.upper(), version) for name in names]
+
+
+def test_rows_are_reused_by_key():
+    view = ListView()
+    rows = FileListReconciler(view, Row, restyle)
+    assert rows.sync(entries("a", "b", "c"), selected_key="b")
+    a, b, c = view.controls
+    assert b.selected and not a.selected
+
+    # Reordered and one removed: same row objects, no restyles
+    assert rows.sync(entries("c", "a"), selected_key="b")
+    assert view.controls == [c, a]
+    assert "b" not in rows
+    assert a.restyles == c.restyles == 0
+
+
+def test_unchanged_sync_touches_nothing():
+    view = ListView()
+    rows = FileListReconciler(view, Row, restyle)
+    rows.sync(entries("a", "b"))
+    controls = view.controls
+    assert not rows.sync(entries("a", "b"))
+    assert view.controls is controls
+    assert all(row.restyles == 0 for row in controls)
+
+
+def test_new_version_restyles_only_that_row():
+    view = ListView()
+    rows = FileListReconciler(view, Row, restyle)
+    rows.sync(entries("a", "b"))
+    rows.sync([("a", "A", 1), ("b", "B2", 2)])
+    a, b = view.controls
+    assert (a.restyles, b.restyles) == (0, 1)
+    assert b.item == "B2"
+
+
+def test_select_restyles_old_and_new_rows():
+    view = ListView()
+    rows = FileListReconciler(view, Row, restyle)
+    rows.sync(entries("a", "b", "c"), selected_key="a")
+    rows.select("c")
+    a, b, c = view.controls
+    assert not a.selected and c.selected
+    assert (a.restyles, b.restyles, c.restyles) == (1, 0, 1)
+
+
+def test_placeholder_and_edges():
+    view = ListView()
+    placeholder, top, bottom = object(), object(), object()
+    rows = FileListReconciler(view, Row, restyle, placeholder=placeholder,
+                              leading=top, trailing=bottom)
+    rows.sync([])
+    assert view.controls == [placeholder]
+    rows.sync(entries("a"))
+    assert view.controls[0] is top and view.controls[-1] is bottom
+
+
+def test_virtual_list_builds_only_rows_near_the_viewport():
+    from file_list import VirtualFileList
+
+    view = ListView()
+    items = [f"note{i}" for i in range(10_000)]
+    virtual = VirtualFileList(view, Row, restyle, entry=lambda item: (item, item, 1),
+                              item_extent=40, page_size=50, viewport=800)
+    virtual.set_items(items, selected_key="note0")
+    top, *built, bottom = view.controls
+    start, end = virtual.window()
+    assert start == 0 and len(built) == end < 200
+    assert top.height == 0
+    assert bottom.height == (len(items) - end) * 40
+
+    class Scroll:
+        pixels = 40 * 5_000
+        viewport_dimension = 800
+
+    virtual._on_scroll(Scroll())
+    top, *built, bottom = view.controls
+    start, end = virtual.window()
+    assert start <= 5_000 < end and len(built) == end - start < 200
+    assert top.height == start * 40
+    assert built[0].item == f"note{start}"
@@ -0,0 +1,116 @@
+import zlib
+
+from history import DELTA, FILE_HEADER, SNAPSHOT, RevisionHistory
+
+
+def versions(count: int):
+    """Successive versions of a note, each one line longer"""
+    text = "# Note\n" + "body line\n" * 200
+    for i in range(count):
+        text += f"edit {i}\n"
+        yield text
+
+
+def test_every_revision_rebuilds(tmp_path):
+    history = RevisionHistory(tmp_path, snapshot_every=5, min_interval=0)
+    saved = list(versions(23))
+    for t, content in enumerate(saved):
+        history.record("a", content, timestamp=t)
+    revisions = history.revisions("a")
+    assert [index for index, _, _ in revisions] == list(range(22, -1, -1))
+    for index, content in enumerate(saved):
+        assert history.get("a", index) == content
+
+    # Deltas between periodic snapshots, and storage grows with the edits
+    kinds = [rev.kind for rev in history._notes["a"].revisions]
+    assert kinds[0] == SNAPSHOT and kinds[1] == DELTA
+    assert kinds.count(SNAPSHOT) == 5
+    assert (tmp_path / "a.hist").stat().st_size < len(saved[-1].encode()) * 23 / 4
+
+
+def test_history_is_read_back_from_disk(tmp_path):
+    saved = list(versions(8))
+    history = RevisionHistory(tmp_path, snapshot_every=3, min_interval=0)
+    for t, content in enumerate(saved):
+        history.record("a", content, timestamp=t)
+
+    reopened = RevisionHistory(tmp_path, snapshot_every=3, min_interval=0)
+    assert [reopened.get("a", i) for i in range(8)] == saved
+    reopened.record("a", saved[-1] + "more\n", timestamp=8)
+    assert reopened.get("a", 8) == saved[-1] + "more\n"
+
+
+def test_torn_record_is_dropped(tmp_path):
+    history = RevisionHistory(tmp_path, min_interval=0)
+    history.record("a", "one", timestamp=0)
+    history.record("a", "one two", timestamp=1)
+    path = tmp_path / "a.hist"
+    data = path.read_bytes()
+    path.write_bytes(data[:-3])
+
+    reopened = RevisionHistory(tmp_path, min_interval=0)
+    assert len(reopened.revisions("a")) == 1
+    assert reopened.get("a", 0) == "one"
+    # The torn tail was cut off, so appends land on a record boundary
+    reopened.record("a", "one three", timestamp=2)
+    assert RevisionHistory(tmp_path).get("a", 1) == "one three"
+
+
+def test_unknown_format_is_moved_aside(tmp_path):
+    (tmp_path / "a.hist").write_bytes(b"junk" + bytes(10))
+    history = RevisionHistory(tmp_path, min_interval=0)
+    assert history.revisions("a") == []
+    assert (tmp_path / "a.hist.old").exists()
+
+
+def test_saves_within_min_interval_coalesce(tmp_path):
+    history = RevisionHistory(tmp_path, min_interval=60)
+    history.record("a", "v1", timestamp=0)
+    history.record("a", "v2", timestamp=10)
+    history.record("a", "v3", timestamp=20)
+    assert len(history._notes["a"].revisions) == 1
+    # Reading the history records the latest coalesced save
+    assert len(history.revisions("a")) == 2
+    assert history.get("a", 1) == "v3"
+
+
+def test_compaction_applies_retention(tmp_path):
+    history = RevisionHistory(tmp_path, snapshot_every=4, max_revisions=5, min_interval=0)
+    saved = list(versions(12))
+    for t, content in enumerate(saved):
+        history.record("a", content, timestamp=1e12 + t)
+    assert history.compact_all() == 7
+
+    reopened = RevisionHistory(tmp_path)
+    kept = [reopened.get("a", i) for i in range(5)]
+    assert kept == saved[-5:]
+    assert reopened._notes["a"].revisions[0].kind == SNAPSHOT
+    data = (tmp_path / "a.hist").read_bytes()
+    assert data[:FILE_HEADER.size] == FILE_HEADER.pack(b"NHST", 1)
+    assert zlib.decompress(reopened._notes["a"].revisions[0].payload).decode() == saved[-5]
+
+
+def test_old_revisions_expire(tmp_path):
+    history = RevisionHistory(tmp_path, max_age=100, min_interval=0)
+    history.record("a", "old", timestamp=1)
+    history.record("a", "older edit", timestamp=2)
+    history.record("a", "recent", timestamp=10 ** 10)
+    assert history.compact("a") == 2
+    assert history.get("a", 0) == "recent"
+
+
+def test_cache_keeps_max_cached_notes(tmp_path):
+    history = RevisionHistory(tmp_path, max_cached=2, min_interval=0)
+    for name in "abcd":
+        history.record(name, f"note {name}", timestamp=0)
+    assert list(history._notes) == ["c", "d"]
+    # Evicted histories load again from their files
+    assert history.get("a", 0) == "note a"
+    assert len(history._notes) == 2
+
+
+def test_in_memory_history():
+    history = RevisionHistory(min_interval=0)
+    history.record("a", "one", timestamp=0)
+    history.record("a", "one two", timestamp=1)
+    assert history.get("a", 1) == "one two"
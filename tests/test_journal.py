@@ -0,0 +1,116 @@
+import shutil
+
+import pytest
+
+from journal import WriteAheadJournal
+
+
+def open_journal(tmp_path, name="notes.journal"):
+    (tmp_path / "notes").mkdir(exist_ok=True)
+    return WriteAheadJournal(tmp_path / name, tmp_path / "notes", checkpoint_interval=3600)
+
+
+def crash_copy(tmp_path, journal):
+    """Copy the journal as a crash would leave it and return the copy's path"""
+    journal._file.flush()
+    copy = tmp_path / "crashed.journal"
+    shutil.copy(journal.path, copy)
+    return copy
+
+
+def test_replay_applies_writes_edits_and_deletes(tmp_path):
+    journal = open_journal(tmp_path)
+    (tmp_path / "notes" / "gone.md").write_text("old", encoding="utf-8")
+    journal.append("a.md", "hello world")
+    journal.append_edit("a.md", journal.latest("a.md"), 5, 6, " there", "hello there")
+    journal.append("gone.md", "soon deleted")
+    journal.delete("gone.md")
+    journal.append_batch({"b.md": "batch b", "c.md": "batch c"})
+    copy = crash_copy(tmp_path, journal)
+
+    WriteAheadJournal(copy, tmp_path / "notes")
+    notes = tmp_path / "notes"
+    assert (notes / "a.md").read_text(encoding="utf-8") == "hello there"
+    assert (notes / "b.md").read_text(encoding="utf-8") == "batch b"
+    assert (notes / "c.md").read_text(encoding="utf-8") == "batch c"
+    assert not (notes / "gone.md").exists()
+    assert copy.stat().st_size == 0
+    journal.close()
+
+
+def test_torn_batch_is_dropped_whole(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.append("a.md", "kept")
+    journal.append_batch({"b.md": "b" * 100, "c.md": "c" * 100})
+    copy = crash_copy(tmp_path, journal)
+    with open(copy, "r+b") as f:
+        f.truncate(copy.stat().st_size - 10)
+
+    WriteAheadJournal(copy, tmp_path / "notes")
+    notes = tmp_path / "notes"
+    assert (notes / "a.md").read_text(encoding="utf-8") == "kept"
+    assert not (notes / "b.md").exists()
+    assert not (notes / "c.md").exists()
+    journal.close()
+
+
+def test_checkpoint_writes_notes_and_truncates(tmp_path):
+    journal = open_journal(tmp_path)
+    seen = []
+    journal.on_checkpoint = lambda path, content: seen.append((path.name, content))
+    journal.append("a.md", "one")
+    journal.append("a.md", "two")
+    assert journal.latest("a.md") == "two"
+
+    journal.checkpoint()
+    assert (tmp_path / "notes" / "a.md").read_text(encoding="utf-8") == "two"
+    assert journal.latest("a.md") is None
+    assert journal.path.stat().st_size == 0
+    assert seen == [("a.md", "two")]
+    journal.close()
+
+
+def test_saves_during_a_checkpoint_stay_journaled(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.append("a.md", "before")
+    write_notes = journal._write_notes
+
+    def write_and_save_again(pending):
+        # Another session saves while the checkpoint writes the notes
+        journal.append("a.md", "during")
+        return write_notes(pending)
+
+    journal._write_notes = write_and_save_again
+    journal.checkpoint()
+    journal._write_notes = write_notes
+    assert journal.latest("a.md") == "during"
+    assert journal.path.stat().st_size > 0  # Not truncated: it holds "during"
+
+    copy = crash_copy(tmp_path, journal)
+    WriteAheadJournal(copy, tmp_path / "notes")
+    assert (tmp_path / "notes" / "a.md").read_text(encoding="utf-8") == "during"
+    journal.close()
+
+
+def test_failed_checkpoint_keeps_the_journal(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.append("a.md", "kept")
+    journal._write_notes = lambda pending: False
+    journal.checkpoint()
+    assert journal.latest("a.md") == "kept"
+    assert journal.path.stat().st_size > 0
+    del journal._write_notes
+    journal.close()
+    assert (tmp_path / "notes" / "a.md").read_text(encoding="utf-8") == "kept"
+
+
+def test_deleted_note_raises_until_checkpointed(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.append("a.md", "x")
+    journal.delete("a.md")
+    with pytest.raises(FileNotFoundError):
+        journal.latest("a.md")
+    journal.checkpoint()
+    assert journal.latest("a.md") is None
+    assert not (tmp_path / "notes" / "a.md").exists()
+    journal.close()
@@ -0,0 +1,84 @@
+import threading
+
+from link_index import LinkIndex, extract_links, render_wiki_links, resolve_link
+from note_store import MemoryNoteStore
+
+
+def test_extract_links_skips_code_and_external_links():
+    content = (
+        "See [[b]], [[c|label]], [[d#Heading]] and [e](e.md) and [f](<dir/f g.md>)\n"
+        "[web](https://example.com) [mail](mailto:a@b.c) [top](#top) `[[inline]]`\n"
+        "```\n[[fenced]]\n```\n"
+    )
+    assert extract_links(content) == {"b.md", "c.md", "d.md", "e.md", "f g.md"}
+    assert resolve_link("../notes/x%20y.md") == "x y.md"
+    assert resolve_link("image.png") is None
+
+
+def test_render_wiki_links():
+    assert render_wiki_links("go to [[My Note|there]]") == "go to [there](My%20Note.md)"
+    assert render_wiki_links("plain") == "plain"
+
+
+def test_link_index_backlinks(tmp_path):
+    index = LinkIndex(tmp_path / "notes.links")
+    index.update("a.md", "See [[b]] and [c](c.md) and [web](https://example.com)")
+    index.update("b.md", "Back to [[a|A]]; `[[not a link]]`")
+    assert index.links("a.md") == ["b.md", "c.md"]
+    assert index.backlinks("b.md") == ["a.md"]
+
+    index.update("a.md", "only [[c]]")
+    assert index.backlinks("b.md") == []
+    index.remove("b.md")
+    assert index.backlinks("a.md") == []
+
+    index.save()
+    loaded = LinkIndex(tmp_path / "notes.links")
+    assert loaded.load()
+    assert loaded.backlinks("c.md") == ["a.md"]
+
+
+def test_build_rereads_only_changed_notes(tmp_path):
+    store = MemoryNoteStore(tmp_path)
+    store.write("a.md", "[[b]]")
+    store.write("b.md", "no links")
+    index = LinkIndex(tmp_path / "notes.links")
+    ready = []
+    index.when_ready(lambda: ready.append(True))
+    index.build(store)
+    assert ready == [True]
+    assert index.backlinks("b.md") == ["a.md"]
+
+    reads = []
+    read = store.read
+    store.read = lambda name: reads.append(name) or read(name)
+    store.write("b.md", "[[a]]")
+    rebuilt = LinkIndex(tmp_path / "notes.links")
+    rebuilt.build(store)
+    assert reads == ["b.md"]
+    assert rebuilt.backlinks("a.md") == ["b.md"]
+    assert rebuilt.backlinks("b.md") == ["a.md"]
+
+
+def test_save_during_build_is_not_overwritten(tmp_path):
+    store = MemoryNoteStore(tmp_path)
+    store.write("a.md", "[[old]]")
+    index = LinkIndex()
+    reading = threading.Event()
+    saved = threading.Event()
+    read = store.read
+
+    def slow_read(name):
+        content = read(name)
+        reading.set()
+        saved.wait(5)
+        return content
+
+    store.read = slow_read
+    thread = index.build_in_background(store)
+    assert reading.wait(5)
+    # Saved while the builder holds the old content
+    index.update("a.md", "[[new]]")
+    saved.set()
+    thread.join(5)
+    assert index.links("a.md") == ["new.md"]
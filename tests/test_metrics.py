@@ -0,0 +1,99 @@
+import asyncio
+import urllib.request
+
+import pytest
+
+from metrics import Counter, Gauge, Histogram, MetricsServer, Registry, _Metric
+
+
+def test_metric_base_is_abstract():
+    with pytest.raises(TypeError):
+        _Metric("m", "doc", registry=Registry())
+
+
+def test_counter_and_gauge_render():
+    registry = Registry()
+    written = Counter("bytes_total", "Bytes written", ["kind"], registry=registry)
+    written.labels("edit").inc(3)
+    written.labels("full").inc(2.5)
+    sessions = Gauge("sessions", "Open sessions", registry=registry)
+    sessions.inc(2)
+    sessions.dec()
+    Gauge("threads", "Threads", registry=registry).set_function(lambda: 7)
+
+    text = registry.render()
+    assert "# TYPE bytes_total counter" in text
+    assert 'bytes_total{kind="edit"} 3' in text
+    assert 'bytes_total{kind="full"} 2.5' in text
+    assert "sessions 1" in text
+    assert "threads 7" in text
+
+    with pytest.raises(ValueError):
+        Counter("plain", "doc", registry=registry).inc(-1)
+
+
+def test_labels_are_checked_and_escaped():
+    registry = Registry()
+    counter = Counter("c", "doc", ["name"], registry=registry)
+    with pytest.raises(ValueError):
+        counter.labels()
+    counter.labels('a"b\nc').inc()
+    assert 'c{name="a\\"b\\nc"} 1' in registry.render()
+
+
+def test_duplicate_names_are_rejected():
+    registry = Registry()
+    Counter("c", "doc", registry=registry)
+    with pytest.raises(ValueError):
+        Gauge("c", "doc", registry=registry)
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    histogram = Histogram("h", "doc", buckets=(1, 5, 10), registry=registry)
+    for value in (0.5, 2, 3, 20):
+        histogram.observe(value)
+    text = registry.render()
+    assert 'h_bucket{le="1"} 1' in text
+    assert 'h_bucket{le="5"} 3' in text
+    assert 'h_bucket{le="10"} 3' in text
+    assert 'h_bucket{le="+Inf"} 4' in text
+    assert "h_sum 25.5" in text
+    assert "h_count 4" in text
+
+
+def test_timer_decorates_plain_and_async_functions():
+    registry = Registry()
+    histogram = Histogram("t", "doc", ["handler"], registry=registry)
+
+    @histogram.labels("plain").time()
+    def plain():
+        return 1
+
+    @histogram.labels("async").time()
+    async def coroutine():
+        return 2
+
+    assert plain() == 1
+    assert asyncio.run(coroutine()) == 2
+    text = registry.render()
+    assert 't_count{handler="plain"} 1' in text
+    assert 't_count{handler="async"} 1' in text
+
+
+def test_failing_function_skips_the_sample():
+    registry = Registry()
+    Gauge("broken", "doc", registry=registry).set_function(lambda: 1 / 0)
+    assert "\nbroken " not in registry.render()
+
+
+def test_server_serves_the_shared_registry():
+    Counter("test_server_hits_total", "doc").inc()
+    server = MetricsServer("127.0.0.1", 0)
+    try:
+        port = server.httpd.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            body = response.read().decode()
+        assert "test_server_hits_total 1" in body
+    finally:
+        server.close()
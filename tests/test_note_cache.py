@@ -0,0 +1,115 @@
+import threading
+import time
+
+from note_cache import NoteCache
+from note_store import FileNoteStore
+
+
+def loader(content, calls):
+    def load():
+        calls.append(content)
+        return content
+    return load
+
+
+def test_budget_counts_utf8_bytes():
+    cache = NoteCache(max_bytes=100)
+    cache.put("a", "é" * 30)  # 60 bytes, 30 characters
+    cache.put("b", "x" * 30)
+    assert cache.bytes == 90
+    cache.put("c", "x" * 20)
+    # Over budget: the least recently used entry goes
+    assert "a" not in cache
+    assert cache.bytes == 50
+
+
+def test_get_refreshes_recency_and_counts_hits():
+    cache = NoteCache(max_bytes=30)
+    calls = []
+    cache.get("a", loader("a" * 10, calls))
+    cache.get("b", loader("b" * 10, calls))
+    cache.get("a", loader("a" * 10, calls))
+    cache.put("c", "c" * 15)
+    assert "a" in cache and "b" not in cache
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert calls == ["a" * 10, "b" * 10]
+
+
+def test_version_mismatch_reloads():
+    cache = NoteCache()
+    calls = []
+    assert cache.get("a", loader("old", calls), version=1) == "old"
+    assert cache.get("a", loader("new", calls), version=2) == "new"
+    assert cache.get("a", loader("newer", calls), version=2) == "new"
+    assert calls == ["old", "new"]
+
+
+def test_pinned_entries_are_not_evicted():
+    cache = NoteCache(max_bytes=20)
+    calls = []
+    cache.acquire("open", loader("o" * 15, calls))
+    cache.put("other", "x" * 15)
+    assert "open" in cache and "other" not in cache
+    # Still pinned after being rewritten
+    cache.put("open", "p" * 15)
+    cache.put("other", "x" * 15)
+    assert "open" in cache
+    # Released entries are evicted again, least recently used first
+    cache.release("open")
+    cache.put("other", "x" * 15)
+    assert "open" not in cache and "other" in cache
+    assert cache.bytes == 15
+
+
+def test_concurrent_misses_load_once():
+    cache = NoteCache()
+    started = threading.Event()
+    calls = []
+
+    def slow_load():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return "content"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("a", slow_load)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["content"] * 5
+    assert calls == [1]
+
+
+def test_failed_load_lets_the_next_reader_retry():
+    cache = NoteCache()
+
+    def fail():
+        raise OSError("gone")
+
+    try:
+        cache.get("a", fail)
+    except OSError:
+        pass
+    assert cache.get("a", lambda: "ok") == "ok"
+
+
+def test_file_store_reads_through_the_cache(tmp_path):
+    cache = NoteCache()
+    store = FileNoteStore(tmp_path, cache=cache)
+    store.write("a.md", "hello")
+    assert tmp_path / "a.md" in cache
+    assert store.read("a.md") == "hello"
+    assert cache.hits == 1
+
+    store.acquire("a.md")
+    cache.max_bytes = 0
+    cache.put(tmp_path / "b", "x")
+    assert tmp_path / "a.md" in cache
+    store.release("a.md")
+    assert tmp_path / "a.md" not in cache
+
+    store.delete("a.md")
+    assert tmp_path / "a.md" not in cache
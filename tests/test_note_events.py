@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+
+from note_events import NoteVersions, VersionConflict
+
+
+def test_commit_bumps_the_version():
+    versions = NoteVersions()
+    assert versions.current("a.md") == 0
+    assert versions.commit("a.md", 0, lambda: "written") == (1, "written")
+    assert versions.commit("a.md", None, lambda: None) == (2, None)
+    assert versions.current("a.md") == 2
+
+
+def test_stale_commit_conflicts_without_writing():
+    versions = NoteVersions()
+    versions.commit("a.md", 0, lambda: None)
+    writes = []
+    with pytest.raises(VersionConflict) as info:
+        versions.commit("a.md", 0, lambda: writes.append(1))
+    assert (info.value.name, info.value.expected, info.value.actual) == ("a.md", 0, 1)
+    assert writes == []
+    assert versions.current("a.md") == 1
+
+
+def test_failed_write_keeps_the_version():
+    versions = NoteVersions()
+
+    def fail():
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        versions.commit("a.md", 0, fail)
+    assert versions.current("a.md") == 0
+
+
+def test_commit_many_is_all_or_nothing():
+    versions = NoteVersions()
+    versions.commit("b.md", 0, lambda: None)
+    writes = []
+    with pytest.raises(VersionConflict):
+        versions.commit_many({"a.md": 0, "b.md": 0}, lambda: writes.append(1))
+    assert writes == []
+    assert versions.current("a.md") == 0
+
+    new, _ = versions.commit_many({"a.md": 0, "b.md": 1}, lambda: writes.append(1))
+    assert new == {"a.md": 1, "b.md": 2}
+    assert writes == [1]
+
+
+def test_writes_of_different_notes_do_not_wait_for_each_other():
+    versions = NoteVersions()
+    in_write = threading.Event()
+    release = threading.Event()
+
+    def slow_write():
+        in_write.set()
+        release.wait(5)
+
+    thread = threading.Thread(target=versions.commit, args=("a.md", 0, slow_write))
+    thread.start()
+    assert in_write.wait(5)
+    try:
+        # a.md is mid-write; b.md commits without waiting for it
+        assert versions.commit("b.md", 0, lambda: "b")[0] == 1
+    finally:
+        release.set()
+        thread.join()
+    assert versions.current("a.md") == 1
+
+
+def test_overlapping_commit_many_do_not_deadlock():
+    versions = NoteVersions()
+    names = [f"{i}.md" for i in range(5)]
+    errors = []
+
+    def run(order):
+        for _ in range(200):
+            try:
+                versions.commit_many({name: versions.current(name) for name in order}, lambda: None)
+            except VersionConflict:
+                pass
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(names,)),
+               threading.Thread(target=run, args=(names[::-1],))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert not any(thread.is_alive() for thread in threads)
+    assert errors == []
@@ -0,0 +1,112 @@
+import os
+import threading
+from collections import deque
+
+from note_index import NoteIndex
+
+
+def write(path, text, mtime_ns=None):
+    path.write_text(text, encoding="utf-8")
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_scan_lists_notes_newest_first(tmp_path):
+    write(tmp_path / "old.md", "a", 1_000_000_000)
+    write(tmp_path / "new.md", "b", 2_000_000_000)
+    write(tmp_path / "skip.txt", "c")
+    index = NoteIndex(tmp_path)
+    assert [meta.name for meta in index.notes()] == ["new.md", "old.md"]
+
+
+def test_refresh_sees_edits_in_place_and_deletions(tmp_path):
+    write(tmp_path / "a.md", "one", 1_000_000_000)
+    index = NoteIndex(tmp_path)
+    calls = []
+    index.subscribe(lambda: calls.append(1))
+    assert not index.refresh()
+    assert calls == []
+
+    # Same directory entry, new content and mtime
+    write(tmp_path / "a.md", "one two", 2_000_000_000)
+    assert index.refresh()
+    assert index.get(tmp_path / "a.md").size == 7
+    assert calls
+
+    (tmp_path / "a.md").unlink()
+    assert index.refresh()
+    assert index.get(tmp_path / "a.md") is None
+
+
+def test_refresh_paths_restats_only_named_notes(tmp_path):
+    write(tmp_path / "a.md", "one", 1_000_000_000)
+    write(tmp_path / "b.md", "one", 1_000_000_000)
+    index = NoteIndex(tmp_path)
+    write(tmp_path / "a.md", "changed", 2_000_000_000)
+    write(tmp_path / "b.md", "changed", 2_000_000_000)
+    write(tmp_path / "c.md", "new")
+
+    assert index.refresh_paths([tmp_path / "a.md", tmp_path / "c.md"])
+    assert index.get(tmp_path / "a.md").size == 7
+    assert index.get(tmp_path / "b.md").size == 3
+    assert tmp_path / "c.md" in index
+    assert not index.refresh_paths([tmp_path / "a.md"])
+
+
+def test_own_writes_are_not_reported_as_edits(tmp_path):
+    index = NoteIndex(tmp_path)
+    write(tmp_path / "a.md", "# Mine")
+    index.touch(tmp_path / "a.md", "# Mine")
+    calls = []
+    index.subscribe(lambda: calls.append(1))
+    assert not index.refresh()
+    assert calls == []
+
+
+def test_watcher_rescans_when_the_directory_changes(tmp_path):
+    index = NoteIndex(tmp_path)
+    seen = threading.Event()
+    index.subscribe(seen.set)
+    index.start_watching(interval=0.02, full_interval=3600)
+    try:
+        write(tmp_path / "a.md", "# Added elsewhere")
+        assert seen.wait(5)
+        assert tmp_path / "a.md" in index
+    finally:
+        index.stop_watching()
+
+
+def test_titles_are_read_during_the_scan(tmp_path):
+    write(tmp_path / "a.md", "\n# First title\nbody")
+    write(tmp_path / "b.md", "no heading")
+    index = NoteIndex(tmp_path)
+    assert index.get(tmp_path / "a.md").title == "First title"
+    assert index.get(tmp_path / "b.md").title == "b"
+
+    write(tmp_path / "a.md", "# Second title", 3_000_000_000)
+    index.refresh()
+    assert index.get(tmp_path / "a.md").title == "Second title"
+
+
+def test_changes_since_lists_changed_notes(tmp_path):
+    write(tmp_path / "a.md", "a", 1_000_000_000)
+    write(tmp_path / "b.md", "b", 1_000_000_000)
+    index = NoteIndex(tmp_path)
+    generation, paths = index.changes_since(None)
+    assert paths is None  # No generation yet: re-read everything
+    assert index.changes_since(generation) == (generation, set())
+
+    index.update(tmp_path / "a.md", "# Edited", 5.0)
+    index.remove(tmp_path / "b.md")
+    generation, paths = index.changes_since(generation)
+    assert paths == {tmp_path / "a.md", tmp_path / "b.md"}
+    assert index.changes_since(generation)[1] == set()
+
+
+def test_changes_since_too_old_asks_for_a_full_listing(tmp_path):
+    index = NoteIndex(tmp_path)
+    generation, _ = index.changes_since(None)
+    index._changes = deque(maxlen=2)
+    for i in range(5):
+        index.update(tmp_path / f"n{i}.md", "x", float(i))
+    assert index.changes_since(generation)[1] is None
@@ -0,0 +1,100 @@
+import pytest
+
+from fake_page import FakePage, FakePubSubHub
+from journal import WriteAheadJournal
+from note_store import ClientStorageNoteStore, FileNoteStore, MemoryNoteStore
+from sqlite_store import SQLiteNoteStore
+
+
+@pytest.fixture(params=["memory", "file", "journal", "sqlite", "client_storage"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryNoteStore(tmp_path)
+    elif request.param == "file":
+        store = FileNoteStore(tmp_path / "notes")
+        store.wait_ready(5)
+        yield store
+    elif request.param == "journal":
+        journal = WriteAheadJournal(tmp_path / "notes.journal", tmp_path / "notes")
+        store = FileNoteStore(tmp_path / "notes", journal=journal)
+        store.wait_ready(5)
+        yield store
+        journal.close()
+    elif request.param == "sqlite":
+        yield SQLiteNoteStore(tmp_path / "notes.db", root=tmp_path / "notes")
+    else:
+        yield ClientStorageNoteStore(FakePage(hub=FakePubSubHub()))
+
+
+def test_write_read_and_list(store):
+    store.write("a.md", "# Alpha\nbody")
+    store.write("b.md", "plain")
+    assert store.read("a.md") == "# Alpha\nbody"
+    assert store.exists("b.md") and not store.exists("c.md")
+    assert {meta.name for meta in store.list_meta()} == {"a.md", "b.md"}
+    assert store.get_meta("c.md") is None
+
+    store.write("a.md", "# Renamed\n")
+    assert store.read("a.md") == "# Renamed\n"
+    assert len(store.list_meta()) == 2
+
+
+def test_titles_come_from_the_first_heading(store):
+    if isinstance(store, ClientStorageNoteStore):
+        pytest.skip("client storage lists names only")
+    store.write("a.md", "# Alpha\nbody")
+    assert store.get_meta("a.md").title == "Alpha"
+    store.write("a.md", "## Beta")
+    assert store.get_meta("a.md").title == "Beta"
+
+
+def test_create_and_delete(store):
+    store.create("a.md", "x")
+    with pytest.raises(FileExistsError):
+        store.create("a.md", "y")
+    assert store.read("a.md") == "x"
+    store.delete("a.md")
+    assert not store.exists("a.md")
+    with pytest.raises(FileNotFoundError):
+        store.read("a.md")
+    with pytest.raises(FileNotFoundError):
+        store.delete("a.md")
+
+
+def test_write_many(store):
+    write_many = getattr(store, "write_many", None)
+    if write_many is None:
+        pytest.skip("store writes notes one at a time")
+    store.write("a.md", "old")
+    write_many({"a.md": "new a", "b.md": "new b"})
+    assert store.read("a.md") == "new a"
+    assert store.read("b.md") == "new b"
+
+
+def test_watch_reports_created_notes_until_unwatched(store):
+    calls = []
+    unwatch = store.watch(lambda: calls.append(1))
+    store.create("a.md", "x")
+    assert calls
+    unwatch()
+    calls.clear()
+    store.create("b.md", "y")
+    assert calls == []
+
+
+def test_client_storage_writes_one_key_per_note():
+    page = FakePage(hub=FakePubSubHub())
+    store = ClientStorageNoteStore(page)
+    store.write("a.md", "x" * 1000)
+    page.client_storage.calls.clear()
+    store.write("a.md", "y" * 1000)
+    assert page.client_storage.calls == [("set", "notebook_file:a.md", 1002)]
+
+
+def test_client_storage_migrates_the_legacy_blob():
+    legacy = {"a.md": {"content": "hello"}, "b.md": {"content": "world"}}
+    page = FakePage({ClientStorageNoteStore.LEGACY_KEY: legacy}, hub=FakePubSubHub())
+    store = ClientStorageNoteStore(page)
+    assert [meta.name for meta in store.list_meta()] == ["a.md", "b.md"]
+    assert store.read("b.md") == "world"
+    assert ClientStorageNoteStore.LEGACY_KEY not in page.client_storage.data
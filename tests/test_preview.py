@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("flet")
+
+from preview import MarkdownPreview, PreviewScheduler, split_blocks  # noqa: E402
+
+
+def test_split_blocks_at_headings_and_paragraphs():
+    text = "# Title\nIntro line\nmore\n\nSecond paragraph\n\n## Sub\n\n\nEnd\n\n"
+    assert split_blocks(text) == ["# Title", "Intro line\nmore", "Second paragraph", "## Sub", "End"]
+
+
+def test_split_blocks_keeps_fences_whole():
+    text = "Before\n```python\nx = 1\n\n# not a heading\n```\nAfter"
+    assert split_blocks(text) == ["Before", "```python\nx = 1\n\n# not a heading\n```", "After"]
+
+
+def test_split_blocks_keeps_loose_lists_and_continuations():
+    text = "- one\n\n- two\n\n    indented continuation\n\nAfter"
+    assert split_blocks(text) == ["- one\n\n- two\n\n    indented continuation", "After"]
+
+
+def test_split_blocks_keeps_html_blocks():
+    text = "<pre>\ncode\n\nmore\n</pre>\n\nText"
+    assert split_blocks(text) == ["<pre>\ncode\n\nmore\n</pre>", "Text"]
+
+
+def test_split_blocks_keeps_documents_with_definitions_whole():
+    text = "See [x][ref]\n\n# Heading\n\n[ref]: https://example.com\n"
+    assert split_blocks(text) == [text]
+    assert split_blocks("") == []
+
+
+def test_preview_reuses_unchanged_blocks():
+    preview = MarkdownPreview("# A\n\nfirst\n\nsecond")
+    heading, first, second = preview.controls
+    preview.value = "# A\n\nfirst edited\n\nsecond"
+    assert preview.controls[0] is heading and preview.controls[2] is second
+    assert preview.controls[1] is not first
+    assert preview.controls[1].value == "first edited"
+
+
+def test_scheduler_renders_small_notes_immediately():
+    rendered = []
+    scheduler = PreviewScheduler(rendered.append)
+    scheduler.request("short")
+    assert rendered == ["short"]
+
+
+def test_scheduler_coalesces_costly_renders_and_ends_current():
+    rendered = []
+    done = threading.Event()
+
+    def render(text):
+        time.sleep(0.02)
+        rendered.append(text)
+        if text == "v19":
+            done.set()
+
+    scheduler = PreviewScheduler(render, frame_budget=0.001, idle_delay=0.05)
+    for i in range(20):
+        scheduler.request(f"v{i}")
+    assert done.wait(5)
+    assert rendered[-1] == "v19"
+    assert len(rendered) < 20
+
+
+def test_cancel_does_not_wait_and_reshows_after_a_stale_render():
+    started, release, shown = threading.Event(), threading.Event(), threading.Event()
+    rendered = []
+
+    def render(text):
+        if text == "old":
+            started.set()
+            release.wait(5)
+        rendered.append(text)
+        if text == "new":
+            shown.set()
+
+    scheduler = PreviewScheduler(render, immediate_chars=0)
+    scheduler.request("old")
+    assert started.wait(5)
+    scheduler.request("old, edited")
+    scheduler.cancel("new")  # Returns while "old" is still rendering
+    assert rendered == []
+    release.set()
+    assert shown.wait(5)
+    assert rendered == ["old", "new"]
@@ -0,0 +1,80 @@
+import threading
+
+from note_store import FileNoteStore, MemoryNoteStore
+from quick_open import LatestQuery, TrigramIndex
+
+
+def test_search_tolerates_typos_and_ranks_prefixes_first():
+    index = TrigramIndex()
+    index.add("meeting.md", "Quarterly planning")
+    index.add("plan.md")
+    index.add("groceries.md", "Shopping")
+    assert index.search("quartely")[0] == "meeting.md"
+    assert index.search("plan")[0] == "plan.md"
+    assert index.search("zzzz") == []
+
+
+def test_add_remove_and_rename():
+    index = TrigramIndex()
+    index.add("a.md", "Alpha")
+    index.rename("a.md", "b.md", "Beta")
+    assert "a.md" not in index and "b.md" in index
+    assert index.search("alpha") == []
+    index.remove("b.md")
+    assert len(index) == 0 and index._postings == {}
+
+
+def test_follow_applies_store_changes(tmp_path):
+    store = MemoryNoteStore(tmp_path)
+    store.write("meeting.md", "# Quarterly planning")
+    index = TrigramIndex()
+    unwatch = index.follow(store)
+    assert index.search("quarterly") == ["meeting.md"]
+
+    store.write("budget.md", "# Budget")
+    assert "budget.md" in index
+    store.delete("budget.md")
+    assert "budget.md" not in index
+    unwatch()
+
+
+def test_follow_uses_changes_since_instead_of_full_syncs(tmp_path):
+    for i in range(5):
+        (tmp_path / f"n{i}.md").write_text(f"# Note {i}", encoding="utf-8")
+    store = FileNoteStore(tmp_path)
+    store.wait_ready(5)
+    index = TrigramIndex()
+    syncs = []
+    sync = index.sync
+    index.sync = lambda metas: syncs.append(1) or sync(metas)
+    index.follow(store)
+    assert len(index) == 5 and len(syncs) == 1
+
+    store.create("new.md", "# Fresh title")
+    store.delete("n0.md")
+    assert "new.md" in index and "n0.md" not in index
+    assert index.search("fresh") == ["new.md"]
+    assert len(syncs) == 1
+
+
+def test_latest_query_drops_superseded_results():
+    delivered = []
+    done = threading.Event()
+    release = threading.Event()
+
+    def search(query, is_cancelled):
+        if query == "slow":
+            release.wait(5)
+            return None if is_cancelled() else ["stale"]
+        return [query]
+
+    def on_result(query, results):
+        delivered.append(results)
+        done.set()
+
+    runner = LatestQuery(search, on_result)
+    runner.submit("slow")
+    runner.submit("fast")
+    release.set()
+    assert done.wait(5)
+    assert delivered == [["fast"]]
@@ -0,0 +1,87 @@
+import json
+
+from note_store import MemoryNoteStore
+from search_index import SearchIndex
+
+
+def test_update_remove_and_phrases():
+    index = SearchIndex()
+    index.update("a.md", "Hello brave world")
+    index.update("b.md", "hello there, world brave")
+    assert set(index.search("hello world")) == {"a.md", "b.md"}
+    assert index.search('"brave world"') == ["a.md"]
+    assert index.search("missing") == []
+
+    index.update("a.md", "goodbye")
+    assert index.search("hello") == ["b.md"]
+    index.remove("b.md")
+    assert index.search("hello") == []
+    assert "a.md" in index and len(index) == 1
+
+
+def test_ranking_prefers_more_occurrences():
+    index = SearchIndex()
+    index.update("once.md", "tea and cake")
+    index.update("often.md", "tea tea tea")
+    assert index.search("tea") == ["often.md", "once.md"]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = SearchIndex(tmp_path / "notes.search")
+    index.update("a.md", "alpha beta gamma", (1.0, 16))
+    index.update("b.md", "beta", (2.0, 4))
+    index.save()
+
+    loaded = SearchIndex(tmp_path / "notes.search")
+    assert loaded.load()
+    assert set(loaded.search("beta")) == {"a.md", "b.md"}
+    assert loaded.search('"alpha beta"') == ["a.md"]
+    loaded.remove("a.md")
+    assert loaded.search("alpha") == []
+
+
+def test_failed_save_keeps_the_index_dirty(tmp_path):
+    index = SearchIndex(tmp_path / "missing" / "notes.search")
+    index.update("a.md", "alpha")
+    index.save()
+    assert index._dirty
+    (tmp_path / "missing").mkdir()
+    index.save()
+    assert not index._dirty
+    assert SearchIndex(tmp_path / "missing" / "notes.search").load()
+
+
+def test_unknown_format_is_rebuilt(tmp_path):
+    path = tmp_path / "notes.search"
+    path.write_text(json.dumps({"format": 1, "postings": {}}), encoding="utf-8")
+    assert not SearchIndex(path).load()
+
+
+def test_build_rereads_only_changed_notes(tmp_path):
+    store = MemoryNoteStore(tmp_path)
+    store.write("a.md", "alpha")
+    store.write("b.md", "beta")
+    index = SearchIndex(tmp_path / "notes.search")
+    index.build(store)
+    assert index.search("alpha") == ["a.md"]
+
+    reads = []
+    read = store.read
+    store.read = lambda name: reads.append(name) or read(name)
+    store.write("b.md", "beta changed")
+    store.delete("a.md")
+    rebuilt = SearchIndex(tmp_path / "notes.search")
+    rebuilt.build(store)
+    assert reads == ["b.md"]
+    assert rebuilt.search("alpha") == []
+    assert rebuilt.search("changed") == ["b.md"]
+
+
+def test_shared_indexes_are_per_class(tmp_path):
+    from link_index import LinkIndex
+
+    store = MemoryNoteStore(tmp_path)
+    path = tmp_path / "notes.index"
+    search = SearchIndex.shared(path, store)
+    assert SearchIndex.shared(path, store) is search
+    assert LinkIndex.shared(path, store) is not search
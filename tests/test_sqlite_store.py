@@ -0,0 +1,47 @@
+import pytest
+
+from search_index import StoreSearch
+from sqlite_store import SQLiteNoteStore, fts_query
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("world", '"world"'),
+    ('"hello world" foo', '"hello world" "foo"'),
+    ("c++ NOT", '"c++" "NOT"'),
+    ('a"b', '"a""b"'),
+    ("   ", ""),
+])
+def test_fts_query_quotes_terms(query, expected):
+    assert fts_query(query) == expected
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteNoteStore(tmp_path / "notes.db")
+
+
+def test_search_treats_query_syntax_as_text(store):
+    store.write("a.md", "hello world c++ NEAR(x)")
+    store.write("b.md", "other world")
+    if store.has_fts:
+        assert [name for name, _ in store.search('"hello world"')] == ["a.md"]
+    for query in ["c++", "(", '"', "NEAR(x", "AND", ""]:
+        store.search(query)  # Must not raise
+    assert {name for name, _ in store.search("world")} == {"a.md", "b.md"}
+
+
+def test_search_follows_writes_and_deletes(store):
+    store.write("a.md", "alpha")
+    store.write("a.md", "beta")
+    assert store.search("alpha") == []
+    assert [name for name, _ in store.search("beta")] == ["a.md"]
+    store.delete("a.md")
+    assert store.search("beta") == []
+
+
+def test_store_search_answers_from_the_store(store):
+    search = StoreSearch(store)
+    store.write("a.md", "# Plan\nquarterly budget")
+    search.update("a.md", "ignored")
+    assert search.search("budget") == ["a.md"]
+    assert search.ready.is_set()